@@ -0,0 +1,187 @@
+import glob
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+from batch_processor import BatchQuestionProcessor, CsvRowWriter, iter_paragraphs
+from result_cache import normalize_text
+
+# Where one finished paragraph is stored: (output path, byte offset, byte length)
+Location = Tuple[str, int, int]
+
+_SHARD_LOG = re.compile(r'shard-(\d+)-of-(\d+)\.log$')
+
+def shard_of(paragraph: str, num_shards: int) -> int:
+    """Shard owning a paragraph: its content hash split into ``num_shards`` equal ranges
+
+    Hashing the text rather than the position spreads long and short
+    paragraphs evenly, and every process computes the same answer.
+    """
+    digest = hashlib.sha256(normalize_text(paragraph).encode('utf-8')).digest()
+    return (int.from_bytes(digest[:8], 'big') * num_shards) >> 64
+
+def paragraph_number(para_id: str) -> int:
+    return int(para_id.rsplit('_', 1)[1])
+
+class BatchJob:
+    """A resumable run over one input file, optionally one shard of several
+
+    Results are appended to ``shard-K-of-N.jsonl`` in the job directory (one
+    ``{"id", "text", "questions"}`` object per line). After each record
+    ``shard-K-of-N.log`` gets a checkpoint line with the paragraph ID and the
+    record's byte offset and length. The log's first line records the job
+    settings, and resuming with different settings is refused.
+
+    Both files are flushed after every paragraph, so a killed process loses
+    at most the paragraph in flight. On resume a torn trailing record or log
+    line is truncated away, and logged paragraphs are skipped before any
+    tagging runs. Pass the same ``seed`` to get the output an uninterrupted
+    run would have produced.
+
+    Every shard reads the whole input but only processes the paragraphs
+    whose hash falls into its range, so N machines can each run one shard
+    into a shared or later-combined directory. ``merge_job`` then writes the
+    final output in paragraph order.
+    """
+
+    def __init__(self, job_dir: str, shard: int = 0, num_shards: int = 1):
+        if not 0 <= shard < num_shards:
+            raise ValueError(f"Shard {shard} is out of range for {num_shards} shards")
+        self.job_dir = job_dir
+        self.shard = shard
+        self.num_shards = num_shards
+        name = f"shard-{shard}-of-{num_shards}"
+        self.output_path = os.path.join(job_dir, name + ".jsonl")
+        self.log_path = os.path.join(job_dir, name + ".log")
+
+    def _settings(self, input_path: str, seed: Optional[int], backend: str) -> Dict:
+        return {
+            "input": os.path.abspath(input_path),
+            "shard": self.shard,
+            "num_shards": self.num_shards,
+            "seed": seed,
+            "backend": backend
+        }
+
+    def completed(self) -> Dict[str, Location]:
+        """Checkpointed paragraphs of this shard, truncating any torn tail first"""
+        if not os.path.exists(self.log_path):
+            return {}
+        _, done, log_end = read_log(self.log_path)
+        with open(self.log_path, 'r+b') as log:
+            log.truncate(log_end)
+        output_end = max((offset + length for _, offset, length in done.values()), default=0)
+        if os.path.exists(self.output_path):
+            with open(self.output_path, 'r+b') as output:
+                output.truncate(output_end)
+        return done
+
+    def run(self, processor: BatchQuestionProcessor, input_path: str, workers: int = 1,
+            chunksize: int = 8, seed: Optional[int] = None) -> int:
+        """Process every paragraph of this shard not yet checkpointed; returns how many ran"""
+        os.makedirs(self.job_dir, exist_ok=True)
+        settings = self._settings(input_path, seed, processor.generator.backend.name)
+        if os.path.exists(self.log_path):
+            logged, _, _ = read_log(self.log_path)
+            if logged is not None and logged != settings:
+                raise ValueError(f"{self.log_path} belongs to a job with different settings: {logged}")
+        done = self.completed()
+
+        def select(para_id: str, paragraph: str) -> bool:
+            return para_id not in done and shard_of(paragraph, self.num_shards) == self.shard
+
+        count = 0
+        with open(self.output_path, 'ab') as output, open(self.log_path, 'ab') as log:
+            if log.tell() == 0:
+                log.write((json.dumps({"job": settings}) + "\n").encode('utf-8'))
+                log.flush()
+            results = processor.iter_results(iter_paragraphs(input_path), workers, chunksize, seed, select)
+            for para_id, data in results:
+                line = (json.dumps({"id": para_id, **data}, ensure_ascii=False) + "\n").encode('utf-8')
+                offset = output.tell()
+                output.write(line)
+                output.flush()
+                # The checkpoint is written only once its record is safely out
+                log.write((json.dumps({"id": para_id, "offset": offset, "length": len(line)}) + "\n").encode('utf-8'))
+                log.flush()
+                count += 1
+        return count
+
+def read_log(log_path: str) -> Tuple[Optional[Dict], Dict[str, Location], int]:
+    """Parse a checkpoint log into ``(settings, {para_id: location}, valid byte length)``"""
+    output_path = log_path[:-len(".log")] + ".jsonl"
+    settings = None
+    done = {}
+    valid = 0
+    with open(log_path, 'rb') as log:
+        for line in log:
+            if not line.endswith(b"\n"):
+                break  # Torn by a crash mid-write
+            entry = json.loads(line)
+            if "job" in entry:
+                settings = entry["job"]
+            else:
+                done[entry["id"]] = (output_path, entry["offset"], entry["length"])
+            valid += len(line)
+    return settings, done, valid
+
+def job_locations(job_dir: str) -> List[Tuple[str, Location]]:
+    """Every checkpointed paragraph of every shard, in paragraph order"""
+    logs = {}
+    for path in glob.glob(os.path.join(job_dir, "shard-*-of-*.log")):
+        match = _SHARD_LOG.search(path)
+        logs[(int(match.group(1)), int(match.group(2)))] = path
+    if not logs:
+        raise FileNotFoundError(f"No checkpoint logs in {job_dir}")
+    num_shards = {n for _, n in logs}
+    if len(num_shards) > 1:
+        raise ValueError(f"{job_dir} mixes jobs with different shard counts: {sorted(num_shards)}")
+    n = num_shards.pop()
+    missing = [k for k in range(n) if (k, n) not in logs]
+    if missing:
+        raise ValueError(f"{job_dir} is missing shard(s) {missing} of {n}")
+
+    locations = []
+    for path in logs.values():
+        locations.extend(read_log(path)[1].items())
+    locations.sort(key=lambda item: paragraph_number(item[0]))
+    return locations
+
+def merge_job(job_dir: str, output_file: str, output_format: str = 'json') -> int:
+    """Combine every shard of a job into one JSON, JSONL or CSV file in paragraph order
+
+    Records are read one at a time through their checkpointed offsets, so
+    memory stays flat however large the job. The JSON output is identical to
+    ``save_to_json`` of the same results. Returns the number of paragraphs.
+    """
+    locations = job_locations(job_dir)
+    files = {}
+    try:
+        with open(output_file, 'w', newline='', encoding='utf-8') as out:
+            writer = CsvRowWriter(out) if output_format == 'csv' else None
+            if output_format == 'json':
+                out.write("{" if locations else "{}")
+            for i, (para_id, (path, offset, length)) in enumerate(locations):
+                if path not in files:
+                    files[path] = open(path, 'rb')
+                source = files[path]
+                source.seek(offset)
+                line = source.read(length).decode('utf-8')
+                if output_format == 'jsonl':
+                    out.write(line)
+                    continue
+                record = json.loads(line)
+                data = {"text": record["text"], "questions": record["questions"]}
+                if writer is not None:
+                    writer.write(para_id, data)
+                else:
+                    # Indenting a nested dump by one level reproduces json.dump(results, indent=2)
+                    body = json.dumps(data, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+                    out.write(f'{"," if i else ""}\n  {json.dumps(para_id)}: {body}')
+            if output_format == 'json' and locations:
+                out.write("\n}")
+    finally:
+        for source in files.values():
+            source.close()
+    return len(locations)
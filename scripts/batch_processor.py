@@ -1,29 +1,380 @@
+import time
+# Taken before the other imports so the startup budget covers them too
+_STARTED = time.perf_counter()
+
 import json
 import csv
-from typing import List, Dict
-from question_generator import QuestionGenerator
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, List, Dict, Optional, Iterable, Iterator, Tuple, TextIO, Union
+from question_generator import QuestionGenerator, warm_up, check_startup_budget
+from result_cache import SQLiteResultCache
+from nlp_backends import BACKENDS
+from ingest import ParagraphDeduplicator, find_files, iter_file_paragraphs, read_text
+# The bank, daemon client, exporters, long-document and distractor modules are
+# imported where they are used, so a plain run does not pay for them at startup
+
+CSV_HEADER = ['Paragraph_ID', 'Original_Text', 'Question_Type', 'Question', 'Options', 'Answer']
+
+# Generator owned by each worker process, created once by _init_worker
+_worker_generator = None
+
+def _init_worker(cache_path: Optional[str] = None, backend: Optional[str] = None,
+                 cross_document_distractors: bool = False):
+    """Load the NLP models once per worker process"""
+    global _worker_generator
+    cache = SQLiteResultCache(cache_path) if cache_path else None
+    distractor_index = None
+    if cross_document_distractors:
+        from distractors import DistractorIndex
+        distractor_index = DistractorIndex()
+    _worker_generator = QuestionGenerator(cache=cache, backend=backend, distractor_index=distractor_index)
+    # A no-op when the models were already loaded in the parent before forking
+    warm_up(backend)
+
+def _worker_generate_chunk(paragraphs: List[str], seed: Optional[int] = None) -> List[Dict]:
+    """Generate questions for a chunk of paragraphs inside a worker process"""
+    return _worker_generator.generate_questions_many(paragraphs, seed=seed)
+
+def iter_paragraphs(source: Union[str, TextIO]) -> Iterator[str]:
+    """Lazily yield the blank-line separated paragraphs of a file
+
+    ``source`` is a path, ``'-'`` for stdin, or an already open text stream.
+    Only one paragraph is held in memory at a time.
+    """
+    if isinstance(source, str):
+        if source == '-':
+            yield from iter_paragraphs(sys.stdin)
+            return
+        with open(source, 'r', encoding='utf-8') as file:
+            yield from iter_paragraphs(file)
+        return
+    
+    lines = []
+    for line in source:
+        # An empty line is a paragraph break, exactly like splitting on '\n\n'
+        if line == '\n':
+            paragraph = ''.join(lines).strip()
+            if paragraph:
+                yield paragraph
+            lines = []
+        else:
+            lines.append(line)
+    
+    paragraph = ''.join(lines).strip()
+    if paragraph:
+        yield paragraph
+
+def iter_lines(source: Union[str, TextIO]) -> Iterator[str]:
+    """Lazily yield one paragraph per non-blank line, for pipe mode
+
+    Lines may also be JSON records, read like ``question_daemon.parse_request``.
+    """
+    from question_daemon import parse_request
+    if isinstance(source, str):
+        if source == '-':
+            yield from iter_lines(sys.stdin)
+            return
+        with open(source, 'r', encoding='utf-8') as file:
+            yield from iter_lines(file)
+        return
+    
+    for line in source:
+        request = parse_request(line)
+        if request is not None:
+            yield request["paragraph"]
+
+def csv_rows(para_id: str, data: Dict) -> Iterator[List[str]]:
+    """Yield the CSV rows for one processed paragraph"""
+    if 'questions' not in data:
+        return
+    text = data['text'][:100] + "..." if len(data['text']) > 100 else data['text']
+    
+    for question_type, questions in data['questions'].items():
+        if question_type == "Key Phrases Identified":
+            continue
+        elif question_type == "Multiple Choice Questions":
+            for q in questions:
+                options = " | ".join(q['options'])
+                answer = q['options'][q['correct_answer_index']]
+                yield [para_id, text, question_type, q['question'], options, answer]
+        elif question_type == "Fill in the Blank Questions":
+            for q in questions:
+                yield [para_id, text, question_type, q['question'], "", q['answer']]
+        else:
+            for q in questions:
+                # Older results and error entries hold plain strings
+                question = q if isinstance(q, str) else q['question']
+                yield [para_id, text, question_type, question, "", ""]
+
+class JsonLinesWriter:
+    """Writes one JSON object per paragraph as soon as its result is ready"""
+    
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+    
+    def write(self, para_id: str, data: Dict):
+        record = {"id": para_id, **data}
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        # Flush every record so a crash never loses finished paragraphs
+        self.stream.flush()
+
+class CsvRowWriter:
+    """Appends the CSV rows of each paragraph to an open writer"""
+    
+    def __init__(self, stream: TextIO, write_header: bool = True):
+        self.stream = stream
+        self.writer = csv.writer(stream)
+        if write_header:
+            self.writer.writerow(CSV_HEADER)
+    
+    def write(self, para_id: str, data: Dict):
+        self.writer.writerows(csv_rows(para_id, data))
+        self.stream.flush()
 
 class BatchQuestionProcessor:
-    def __init__(self):
-        self.generator = QuestionGenerator()
+    def __init__(self, cache_path: Optional[str] = None, backend: Optional[str] = None,
+                 cross_document_distractors: bool = False, bank_path: Optional[str] = None,
+                 daemon: Optional[str] = None):
+        # A SQLite result cache can be shared by every run and worker process
+        self.cache_path = cache_path
+        cache = SQLiteResultCache(cache_path) if cache_path else None
+        # Each worker process keeps its own cross-document distractor index
+        self.cross_document_distractors = cross_document_distractors
+        distractor_index = None
+        if cross_document_distractors:
+            from distractors import DistractorIndex
+            distractor_index = DistractorIndex()
+        self.generator = QuestionGenerator(cache=cache, backend=backend, distractor_index=distractor_index)
+        # Repeated paragraphs the last iter_file_results run answered with an earlier result
+        self.duplicates = 0
+        # Question bank every result is stored in; paragraphs already banked are served from it
+        self.bank = None
+        if bank_path:
+            from question_bank import QuestionBank
+            self.bank = QuestionBank(bank_path)
+        # Paragraphs the last run served from the bank instead of generating
+        self.banked = 0
+        # A running question daemon (socket path) generates instead, so no models load here
+        self.daemon = None
+        if daemon:
+            from question_daemon import DaemonClient
+            self.daemon = DaemonClient(daemon)
     
-    def process_text_file(self, file_path: str) -> Dict:
-        """Process a text file and generate questions for each paragraph"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-            
-            # Split into paragraphs
-            paragraphs = [p.strip() for p in content.split('\n\n') if p.strip()]
-            
-            results = {
+    def _settings(self) -> str:
+        source = self.daemon if self.daemon is not None else self.generator
+        return source.settings_fingerprint()
+    
+    def _already_banked(self, paragraph: str, seed: Optional[int]) -> bool:
+        if self.bank is None or not self.bank.contains(paragraph, seed, self._settings()):
+            return False
+        self.banked += 1
+        return True
+    
+    def _banked_result(self, paragraph: str, seed: Optional[int]) -> Dict:
+        return self.bank.get(paragraph, seed, self._settings())
+    
+    def _bank(self, para_id: str, paragraph: str, questions: Dict, seed: Optional[int]):
+        if self.bank is not None:
+            self.bank.add(paragraph, questions, para_id, seed, self._settings())
+    
+    def iter_generated(self, paragraphs: Iterable[str], workers: int = 1,
+                       chunksize: int = 8, seed: Optional[int] = None) -> Iterator[Dict]:
+        """Lazily generate questions for a stream of paragraphs, in input order
+
+        With ``workers > 1`` paragraphs are dispatched to a process pool in
+        chunks of ``chunksize``. At most two chunks per worker are in flight,
+        so memory stays bounded however long the input is. Every paragraph is
+        generated with the same ``seed``, so a seeded run gives identical
+        results in serial and pool mode.
+
+        With a daemon, paragraphs are pipelined to it over one connection
+        and ``workers`` and ``chunksize`` are ignored.
+        """
+        if self.daemon is not None:
+            yield from self.daemon.stream({"paragraph": paragraph, "seed": seed} for paragraph in paragraphs)
+            return
+        if workers == 0:
+            workers = os.cpu_count() or 1
+        paragraphs = iter(paragraphs)
+        if workers <= 1:
+            # Chunks still go through the bulk tagging API in serial mode
+            while True:
+                chunk = list(islice(paragraphs, chunksize))
+                if not chunk:
+                    return
+                yield from self.generator.generate_questions_many(chunk, seed=seed)
+        
+        # Load the models once here so forked workers share them copy-on-write
+        warm_up(self.generator.backend)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.cache_path, self.generator.backend.name,
+                                           self.cross_document_distractors)) as executor:
+            pending = deque()
+            while True:
+                chunk = list(islice(paragraphs, chunksize))
+                if chunk:
+                    pending.append(executor.submit(_worker_generate_chunk, chunk, seed))
+                # Results are taken from the oldest chunk, whichever finishes first
+                if pending and (len(pending) >= workers * 2 or not chunk):
+                    yield from pending.popleft().result()
+                elif not chunk:
+                    return
+    
+    def generate_all(self, paragraphs: List[str], workers: int = 1,
+                     chunksize: Optional[int] = None, seed: Optional[int] = None) -> List[Dict]:
+        """Generate questions for a list of paragraphs, in input order"""
+        if chunksize is None:
+            # A few chunks per worker keeps the pool balanced without per-task overhead
+            chunksize = max(1, len(paragraphs) // (max(workers, 1) * 4))
+        return list(self.iter_generated(paragraphs, workers, chunksize, seed))
+    
+    def iter_results(self, paragraphs: Iterable[str], workers: int = 1,
+                     chunksize: int = 8, seed: Optional[int] = None,
+                     select: Optional[Callable[[str, str], bool]] = None) -> Iterator[Tuple[str, Dict]]:
+        """Yield ``(paragraph_id, result)`` pairs for a stream of paragraphs
+
+        Short paragraphs are skipped but still counted, so IDs match the
+        ``Paragraph_N`` numbering of ``process_text_file``. ``select``, called
+        with the ID and the paragraph, can skip more before any tagging runs.
+        With a question bank, banked paragraphs are not generated again but
+        their stored result is yielded in place (counted in ``self.banked``),
+        and every new result is stored.
+        """
+        selected = deque()
+        self.banked = 0
+        
+        def substantial():
             for i, paragraph in enumerate(paragraphs, 1):
-                if len(paragraph) >= 50:  # Only process substantial paragraphs
-                    questions = self.generator.generate_questions(paragraph)
-                    results[f"Paragraph_{i}"] = {
-                        "text": paragraph,
-                        "questions": questions
-                    }
+                if len(paragraph) < 50:  # Only process substantial paragraphs
+                    continue
+                if select is not None and not select(f"Paragraph_{i}", paragraph):
+                    continue
+                if self._already_banked(paragraph, seed):
+                    selected.append((f"Paragraph_{i}", paragraph, "bank", None))
+                    continue
+                selected.append((f"Paragraph_{i}", paragraph, "generate", None))
+                yield paragraph
+        
+        yield from self._in_order(selected, self.iter_generated(substantial(), workers, chunksize, seed), seed)
+    
+    def _in_order(self, selected: deque, generated: Iterator[Dict], seed: Optional[int],
+                  deduplicator: Optional[ParagraphDeduplicator] = None) -> Iterator[Tuple[str, Dict]]:
+        """Merge generated results with banked and repeated ones in the order ``selected`` was filled
+
+        Entries are ``(paragraph_id, paragraph, source, key)``; ``source`` is
+        ``"generate"``, ``"bank"`` or ``"copy"`` (a repeat answered by
+        ``deduplicator`` under its ``key``).
+        """
+        def finish(entry, questions=None):
+            para_id, paragraph, source, key = entry
+            if source == "bank":
+                questions = self._banked_result(paragraph, seed)
+            elif source == "copy":
+                questions = deduplicator.take(key)
+            else:
+                self._bank(para_id, paragraph, questions, seed)
+            if deduplicator is not None and source != "copy":
+                deduplicator.resolve(key, questions)
+            return para_id, {"text": paragraph, "questions": questions}
+        
+        def ready_before_next():
+            while selected and selected[0][2] != "generate":
+                yield finish(selected.popleft())
+        
+        for questions in generated:
+            yield from ready_before_next()
+            yield finish(selected.popleft(), questions)
+        yield from ready_before_next()
+    
+    def iter_file_results(self, paths: Iterable[str], workers: int = 1, chunksize: int = 8,
+                          seed: Optional[int] = None, read_workers: int = 8,
+                          dedup: bool = True) -> Iterator[Tuple[str, Dict]]:
+        """Yield ``(paragraph_id, result)`` pairs for many files of any supported format
+
+        Files are read and split concurrently by ``read_workers`` threads with
+        the splitter registered for their extension (see ``ingest``). IDs are
+        ``"<path>#Paragraph_N"``, numbered per file. With ``dedup`` a
+        paragraph already seen in an earlier file or position is not
+        generated again: it is yielded under its own ID with the first
+        occurrence's result, so repeated boilerplate is tagged only once
+        (see ``ParagraphDeduplicator``); ``self.duplicates`` counts those
+        copies. Banked paragraphs are served from the bank as in
+        ``iter_results``.
+        """
+        deduplicator = ParagraphDeduplicator() if dedup else None
+        self.duplicates = 0
+        self.banked = 0
+        selected = deque()
+        
+        def substantial():
+            for path, paragraphs in iter_file_paragraphs(paths, read_workers):
+                for i, paragraph in enumerate(paragraphs, 1):
+                    if len(paragraph) < 50:  # Only process substantial paragraphs
+                        continue
+                    para_id = f"{path}#Paragraph_{i}"
+                    key = None
+                    if deduplicator is not None:
+                        key, copy = deduplicator.first_or_copy(paragraph)
+                        if copy:
+                            self.duplicates += 1
+                            selected.append((para_id, paragraph, "copy", key))
+                            continue
+                    if self._already_banked(paragraph, seed):
+                        selected.append((para_id, paragraph, "bank", key))
+                        continue
+                    selected.append((para_id, paragraph, "generate", key))
+                    yield paragraph
+        
+        yield from self._in_order(selected, self.iter_generated(substantial(), workers, chunksize, seed), seed,
+                                  deduplicator)
+    
+    def process_glob(self, pattern: str, workers: int = 1, chunksize: int = 8, seed: Optional[int] = None,
+                     read_workers: int = 8, dedup: bool = True) -> Dict:
+        """Process every supported file matched by a glob pattern (``**`` recurses)"""
+        return dict(self.iter_file_results(find_files(pattern), workers, chunksize, seed, read_workers, dedup))
+    
+    def process_directory(self, directory: str, workers: int = 1, chunksize: int = 8,
+                          seed: Optional[int] = None, read_workers: int = 8, dedup: bool = True) -> Dict:
+        """Process every .txt, .md and .jsonl file under a directory, recursively"""
+        if not os.path.isdir(directory):
+            return {"error": f"Directory {directory} not found"}
+        return self.process_glob(directory, workers, chunksize, seed, read_workers, dedup)
+    
+    def process_stream(self, source: Union[str, TextIO], writer, workers: int = 1,
+                       chunksize: int = 8, seed: Optional[int] = None, per_line: bool = False) -> int:
+        """Read paragraphs lazily from ``source`` and write each result immediately
+
+        ``source`` may also be a directory or a glob pattern, read through
+        ``iter_file_results``. With ``per_line`` every line is a paragraph
+        (see ``iter_lines``). ``writer`` is a ``JsonLinesWriter`` or
+        ``CsvRowWriter``. Returns the number of paragraphs written.
+        """
+        if per_line:
+            results = self.iter_results(iter_lines(source), workers, chunksize, seed)
+        elif isinstance(source, str) and (os.path.isdir(source) or any(c in source for c in '*?[')):
+            results = self.iter_file_results(find_files(source), workers, chunksize, seed)
+        else:
+            results = self.iter_results(iter_paragraphs(source), workers, chunksize, seed)
+        count = 0
+        for para_id, data in results:
+            writer.write(para_id, data)
+            count += 1
+        return count
+    
+    def process_text_file(self, file_path: str, workers: int = 1,
+                          chunksize: Optional[int] = None, seed: Optional[int] = None) -> Dict:
+        """Process a text file and generate questions for each paragraph
+
+        ``workers`` selects the number of processes (``0`` uses every CPU).
+        """
+        try:
+            results = {}
+            for para_id, data in self.iter_results(iter_paragraphs(file_path), workers, chunksize or 8, seed):
+                results[para_id] = data
             
             return results
         
@@ -32,6 +383,37 @@ class BatchQuestionProcessor:
         except Exception as e:
             return {"error": f"Error processing file: {str(e)}"}
     
+    def process_long_document(self, source: str, workers: int = 1, seed: Optional[int] = None,
+                              window_sentences: Optional[int] = None,
+                              overlap: Optional[int] = None) -> Dict:
+        """Question a whole file (or ``'-'`` for stdin) as one document, window by window
+
+        Unlike ``process_text_file`` the text is not split on blank lines: a
+        chapter is covered by overlapping sentence windows and each key phrase
+        is asked about once (see ``long_document``). The single result has the
+        ID ``"Document"``. Window size and overlap default to the
+        ``long_document`` ones.
+        """
+        from long_document import LongDocumentGenerator, WINDOW_OVERLAP, WINDOW_SENTENCES
+        window_sentences = WINDOW_SENTENCES if window_sentences is None else window_sentences
+        overlap = WINDOW_OVERLAP if overlap is None else overlap
+        text = (sys.stdin.read() if source == '-' else read_text(source)).strip()
+        long_generator = LongDocumentGenerator(self.generator, window_sentences, overlap)
+        return {"Document": {"text": text, "questions": long_generator.generate(text, seed, workers)}}
+    
+    def export(self, results: Union[Dict, Iterable[Tuple[str, Dict]]], output_file: str,
+               output_format: str = 'jsonl', compression: Optional[str] = None) -> int:
+        """Write results as flat question rows through an exporter; returns the row count
+
+        ``results`` is a results dict or a stream of ``(paragraph_id, result)``
+        pairs such as ``iter_results``. See ``exporters`` for the formats.
+        """
+        from exporters import export_results, get_exporter
+        if isinstance(results, dict):
+            results = results.items()
+        exporter = get_exporter(output_format, output_file, compression)
+        return export_results(results, exporter)
+    
     def save_to_json(self, results: Dict, output_file: str):
         """Save results to JSON file"""
         with open(output_file, 'w', encoding='utf-8') as file:
@@ -41,27 +423,9 @@ class BatchQuestionProcessor:
     def save_to_csv(self, results: Dict, output_file: str):
         """Save results to CSV file"""
         with open(output_file, 'w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow(['Paragraph_ID', 'Original_Text', 'Question_Type', 'Question', 'Options', 'Answer'])
-            
+            writer = CsvRowWriter(file)
             for para_id, data in results.items():
-                if 'questions' in data:
-                    text = data['text'][:100] + "..." if len(data['text']) > 100 else data['text']
-                    
-                    for question_type, questions in data['questions'].items():
-                        if question_type == "Key Phrases Identified":
-                            continue
-                        elif question_type == "Multiple Choice Questions":
-                            for q in questions:
-                                options = " | ".join(q['options'])
-                                answer = q['options'][q['correct_answer_index']]
-                                writer.writerow([para_id, text, question_type, q['question'], options, answer])
-                        elif question_type == "Fill in the Blank Questions":
-                            for q in questions:
-                                writer.writerow([para_id, text, question_type, q['question'], "", q['answer']])
-                        else:
-                            for question in questions:
-                                writer.writerow([para_id, text, question_type, question, "", ""])
+                writer.write(para_id, data)
         
         print(f"✅ Results saved to {output_file}")
 
@@ -119,5 +483,127 @@ Artificial intelligence is transforming industries across the globe. Machine lea
     
     print(f"\n✨ Processed {len(results)} paragraphs successfully!")
 
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point; runs the demo when no input is given"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Generate questions for every paragraph of a text file")
+    parser.add_argument('input', nargs='?',
+                        help="Input text file, '-' for stdin, or a directory or glob of .txt/.md/.jsonl files")
+    parser.add_argument('-o', '--output', default='-', help="Output file, or '-' for stdout (default)")
+    parser.add_argument('--format', choices=['jsonl', 'csv', 'json'], default='jsonl',
+                        help="Output format (json only with --merge)")
+    parser.add_argument('--export', default=None, metavar='FORMAT',
+                        help="Write flat question rows in this format (jsonl, csv, parquet, ...) "
+                             "instead of --format (needs --output)")
+    parser.add_argument('--compression', choices=['gzip', 'zstd'], default=None,
+                        help="Compress --export output (default: from the .gz/.zst extension)")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes (0 = all CPUs)")
+    parser.add_argument('--chunksize', type=int, default=8, help="Paragraphs per worker task")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible questions")
+    parser.add_argument('--cache', default=None, help="SQLite result cache shared between runs (needs --seed)")
+    parser.add_argument('--bank', default=None,
+                        help="Question bank SQLite file: results are stored there and banked paragraphs served from it")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=None,
+                        help="NLP backend (default: QG_BACKEND or nltk)")
+    parser.add_argument('--cross-document-distractors', action='store_true',
+                        help="Let short paragraphs borrow MCQ options from earlier paragraphs (unseeded runs only)")
+    parser.add_argument('--job', default=None, help="Run as a resumable job checkpointed in this directory")
+    parser.add_argument('--shard', default='0/1', help="With --job, process shard K of N, written K/N")
+    parser.add_argument('--merge', default=None, metavar='JOB_DIR',
+                        help="Merge a finished job's shards into --output in paragraph order")
+    parser.add_argument('--long-document', action='store_true',
+                        help="Treat the input file as one long document split into sentence windows")
+    parser.add_argument('--window-sentences', type=int, default=None,
+                        help="With --long-document, sentences per window (default 12)")
+    parser.add_argument('--window-overlap', type=int, default=None,
+                        help="With --long-document, sentences shared by consecutive windows (default 2)")
+    parser.add_argument('--daemon', nargs='?', const=True, default=None, metavar='SOCKET',
+                        help="Send paragraphs to a running question_daemon instead of loading models "
+                             "(default socket: QG_SOCKET or a per-user one in the temporary directory)")
+    parser.add_argument('--pipe', action='store_true',
+                        help="Read one paragraph (or JSON record) per line, stdin by default, answering each at once")
+    parser.add_argument('--startup-budget-ms', type=float, default=None,
+                        help="Warn when startup exceeds this many milliseconds")
+    args = parser.parse_args(argv)
+    
+    if args.merge:
+        from batch_jobs import merge_job
+        if args.output == '-':
+            parser.error("--merge needs an --output file")
+        count = merge_job(args.merge, args.output, args.format)
+        print(f"✅ Merged {count} paragraphs into {args.output}", file=sys.stderr)
+        return
+    if args.format == 'json':
+        parser.error("--format json is only supported with --merge")
+    
+    if args.daemon and (args.job or args.long_document):
+        parser.error("--daemon cannot be combined with --job or --long-document")
+    if args.daemon is True:
+        from question_daemon import default_socket_path
+        args.daemon = default_socket_path()
+    if args.input is None and args.pipe:
+        args.input = '-'
+    if args.input is None:
+        demo_batch_processing()
+        return
+    
+    if args.job:
+        from batch_jobs import BatchJob
+        shard, num_shards = (int(part) for part in args.shard.split('/'))
+        processor = BatchQuestionProcessor(cache_path=args.cache, backend=args.backend,
+                                           cross_document_distractors=args.cross_document_distractors,
+                                           bank_path=args.bank)
+        job = BatchJob(args.job, shard, num_shards)
+        count = job.run(processor, args.input, args.workers, args.chunksize, args.seed)
+        print(f"✅ Processed {count} paragraphs into {job.output_path}", file=sys.stderr)
+        return
+    
+    try:
+        processor = BatchQuestionProcessor(cache_path=args.cache, backend=args.backend,
+                                           cross_document_distractors=args.cross_document_distractors,
+                                           bank_path=args.bank, daemon=args.daemon)
+    except OSError as e:
+        print(f"❌ No question daemon at {args.daemon}: {e}", file=sys.stderr)
+        sys.exit(1)
+    check_startup_budget(_STARTED, "Batch CLI", args.startup_budget_ms)
+    if args.export:
+        if args.output == '-':
+            parser.error("--export needs an --output file")
+        from exporters import get_exporter
+        output = None
+        try:
+            writer = get_exporter(args.export, args.output, args.compression)
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+        writer = JsonLinesWriter(output) if args.format == 'jsonl' else CsvRowWriter(output)
+    try:
+        if args.long_document:
+            results = processor.process_long_document(args.input, args.workers, args.seed,
+                                                      args.window_sentences, args.window_overlap)
+            for para_id, data in results.items():
+                writer.write(para_id, data)
+            count = len(results)
+        else:
+            count = processor.process_stream(args.input, writer, args.workers, args.chunksize, args.seed,
+                                             per_line=args.pipe)
+    finally:
+        if output is None:
+            writer.close()
+        elif output is not sys.stdout:
+            output.close()
+    print(f"✅ Processed {count} paragraphs", file=sys.stderr)
+    if output is None:
+        print(f"📦 Exported {writer.count} question rows to {args.output}", file=sys.stderr)
+    if processor.duplicates:
+        print(f"♻️  Reused results for {processor.duplicates} repeated paragraphs", file=sys.stderr)
+    if processor.banked:
+        print(f"🏦 Served {processor.banked} paragraphs from the question bank", file=sys.stderr)
+    if processor.generator.cache is not None:
+        # Pool workers keep their own counters, so these cover the parent process only
+        print(f"📊 Cache: {processor.generator.cache.stats()}", file=sys.stderr)
+
 if __name__ == "__main__":
-    demo_batch_processing()
+    main()
@@ -0,0 +1,492 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import redirect_stdout
+from typing import Dict, List, Optional
+from question_generator import QuestionGenerator
+from nlp_backends import BACKENDS
+from phrase_index import PhraseIndex
+from batch_processor import BatchQuestionProcessor, JsonLinesWriter, iter_paragraphs
+from exporters import question_rows
+
+# Named corpus sizes, in paragraphs
+CORPUS_SIZES = {
+    "paragraph": 1,
+    "chapter": 50,
+    "book": 10000
+}
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sample_content.txt')
+
+FILLER_SENTENCES = [
+    "Researchers at the National Institute published a detailed report on the topic in 2019.",
+    "The committee in Geneva reviewed historical records from several European countries.",
+    "Engineers designed new systems that reduce energy consumption in large cities.",
+    "Students often study these ideas in introductory science and economics courses.",
+    "Many experts believe that international cooperation will shape future progress.",
+    "Early experiments in the laboratory produced surprising and influential results."
+]
+
+def synthetic_corpus(paragraphs: int, seed: int = 0) -> List[str]:
+    """Build a reproducible corpus by recombining sentences from the sample content"""
+    rng = random.Random(seed)
+    sentences = list(FILLER_SENTENCES)
+    if os.path.exists(SAMPLE_FILE):
+        for paragraph in iter_paragraphs(SAMPLE_FILE):
+            sentences.extend(s.strip() + '.' for s in paragraph.split('.') if len(s.strip()) > 20)
+    return [' '.join(rng.sample(sentences, rng.randint(3, 7))) for _ in range(paragraphs)]
+
+# Report metadata that must match for two reports to be comparable
+COMPARABLE_META = ("corpus", "paragraphs", "seed", "backend", "flags")
+# Metadata that only earns a warning when it differs
+ENVIRONMENT_META = ("python", "platform")
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[int((len(ordered) - 1) * fraction)]
+
+def relative_spread(values: List[float]) -> float:
+    """(max - min) / median of repeated measurements; 0.0 for fewer than two"""
+    median = percentile(values, 0.50)
+    return (max(values) - min(values)) / median if len(values) > 1 and median else 0.0
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in megabytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+class StageTimer:
+    """Collects wall-clock durations per named pipeline stage
+
+    Set ``run`` between repeats of a workload; the summary then reports how
+    far each stage's per-run p50 moved between runs.
+    """
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.run = 0
+        self._runs = defaultdict(lambda: defaultdict(list))
+
+    def time(self, stage: str, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        self.samples[stage].append(elapsed)
+        self._runs[stage][self.run].append(elapsed)
+        return result
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "total_ms": sum(values) * 1000,
+                "spread": relative_spread([percentile(run, 0.50) for run in self._runs[stage].values()])
+            }
+            for stage, values in self.samples.items()
+        }
+
+def run_benchmark(paragraphs: List[str], seed: int = 0, backend: Optional[str] = None,
+                  export_scale: int = 0, repeats: int = 3) -> Dict:
+    """Time every stage of the pipeline over a corpus and return a report
+
+    The per-stage pass, the end-to-end pass and each writer stage run
+    ``repeats`` times: the throughput is the median pass, each paragraph's
+    latency its median call, and a stage's p50 is taken over every run, so
+    one slow run does not read as a regression. How far the runs disagree is
+    kept as each metric's ``spread`` (see ``compare_reports``). With ``export_scale`` the report also
+    compares writer throughput on the results repeated that many times
+    (see ``export_throughput``).
+    """
+    repeats = max(repeats, 1)
+    # No analysis caches: every paragraph must pay for the full pipeline
+    generator = QuestionGenerator(analysis_cache_size=0, sentence_cache_size=0, backend=backend)
+    generator.backend.warm_up()
+    timer = StageTimer()
+
+    # Per-stage timings, calling each step the way generate_questions does
+    for run in range(repeats):
+        timer.run = run
+        for paragraph in paragraphs:
+            rng = random.Random(seed)
+            doc = timer.time("analyze", generator.analyze, paragraph)
+            key_phrases = timer.time("extract_key_phrases", generator.extract_key_phrases, paragraph, doc)
+            index = timer.time("phrase_index", PhraseIndex, key_phrases, doc.lowered)
+            timer.time("generate_factual_questions", generator.generate_factual_questions,
+                       paragraph, key_phrases, rng)
+            timer.time("generate_analytical_questions", generator.generate_analytical_questions, paragraph, rng)
+            timer.time("generate_comprehension_questions", generator.generate_comprehension_questions,
+                       paragraph, doc)
+            timer.time("generate_multiple_choice_questions", generator.generate_multiple_choice_questions,
+                       paragraph, key_phrases, doc, index, rng)
+            timer.time("generate_fill_in_blank_questions", generator.generate_fill_in_blank_questions,
+                       paragraph, key_phrases, doc, index)
+            timer.time("generate_deep_facility_questions", generator.generate_deep_facility_questions,
+                       paragraph, key_phrases, rng)
+
+    # End-to-end latency and throughput
+    calls = [[] for _ in paragraphs]
+    passes = []
+    results = {}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for i, paragraph in enumerate(paragraphs, 1):
+            call_start = time.perf_counter()
+            questions = generator.generate_questions(paragraph, seed=seed)
+            calls[i - 1].append(time.perf_counter() - call_start)
+            results[f"Paragraph_{i}"] = {"text": paragraph, "questions": questions}
+        passes.append(time.perf_counter() - start)
+    latencies = [percentile(samples, 0.50) for samples in calls]
+    elapsed = percentile(passes, 0.50)
+    run_latencies = [percentile([samples[run] for samples in calls], 0.50) for run in range(repeats)]
+
+    # Writers, into a scratch directory
+    processor = BatchQuestionProcessor(backend=generator.backend.name)
+    with tempfile.TemporaryDirectory() as scratch, open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for run in range(repeats):
+            timer.run = run
+            timer.time("save_to_json", processor.save_to_json, results, os.path.join(scratch, 'out.json'))
+            timer.time("save_to_csv", processor.save_to_csv, results, os.path.join(scratch, 'out.csv'))
+            timer.time("export_jsonl", processor.export, results, os.path.join(scratch, 'rows.jsonl'), 'jsonl')
+            timer.time("export_columnar", processor.export, results, os.path.join(scratch, 'rows.columnar'),
+                       'columnar')
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "paragraphs": len(paragraphs),
+            "seed": seed,
+            "backend": generator.backend.name,
+            "repeats": repeats,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "throughput_pps": len(paragraphs) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000
+        },
+        "stages": timer.summary(),
+        "peak_rss_mb": peak_rss_mb(),
+        "spread": {
+            "throughput_pps": relative_spread(passes),
+            "latency_ms.p50": relative_spread(run_latencies)
+        }
+    }
+    if export_scale:
+        report["exports"] = export_throughput(processor, results, export_scale)
+    return report
+
+def export_throughput(processor: BatchQuestionProcessor, results: Dict, scale: int = 20) -> Dict[str, Dict]:
+    """Question rows per second and output size of the current writers and the exporters
+
+    The results are repeated ``scale`` times under fresh IDs so every writer
+    handles a realistic volume.
+    """
+    scaled = {f"{para_id}.{i}": data for i in range(scale) for para_id, data in results.items()}
+    rows = sum(1 for para_id, data in scaled.items() for _ in question_rows(para_id, data))
+
+    def write_json_lines(path):
+        with open(path, 'w', encoding='utf-8') as file:
+            writer = JsonLinesWriter(file)
+            for para_id, data in scaled.items():
+                writer.write(para_id, data)
+
+    writers = [
+        ("save_to_json", 'out.json', lambda path: processor.save_to_json(scaled, path)),
+        ("save_to_csv", 'out.csv', lambda path: processor.save_to_csv(scaled, path)),
+        ("JsonLinesWriter", 'out.jsonl', write_json_lines),
+        ("export jsonl", 'rows.jsonl', lambda path: processor.export(scaled, path, 'jsonl')),
+        ("export jsonl gzip", 'rows.jsonl.gz', lambda path: processor.export(scaled, path, 'jsonl')),
+        ("export csv", 'rows.csv', lambda path: processor.export(scaled, path, 'csv')),
+        ("export columnar", 'rows.columnar', lambda path: processor.export(scaled, path, 'columnar'))
+    ]
+    try:
+        import zstandard  # noqa: F401
+        writers.append(("export jsonl zstd", 'rows.jsonl.zst', lambda path: processor.export(scaled, path, 'jsonl')))
+    except ImportError:
+        pass
+
+    throughput = {}
+    with tempfile.TemporaryDirectory() as scratch, open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for name, filename, write in writers:
+            path = os.path.join(scratch, filename)
+            start = time.perf_counter()
+            write(path)
+            seconds = time.perf_counter() - start
+            throughput[name] = {
+                "rows": rows,
+                "rows_per_sec": rows / seconds if seconds else 0.0,
+                "mb": os.path.getsize(path) / (1024 * 1024)
+            }
+    return throughput
+
+def _coarse_tag(tag: str) -> str:
+    """Collapse Penn Treebank tags to the classes the key phrase extractor cares about"""
+    return tag[0] if tag[:1] in ('N', 'J', 'V', 'R') else 'O'
+
+def _f1(found: set, expected: set) -> float:
+    if not found and not expected:
+        return 1.0
+    matched = len(found & expected)
+    return 2 * matched / (len(found) + len(expected))
+
+def backend_agreement(paragraphs: List[str], reference: str = "nltk", candidate: str = "fast") -> Dict:
+    """Measure how closely ``candidate`` reproduces the ``reference`` backend's analysis
+
+    Key phrases and entities are compared per paragraph as sets (F1), tags
+    by coarse class on the sentences both backends tokenized identically.
+    Also reports the analysis speedup of the candidate.
+    """
+    generators = {name: QuestionGenerator(analysis_cache_size=0, sentence_cache_size=0, backend=name)
+                  for name in (reference, candidate)}
+    docs = {}
+    seconds = {}
+    for name, generator in generators.items():
+        generator.backend.warm_up()
+        start = time.perf_counter()
+        docs[name] = generator.analyze_many(paragraphs)
+        seconds[name] = time.perf_counter() - start
+
+    phrase_f1, entity_f1 = [], []
+    sentences = same_sentences = compared = tag_matches = 0
+    for ref_doc, cand_doc in zip(docs[reference], docs[candidate]):
+        ref_phrases = {p.lower() for p in generators[reference].extract_key_phrases(ref_doc.text, ref_doc)}
+        cand_phrases = {p.lower() for p in generators[candidate].extract_key_phrases(cand_doc.text, cand_doc)}
+        phrase_f1.append(_f1(cand_phrases, ref_phrases))
+        ref_entities = {entity for entities in ref_doc.ne_chunks for entity, _ in entities}
+        cand_entities = {entity for entities in cand_doc.ne_chunks for entity, _ in entities}
+        entity_f1.append(_f1(cand_entities, ref_entities))
+
+        sentences += len(ref_doc.sentences)
+        same_sentences += ref_doc.sentences == cand_doc.sentences
+        for ref_tags, cand_tags in zip(ref_doc.pos_tags, cand_doc.pos_tags):
+            if [w for w, _ in ref_tags] != [w for w, _ in cand_tags]:
+                continue
+            compared += len(ref_tags)
+            tag_matches += sum(_coarse_tag(a) == _coarse_tag(b) for (_, a), (_, b) in zip(ref_tags, cand_tags))
+
+    count = max(len(paragraphs), 1)
+    return {
+        "reference": reference,
+        "candidate": candidate,
+        "key_phrase_f1": sum(phrase_f1) / count,
+        "entity_f1": sum(entity_f1) / count,
+        "coarse_tag_accuracy": tag_matches / compared if compared else 0.0,
+        "tagged_tokens_compared": compared,
+        "same_sentence_split": same_sentences / len(paragraphs) if paragraphs else 0.0,
+        "analysis_speedup": seconds[reference] / seconds[candidate] if seconds[candidate] else 0.0
+    }
+
+# Words inserted into a paragraph to simulate a small revision
+EDIT_WORDS = ["also", "often", "notably", "recently", "largely"]
+
+def edit_workload(paragraphs: List[str], seed: int = 0, backend: Optional[str] = None, edits: int = 3) -> Dict:
+    """Time regenerating revised paragraphs with and without the sentence analysis cache
+
+    Every paragraph is generated once, then ``edits`` times more, each time
+    after inserting one word at a random position, the way a passage is
+    touched up between runs. Only the regenerations are timed. Both
+    generators must produce identical questions.
+    """
+    rng = random.Random(seed)
+    revisions = []
+    for paragraph in paragraphs:
+        versions = [paragraph]
+        for _ in range(edits):
+            words = versions[-1].split(' ')
+            words.insert(rng.randrange(1, len(words) + 1), rng.choice(EDIT_WORDS))
+            versions.append(' '.join(words))
+        revisions.append(versions)
+
+    seconds = {}
+    outputs = {}
+    generators = {
+        "uncached": QuestionGenerator(sentence_cache_size=0, backend=backend),
+        "cached": QuestionGenerator(backend=backend)
+    }
+    for name, generator in generators.items():
+        generator.backend.warm_up()
+        outputs[name] = []
+        seconds[name] = 0.0
+        for versions in revisions:
+            generator.generate_questions(versions[0], seed=seed)
+            for version in versions[1:]:
+                start = time.perf_counter()
+                outputs[name].append(generator.generate_questions(version, seed=seed))
+                seconds[name] += time.perf_counter() - start
+
+    count = max(len(outputs["cached"]), 1)
+    return {
+        "regenerations": len(outputs["cached"]),
+        "uncached_ms": seconds["uncached"] * 1000 / count,
+        "cached_ms": seconds["cached"] * 1000 / count,
+        "speedup": seconds["uncached"] / seconds["cached"] if seconds["cached"] else 0.0,
+        "sentence_cache": generators["cached"].sentence_cache.stats(),
+        "identical": outputs["cached"] == outputs["uncached"]
+    }
+
+def meta_mismatches(current: Dict, baseline: Dict) -> List[str]:
+    """The ``COMPARABLE_META`` fields that differ between two reports"""
+    return [f"{key}: {baseline['meta'].get(key)!r} -> {current['meta'].get(key)!r}"
+            for key in COMPARABLE_META if current["meta"].get(key) != baseline["meta"].get(key)]
+
+def compare_reports(current: Dict, baseline: Dict, tolerance: float, min_delta_ms: float = 0.05) -> List[str]:
+    """List the metrics that regressed by more than ``tolerance`` (a fraction)
+
+    Only medians are gated: throughput, p50 latency, per-stage p50 and peak
+    RSS. p99 latency is printed for information, since one slow call moves
+    it. A metric whose repeats disagreed by more than ``tolerance`` in
+    either report (its ``spread``) is gated on that spread instead, so
+    run-to-run noise on a busy machine is not reported as a regression.
+    Timing differences smaller than ``min_delta_ms`` are treated as
+    noise, so microsecond-scale stages do not fail the comparison on jitter
+    alone. Raises ``ValueError`` when the reports measured a different
+    corpus, backend or flags (see ``meta_mismatches``).
+    """
+    mismatches = meta_mismatches(current, baseline)
+    if mismatches:
+        raise ValueError("baseline is not comparable (" + "; ".join(mismatches) + ")")
+    for key in ENVIRONMENT_META:
+        if current["meta"].get(key) != baseline["meta"].get(key):
+            print(f"  ⚠️  {key} differs: {baseline['meta'].get(key)} -> {current['meta'].get(key)}")
+
+    # Reports saved before spreads were recorded gate on ``tolerance`` alone
+    def spread(report: Dict, name: str) -> float:
+        return report.get("spread", {}).get(name, 0.0)
+
+    checks = [("throughput_pps", current["throughput_pps"], baseline["throughput_pps"], True, True,
+               max(spread(current, "throughput_pps"), spread(baseline, "throughput_pps"))),
+              ("latency_ms.p50", current["latency_ms"]["p50"], baseline["latency_ms"]["p50"], False, True,
+               max(spread(current, "latency_ms.p50"), spread(baseline, "latency_ms.p50"))),
+              ("latency_ms.p99", current["latency_ms"]["p99"], baseline["latency_ms"]["p99"], False, False, 0.0)]
+    for stage, values in baseline["stages"].items():
+        if stage in current["stages"]:
+            checks.append((f"stages.{stage}.p50_ms", current["stages"][stage]["p50_ms"], values["p50_ms"],
+                           False, True, max(current["stages"][stage].get("spread", 0.0), values.get("spread", 0.0))))
+    checks.append(("peak_rss_mb", current["peak_rss_mb"], baseline["peak_rss_mb"], False, True, 0.0))
+
+    regressions = []
+    for name, value, reference, higher_is_better, gated, noise in checks:
+        if reference <= 0:
+            continue
+        change = (value - reference) / reference
+        worse = -change if higher_is_better else change
+        if name.endswith("ms") or name.startswith("latency_ms"):
+            if abs(value - reference) < min_delta_ms:
+                worse = 0.0
+        allowed = max(tolerance, noise)
+        if not gated:
+            status = "info"
+        else:
+            status = "REGRESSION" if worse > allowed else "ok"
+            if noise > tolerance:
+                status += f" (spread {noise:.0%})"
+        print(f"  {name:<50} {reference:>12.3f} -> {value:>12.3f}  ({change:+.1%})  {status}")
+        if gated and worse > allowed:
+            regressions.append(name)
+    return regressions
+
+def print_report(report: Dict):
+    print(f"📊 {report['meta']['paragraphs']} paragraphs")
+    print(f"  throughput: {report['throughput_pps']:.1f} paragraphs/sec")
+    print(f"  latency:    p50 {report['latency_ms']['p50']:.2f} ms, p99 {report['latency_ms']['p99']:.2f} ms")
+    print(f"  peak RSS:   {report['peak_rss_mb']:.1f} MB")
+    for stage, values in report["stages"].items():
+        print(f"  {stage:<40} p50 {values['p50_ms']:>9.3f} ms  p99 {values['p99_ms']:>9.3f} ms")
+    agreement = report.get("backend_agreement")
+    if agreement:
+        print(f"🔬 {agreement['candidate']} vs {agreement['reference']} backend")
+        print(f"  key phrase F1:        {agreement['key_phrase_f1']:.3f}")
+        print(f"  entity F1:            {agreement['entity_f1']:.3f}")
+        print(f"  coarse tag accuracy:  {agreement['coarse_tag_accuracy']:.3f} "
+              f"({agreement['tagged_tokens_compared']} tokens)")
+        print(f"  same sentence split:  {agreement['same_sentence_split']:.1%} of paragraphs")
+        print(f"  analysis speedup:     {agreement['analysis_speedup']:.1f}x")
+    exports = report.get("exports")
+    if exports:
+        print(f"📦 Writers, {next(iter(exports.values()))['rows']} question rows")
+        for name, values in exports.items():
+            print(f"  {name:<24} {values['rows_per_sec']:>12,.0f} rows/sec  {values['mb']:>8.2f} MB")
+    edits = report.get("edit_workload")
+    if edits:
+        print(f"✏️  {edits['regenerations']} regenerations of edited paragraphs")
+        print(f"  without sentence cache: {edits['uncached_ms']:.2f} ms each")
+        print(f"  with sentence cache:    {edits['cached_ms']:.2f} ms each ({edits['speedup']:.1f}x)")
+        print(f"  sentence cache hit rate: {edits['sentence_cache']['hit_rate']:.1%}")
+        print(f"  identical questions:    {'yes' if edits['identical'] else 'NO'}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the question generation pipeline")
+    parser.add_argument('--size', choices=sorted(CORPUS_SIZES), default='chapter', help="Synthetic corpus size")
+    parser.add_argument('--paragraphs', type=int, default=None, help="Synthetic corpus size in paragraphs")
+    parser.add_argument('--corpus', default=None, help="Benchmark a real text file instead")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=3,
+                        help="Runs of each pass and writer; medians are reported and their spread widens the gate")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=None, help="NLP backend to benchmark")
+    parser.add_argument('--compare-backend', choices=sorted(BACKENDS), default=None,
+                        help="Reference backend to measure the benchmarked one's agreement with")
+    parser.add_argument('--exports', type=int, default=0, metavar='SCALE',
+                        help="Also compare writer throughput on the results repeated SCALE times")
+    parser.add_argument('--edit-workload', action='store_true',
+                        help="Also time regenerating edited paragraphs with and without the sentence cache")
+    parser.add_argument('--output', default=None, help="Write the JSON report here")
+    parser.add_argument('--baseline', default=None, help="Compare against this JSON baseline")
+    parser.add_argument('--save-baseline', action='store_true', help="Store the report as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed regression as a fraction; noisier metrics get their spread")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help="Ignore timing changes below this")
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        paragraphs = [p for p in iter_paragraphs(args.corpus) if len(p) >= 50]
+    else:
+        paragraphs = synthetic_corpus(args.paragraphs or CORPUS_SIZES[args.size], args.seed)
+
+    report = run_benchmark(paragraphs, args.seed, args.backend, args.exports, args.repeats)
+    report["meta"]["corpus"] = args.corpus or f"synthetic:{args.paragraphs or args.size}"
+    # Extra workloads run in the same process and raise its peak RSS
+    report["meta"]["flags"] = {"exports": args.exports, "compare_backend": args.compare_backend,
+                               "edit_workload": args.edit_workload, "repeats": args.repeats}
+    if args.compare_backend:
+        report["backend_agreement"] = backend_agreement(paragraphs, args.compare_backend, report["meta"]["backend"])
+    if args.edit_workload:
+        report["edit_workload"] = edit_workload(paragraphs, args.seed, report["meta"]["backend"])
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        print(f"\n🔍 Comparing against {args.baseline} (tolerance {args.tolerance:.0%})")
+        try:
+            regressions = compare_reports(report, baseline, args.tolerance, args.min_delta_ms)
+        except ValueError as e:
+            print(f"❌ Cannot compare: {e}. Save a new baseline with these settings.")
+            return 2
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+        print("✅ No regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import re
+import threading
+import zlib
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Hashed feature space of the sentence vectors
+DEFAULT_DIM = 512
+
+# Candidates at least this similar to the answer are near-copies, not distractors
+MAX_SIMILARITY = 0.95
+
+_WORD = re.compile(r'\w+')
+
+@lru_cache(maxsize=65536)
+def _word_features(word: str) -> Tuple[int, Tuple[int, ...]]:
+    """CRC32 of a word and of its character trigrams; words repeat, so this is memoized"""
+    padded = f"<{word}>"
+    trigrams = tuple(zlib.crc32(padded[i:i + 3].encode('utf-8')) for i in range(len(padded) - 2))
+    return zlib.crc32(word.encode('utf-8')), trigrams
+
+def _feature_hashes(sentence: str) -> List[int]:
+    """Hashes of the word unigrams and bigrams plus character trigrams of each word"""
+    hashes = []
+    previous = None
+    for word in _WORD.findall(sentence.lower()):
+        word_hash, trigrams = _word_features(word)
+        hashes.append(word_hash)
+        hashes.extend(trigrams)
+        if previous is not None:
+            # Bigrams combine the two word hashes instead of hashing the pair again
+            hashes.append((previous * 0x01000193 ^ word_hash) & 0xFFFFFFFF)
+        previous = word_hash
+    return hashes
+
+def embed_sentences(sentences: Sequence[str], dim: int = DEFAULT_DIM) -> np.ndarray:
+    """L2-normalized hashed n-gram vectors, one float32 row per sentence
+
+    Each feature is hashed with CRC32 into one of ``dim`` columns with a
+    hash-derived sign, so no model or vocabulary is needed and every
+    process computes identical vectors.
+    """
+    rows, hashes = [], []
+    for row, sentence in enumerate(sentences):
+        features = _feature_hashes(sentence)
+        hashes.extend(features)
+        rows.extend([row] * len(features))
+    hashes = np.asarray(hashes, dtype=np.uint32)
+    signs = np.where(hashes & np.uint32(0x80000000), 1.0, -1.0).astype(np.float32)
+    cells = np.asarray(rows, dtype=np.intp) * dim + (hashes % dim).astype(np.intp)
+    vectors = np.bincount(cells, weights=signs, minlength=len(sentences) * dim)
+    vectors = vectors.astype(np.float32).reshape(len(sentences), dim)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+def select_distractors(vectors: np.ndarray, answer_id: int, candidate_ids: Sequence[int], k: int = 3,
+                       max_similarity: float = MAX_SIMILARITY) -> List[int]:
+    """The ``k`` candidates most similar to the answer sentence, best first
+
+    Similar sentences make plausible options; near-copies above
+    ``max_similarity`` are skipped. Ties keep document order.
+    """
+    if not len(candidate_ids) or k <= 0:
+        return []
+    candidate_ids = np.asarray(candidate_ids, dtype=np.intp)
+    similarities = vectors[candidate_ids] @ vectors[answer_id]
+    order = np.argsort(-similarities, kind='stable')
+    order = order[similarities[order] < max_similarity]
+    return candidate_ids[order[:k]].tolist()
+
+class DistractorIndex:
+    """Cross-document pool of sentence vectors for paragraphs too short to supply options
+
+    Holds at most ``capacity`` distinct sentences, replacing the oldest once
+    full. Lookups are one matrix-vector product. Thread-safe.
+
+    Options drawn from it depend on what was indexed before, so results are
+    only reproducible for the same sequence of paragraphs.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM, capacity: int = 50000):
+        self.dim = dim
+        self.capacity = capacity
+        self.vectors = np.zeros((min(capacity, 1024), dim), dtype=np.float32)
+        self.sentences: List[str] = []
+        self._positions = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.sentences)
+
+    def add(self, sentences: Iterable[str], vectors: Optional[np.ndarray] = None):
+        """Index sentences (over 20 characters); pass their vectors if already computed"""
+        sentences = list(sentences)
+        if vectors is None:
+            vectors = embed_sentences(sentences, self.dim)
+        with self._lock:
+            for sentence, vector in zip(sentences, vectors):
+                if len(sentence) <= 20 or sentence in self._positions:
+                    continue
+                position = self._next
+                self._next = (self._next + 1) % self.capacity
+                if position == len(self.sentences):
+                    if position == len(self.vectors):
+                        grown = np.zeros((min(self.capacity, 2 * len(self.vectors)), self.dim), dtype=np.float32)
+                        grown[:position] = self.vectors
+                        self.vectors = grown
+                    self.sentences.append(sentence)
+                else:
+                    del self._positions[self.sentences[position]]
+                    self.sentences[position] = sentence
+                self.vectors[position] = vector
+                self._positions[sentence] = position
+
+    def nearest(self, vector: np.ndarray, k: int, exclude: Callable[[str], bool],
+                max_similarity: float = MAX_SIMILARITY) -> List[str]:
+        """Up to ``k`` indexed sentences most similar to ``vector``, skipping those ``exclude`` flags"""
+        with self._lock:
+            count = len(self.sentences)
+            if not count or k <= 0:
+                return []
+            similarities = self.vectors[:count] @ vector
+            # Only sort a shortlist; exclusions rarely need more than a few extra candidates
+            shortlist = min(count, 4 * k + 16)
+            top = np.argpartition(-similarities, shortlist - 1)[:shortlist]
+            top = top[np.lexsort((top, -similarities[top]))]
+            results = []
+            for position in top:
+                sentence = self.sentences[position]
+                if similarities[position] < max_similarity and not exclude(sentence):
+                    results.append(sentence)
+                    if len(results) == k:
+                        break
+            return results
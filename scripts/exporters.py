@@ -0,0 +1,295 @@
+import csv
+import gzip
+import io
+import json
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import numpy as np
+
+# Rows buffered before a bulk write
+BATCH_ROWS = 8192
+
+class QuestionRow(NamedTuple):
+    """One generated question as a flat, typed record
+
+    ``options`` and ``correct_answer_index`` are only set for multiple choice
+    questions (``()`` and ``-1`` otherwise); ``answer`` is empty for open
+    questions.
+    """
+    paragraph_id: str
+    question_type: str
+    question: str
+    options: Tuple[str, ...]
+    answer: str
+    correct_answer_index: int
+    marks: int
+
+FIELDS = QuestionRow._fields
+
+def question_rows(para_id: str, data: Dict) -> Iterator[QuestionRow]:
+    """Flatten one processed paragraph (``{"text", "questions"}``) into question rows"""
+    if 'questions' not in data:
+        return
+    for question_type, questions in data['questions'].items():
+        if question_type == "Key Phrases Identified" or question_type == "error":
+            continue
+        for q in questions:
+            if isinstance(q, str):
+                # Results saved before questions carried marks
+                yield QuestionRow(para_id, question_type, q, (), '', -1, 0)
+                continue
+            options = q.get('options')
+            if options is not None:
+                index = q['correct_answer_index']
+                yield QuestionRow(para_id, question_type, q['question'], tuple(options), options[index],
+                                  index, q.get('marks', 0))
+            else:
+                yield QuestionRow(para_id, question_type, q['question'], (), q.get('answer', ''), -1,
+                                  q.get('marks', 0))
+
+def compression_for(path: str) -> Optional[str]:
+    """Compression implied by a file name: ``.gz`` is gzip, ``.zst`` is zstd"""
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        return 'zstd'
+    return None
+
+def open_output(path: str, compression: Optional[str] = None) -> BinaryIO:
+    """Open a binary output stream, compressing with gzip or zstd (needs ``zstandard``)"""
+    if compression is None:
+        return open(path, 'wb', buffering=1024 * 1024)
+    if compression == 'gzip':
+        # Level 6 compresses nearly as well as the default 9 at several times the speed
+        return gzip.open(path, 'wb', compresslevel=6)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd compression needs the zstandard package (pip install zstandard)") from None
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'))
+    raise ValueError(f"Unknown compression {compression!r}; expected 'gzip' or 'zstd'")
+
+class Exporter:
+    """Writes the flat question rows of processed paragraphs in bulk
+
+    Has the ``write(para_id, data)`` interface of ``JsonLinesWriter``, so it
+    can be passed to ``BatchQuestionProcessor.process_stream``. Rows are
+    buffered and written ``batch_rows`` at a time; unlike ``JsonLinesWriter``
+    nothing is flushed per paragraph, so the output is only complete once
+    ``close`` has run (use it as a context manager).
+    """
+
+    def __init__(self, path: str, compression: Optional[str] = None, batch_rows: int = BATCH_ROWS):
+        self.path = path
+        self.compression = compression
+        self.batch_rows = batch_rows
+        self.rows: List[QuestionRow] = []
+        self.count = 0
+
+    def write(self, para_id: str, data: Dict):
+        self.write_rows(question_rows(para_id, data))
+
+    def write_rows(self, rows: Iterable[QuestionRow]):
+        self.rows.extend(rows)
+        if len(self.rows) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self._write_batch(self.rows)
+            self.count += len(self.rows)
+            self.rows = []
+
+    def close(self):
+        self.flush()
+
+    def _write_batch(self, rows: List[QuestionRow]):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Shared encoder; rows are flat, so the circular-reference check is skipped
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, check_circular=False)
+
+class JsonlExporter(Exporter):
+    """One JSON object per question row, optionally gzip or zstd compressed"""
+
+    def __init__(self, path: str, compression: Optional[str] = None, batch_rows: int = BATCH_ROWS):
+        super().__init__(path, compression, batch_rows)
+        self.stream = open_output(path, compression)
+
+    def _write_batch(self, rows: List[QuestionRow]):
+        # One encoder call per batch; rows are then split apart where one object ends and the
+        # next begins. '{"' cannot occur inside an encoded string, where every quote is escaped
+        encoded = _JSON_ENCODER.encode([dict(zip(FIELDS, row)) for row in rows])
+        lines = encoded[1:-1].replace('}, {"paragraph_id": ', '}\n{"paragraph_id": ')
+        self.stream.write((lines + '\n').encode('utf-8'))
+
+    def close(self):
+        super().close()
+        self.stream.close()
+
+class CsvExporter(Exporter):
+    """Question rows as CSV, options joined with ``" | "``, optionally compressed"""
+
+    def __init__(self, path: str, compression: Optional[str] = None, batch_rows: int = BATCH_ROWS):
+        super().__init__(path, compression, batch_rows)
+        self.stream = io.TextIOWrapper(open_output(path, compression), encoding='utf-8', newline='')
+        self.writer = csv.writer(self.stream)
+        self.writer.writerow(FIELDS)
+
+    def _write_batch(self, rows: List[QuestionRow]):
+        self.writer.writerows([(para_id, question_type, question, " | ".join(options), answer, index, marks)
+                               for para_id, question_type, question, options, answer, index, marks in rows])
+
+    def close(self):
+        super().close()
+        self.stream.close()
+
+class ParquetExporter(Exporter):
+    """Question rows as a Parquet file, one row group per batch (needs ``pyarrow``)
+
+    ``compression`` is the Parquet codec, e.g. ``'zstd'`` (default
+    ``'snappy'``); ``'gzip'`` works as well.
+    """
+
+    def __init__(self, path: str, compression: Optional[str] = None, batch_rows: int = 65536):
+        super().__init__(path, compression, batch_rows)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self.schema = pa.schema([
+            ('paragraph_id', pa.string()),
+            ('question_type', pa.string()),
+            ('question', pa.string()),
+            ('options', pa.list_(pa.string())),
+            ('answer', pa.string()),
+            ('correct_answer_index', pa.int32()),
+            ('marks', pa.int16())
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, compression=compression or 'snappy')
+
+    def _write_batch(self, rows: List[QuestionRow]):
+        columns = list(zip(*rows))
+        columns[FIELDS.index('options')] = [list(options) for options in columns[FIELDS.index('options')]]
+        self.writer.write_table(self._pa.table(
+            [self._pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema))
+
+    def close(self):
+        super().close()
+        self.writer.close()
+
+def _string_column(values: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """UTF-8 bytes of every value back to back, plus ``len + 1`` int64 offsets"""
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+class NpzExporter(Exporter):
+    """Question rows as NumPy column arrays in one ``.npz`` archive, no extra dependencies
+
+    String columns use the Arrow layout: a ``uint8`` array of UTF-8 bytes
+    (``<name>``) and ``int64`` offsets (``<name>_offsets``). ``options`` is a
+    string column of every option with ``options_rows`` offsets per question.
+    Each batch is encoded to compact arrays straight away, but the archive
+    can only be written at ``close``, so the encoded columns stay in memory
+    until then. Any ``compression`` uses ``np.savez_compressed``.
+    """
+
+    STRING_FIELDS = ('paragraph_id', 'question_type', 'question', 'answer')
+
+    def __init__(self, path: str, compression: Optional[str] = None, batch_rows: int = BATCH_ROWS):
+        super().__init__(path, compression, batch_rows)
+        self.chunks: Dict[str, List] = {field: [] for field in FIELDS}
+
+    def _write_batch(self, rows: List[QuestionRow]):
+        columns = dict(zip(FIELDS, zip(*rows)))
+        for field in self.STRING_FIELDS:
+            self.chunks[field].append(_string_column(columns[field]))
+        option_counts = [len(options) for options in columns['options']]
+        self.chunks['options'].append((_string_column(option for options in columns['options'] for option in options),
+                                       np.asarray(option_counts, dtype=np.int64)))
+        self.chunks['correct_answer_index'].append(np.asarray(columns['correct_answer_index'], dtype=np.int32))
+        self.chunks['marks'].append(np.asarray(columns['marks'], dtype=np.int16))
+
+    @staticmethod
+    def _join_strings(chunks: List[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+        data = [chunk for chunk, _ in chunks]
+        offsets = [np.zeros(1, dtype=np.int64)]
+        base = 0
+        for chunk, chunk_offsets in chunks:
+            offsets.append(chunk_offsets[1:] + base)
+            base += len(chunk)
+        return np.concatenate(data) if data else np.zeros(0, dtype=np.uint8), np.concatenate(offsets)
+
+    def close(self):
+        super().close()
+        arrays = {}
+        for field in self.STRING_FIELDS:
+            arrays[field], arrays[field + '_offsets'] = self._join_strings(self.chunks[field])
+        arrays['options'], arrays['options_offsets'] = self._join_strings([strings for strings, _ in self.chunks['options']])
+        counts = [counts for _, counts in self.chunks['options']]
+        arrays['options_rows'] = np.zeros(self.count + 1, dtype=np.int64)
+        if counts:
+            np.cumsum(np.concatenate(counts), out=arrays['options_rows'][1:])
+        for field, dtype in (('correct_answer_index', np.int32), ('marks', np.int16)):
+            arrays[field] = np.concatenate(self.chunks[field]) if self.chunks[field] else np.zeros(0, dtype=dtype)
+        with open(self.path, 'wb') as file:
+            (np.savez_compressed if self.compression else np.savez)(file, **arrays)
+
+def _decode_strings(data: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = data.tobytes()
+    return [raw[start:end].decode('utf-8') for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+def read_npz_rows(path: str) -> List[QuestionRow]:
+    """Load an ``NpzExporter`` archive back into question rows"""
+    with np.load(path) as arrays:
+        strings = {field: _decode_strings(arrays[field], arrays[field + '_offsets'])
+                   for field in NpzExporter.STRING_FIELDS}
+        options = _decode_strings(arrays['options'], arrays['options_offsets'])
+        bounds = arrays['options_rows'].tolist()
+        return [QuestionRow(strings['paragraph_id'][i], strings['question_type'][i], strings['question'][i],
+                            tuple(options[bounds[i]:bounds[i + 1]]), strings['answer'][i],
+                            int(index), int(marks))
+                for i, (index, marks) in enumerate(zip(arrays['correct_answer_index'], arrays['marks']))]
+
+def columnar_exporter(path: str, compression: Optional[str] = None, batch_rows: int = 65536) -> Exporter:
+    """Parquet when ``pyarrow`` is installed, otherwise the ``.npz`` fallback"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return NpzExporter(path, compression, batch_rows)
+    return ParquetExporter(path, compression, batch_rows)
+
+EXPORTERS: Dict[str, Callable[..., Exporter]] = {
+    'jsonl': JsonlExporter,
+    'csv': CsvExporter,
+    'parquet': ParquetExporter,
+    'npz': NpzExporter,
+    'columnar': columnar_exporter
+}
+
+def register_exporter(name: str, factory: Callable[..., Exporter]):
+    """Make ``factory(path, compression)`` available as export format ``name``"""
+    EXPORTERS[name] = factory
+
+def get_exporter(output_format: str, path: str, compression: Optional[str] = None) -> Exporter:
+    """An exporter for ``path``; JSONL and CSV compression defaults to the file extension"""
+    if output_format not in EXPORTERS:
+        raise ValueError(f"Unknown export format {output_format!r}; choose from {', '.join(sorted(EXPORTERS))}")
+    if compression is None and output_format in ('jsonl', 'csv'):
+        compression = compression_for(path)
+    return EXPORTERS[output_format](path, compression)
+
+def export_results(results: Iterable[Tuple[str, Dict]], exporter: Exporter) -> int:
+    """Write ``(paragraph_id, result)`` pairs through ``exporter`` and close it; returns the row count"""
+    with exporter:
+        for para_id, data in results:
+            exporter.write(para_id, data)
+    return exporter.count
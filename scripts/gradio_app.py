@@ -1,67 +1,151 @@
 import gradio as gr
-import json
-from question_generator import QuestionGenerator, download_nltk_data
+import os
+from question_generator import QUESTION_CATEGORIES, QuestionGenerator, download_nltk_data, models_offline, warm_up
+from result_cache import LRUResultCache
+from nlp_backends import get_backend
+from distractors import DistractorIndex
+from question_bank import QuestionBank
+from ingest import split_text
 
 print("Starting the Gradio application...")
 
-# Ensure NLTK data is available before starting
-print("Checking for NLTK data...")
-download_nltk_data()
-print("NLTK data check complete.")
+# QG_BACKEND=fast needs no NLTK data at all
+backend = get_backend()
+
+# Ensure NLTK data is available before starting (skipped when QG_NLTK_OFFLINE=1)
+if backend.name == "nltk" and not models_offline():
+    print("Checking for NLTK data...")
+    download_nltk_data()
+    print("NLTK data check complete.")
+
+# Load the models now so the first request does not pay for them
+warm_up(backend)
 
 # Instantiate the generator once to load models, etc.
 print("Initializing Question Generator...")
-generator = QuestionGenerator()
+# Seeded requests for the same passage are served from an in-memory cache
+result_cache = LRUResultCache(maxsize=2048, ttl=3600)
+# With QG_CROSS_DOCUMENT_DISTRACTORS=1 short unseeded passages borrow MCQ options from passages seen earlier
+cross_document = os.environ.get("QG_CROSS_DOCUMENT_DISTRACTORS", "") not in ("", "0")
+generator = QuestionGenerator(cache=result_cache, backend=backend,
+                              distractor_index=DistractorIndex() if cross_document else None)
 print("Question Generator initialized.")
+# Every generated set is kept in a searchable question bank (QG_BANK picks the file)
+bank = QuestionBank(os.environ.get("QG_BANK", "question_bank.db"))
+
+# At most QG_CONCURRENCY requests run at once on a bounded worker pool; QG_QUEUE_SIZE more may wait
+CONCURRENCY = int(os.environ.get("QG_CONCURRENCY", "4"))
+QUEUE_SIZE = int(os.environ.get("QG_QUEUE_SIZE", "64"))
+# Paragraphs accepted by one batch request
+MAX_BATCH_PARAGRAPHS = int(os.environ.get("QG_BATCH_PARAGRAPHS", "100"))
 
-def format_questions(questions_dict):
-    """Formats the generated questions for display in Markdown."""
-    output = ""
-    for category, question_list in questions_dict.items():
-        if category == "Key Phrases Identified":
-            continue # We can display these differently if needed, or just omit them for now
+def format_question(i, category, q):
+    """Formats one question as Markdown lines."""
+    lines = [f"**{i}. {q['question']}** ({q['marks']} marks)"]
+    if category == "Multiple Choice Questions":
+        lines.extend(f"   - {chr(97+j)}) {option}" for j, option in enumerate(q['options']))
+        lines.append(f"   - **Correct Answer:** {chr(97+q['correct_answer_index'])})")
+    elif category == "Fill in the Blank Questions":
+        lines.append(f"   - **Answer:** {q['answer']}")
+    return "\n".join(lines) + "\n\n"
 
-        output += f"### {category}\n"
-        output += "---\n"
+def format_questions(questions_dict, pending=()):
+    """Formats the generated questions for display in Markdown.
 
+    Categories named in ``pending`` are shown as still being generated.
+    """
+    if "error" in questions_dict:
+        return f"_{questions_dict['error'][0]}_\n"
+    parts = []
+    for category in QUESTION_CATEGORIES:
+        if category in pending:
+            parts.append(f"### {category}\n---\n_Generating..._\n\n")
+            continue
+        question_list = questions_dict.get(category)
+        if question_list is None:
+            continue
+        parts.append(f"### {category}\n---\n")
         if not question_list:
-            output += "_No questions generated for this category._\n\n"
+            parts.append("_No questions generated for this category._\n\n")
             continue
+        parts.extend(format_question(i, category, q) for i, q in enumerate(question_list, 1))
+    return "".join(parts)
 
-        if category == "Multiple Choice Questions":
-            for i, q in enumerate(question_list, 1):
-                output += f"**{i}. {q['question']}** ({q['marks']} marks)\n"
-                for j, option in enumerate(q['options']):
-                    output += f"   - {chr(97+j)}) {option}\n"
-                output += f"   - **Correct Answer:** {chr(97+q['correct_answer_index'])})\n\n"
-        elif category == "Fill in the Blank Questions":
-            for i, q in enumerate(question_list, 1):
-                output += f"**{i}. {q['question']}** ({q['marks']} marks)\n"
-                output += f"   - **Answer:** {q['answer']}\n\n"
-        else:
-            for i, q in enumerate(question_list, 1):
-                output += f"**{i}. {q['question']}** ({q['marks']} marks)\n\n"
-    return output
-
-def generate_questions_from_text(paragraph):
+def generate_questions_from_text(paragraph, seed=None):
     """
-    Takes a paragraph of text and returns a formatted string of questions.
+    Takes a paragraph of text and streams formatted questions as each category finishes.
+    A seed makes the questions reproducible and lets repeats hit the question bank.
     """
     if not paragraph or len(paragraph.strip()) < 50:
-        return "Please enter a paragraph with at least 50 characters."
+        yield "Please enter a paragraph with at least 50 characters."
+        return
         
-    # Generate questions using the existing generator
-    questions = generator.generate_questions(paragraph)
+    # Seeded passages already in the question bank are served without running the pipeline
+    seed = int(seed) if seed is not None else None
+    settings = generator.settings_fingerprint()
+    questions = bank.get(paragraph, seed, settings) if seed is not None else None
+    if questions is not None:
+        yield format_questions(questions)
+        return
     
-    # Format the questions for display
-    formatted_output = format_questions(questions)
+    # Comprehension questions arrive first, the tagger-heavy ones as they finish;
+    # seeded repeats come straight from the result cache
+    for questions in generator.iter_questions(paragraph, seed=seed):
+        pending = [category for category in QUESTION_CATEGORIES if category not in questions]
+        yield format_questions(questions, pending)
+    bank.add(paragraph, questions, "gradio", seed, settings)
+
+def generate_batch(text, seed=None):
+    """
+    Generates questions for every blank-line separated paragraph in one batched call.
+    """
+    paragraphs = split_text(text or "")
+    if not paragraphs:
+        return "Please enter one or more paragraphs separated by blank lines."
+    if len(paragraphs) > MAX_BATCH_PARAGRAPHS:
+        return f"Please enter at most {MAX_BATCH_PARAGRAPHS} paragraphs per batch."
     
-    return formatted_output
+    seed = int(seed) if seed is not None else None
+    # One bulk tagging pass covers the whole batch
+    results = generator.generate_questions_many(paragraphs, seed=seed)
+    bank.add_many([(paragraph, questions, "gradio") for paragraph, questions in zip(paragraphs, results)],
+                  seed, generator.settings_fingerprint())
+    return "".join(f"## Paragraph {i}\n\n{format_questions(questions)}"
+                   for i, questions in enumerate(results, 1))
+
+def format_row(i, row):
+    """Formats one question bank row as Markdown lines."""
+    lines = [f"**{i}. {row.question}** ({row.question_type}, {row.marks} marks)"]
+    lines.extend(f"   - {chr(97+j)}) {option}" for j, option in enumerate(row.options))
+    if row.answer:
+        lines.append(f"   - **Answer:** {row.answer}")
+    return "\n".join(lines) + "\n\n"
+
+def format_rows(rows):
+    """Formats question bank rows for display in Markdown."""
+    return "".join(format_row(i, row) for i, row in enumerate(rows, 1))
+
+def search_bank(query, phrase_only=False):
+    """Finds stored questions by full-text query or by key phrase."""
+    if not query or not query.strip():
+        return "Please enter a search query or key phrase."
+    rows = bank.questions_for_phrase(query.strip()) if phrase_only else bank.search(query.strip())
+    return format_rows(rows) if rows else "_No stored questions match._"
+
+def assemble_exam(total_marks, seed=None):
+    """Builds an exam paper worth up to the given marks from the question bank."""
+    rows = bank.assemble_exam(int(total_marks or 0), seed=int(seed) if seed is not None else None)
+    if not rows:
+        return "_The question bank has no questions that fit this budget yet._"
+    return f"### Exam paper: {sum(row.marks for row in rows)} marks\n\n" + format_rows(rows)
 
 # Create the Gradio interface
-iface = gr.Interface(
+generate_tab = gr.Interface(
     fn=generate_questions_from_text,
-    inputs=gr.Textbox(lines=10, placeholder="Enter a paragraph here...", label="Input Text"),
+    inputs=[
+        gr.Textbox(lines=10, placeholder="Enter a paragraph here...", label="Input Text"),
+        gr.Number(value=None, precision=0, label="Seed (optional, for reproducible questions)")
+    ],
     outputs=gr.Markdown(label="Generated Questions"),
     title="📝 AI Question Generator",
     description="Enter a paragraph of text (at least 50 characters) to generate various types of questions. The model will produce factual, analytical, multiple-choice, and other question types based on the input.",
@@ -69,5 +153,54 @@ iface = gr.Interface(
     theme="soft"
 )
 
+batch_tab = gr.Interface(
+    fn=generate_batch,
+    inputs=[
+        gr.Textbox(lines=15, placeholder="Paste several paragraphs, separated by blank lines...", label="Input Text"),
+        gr.Number(value=None, precision=0, label="Seed (optional, for reproducible questions)")
+    ],
+    outputs=gr.Markdown(label="Generated Questions"),
+    description=f"Generate questions for up to {MAX_BATCH_PARAGRAPHS} paragraphs at once; they are analyzed together in one pass.",
+    allow_flagging="never"
+)
+
+bank_tab = gr.Interface(
+    fn=search_bank,
+    inputs=[
+        gr.Textbox(lines=1, placeholder="e.g. renewable energy, or solar OR wind", label="Search"),
+        gr.Checkbox(value=False, label="Match a key phrase exactly")
+    ],
+    outputs=gr.Markdown(label="Stored Questions"),
+    description="Search every question generated so far, without running the pipeline again.",
+    allow_flagging="never"
+)
+
+exam_tab = gr.Interface(
+    fn=assemble_exam,
+    inputs=[
+        gr.Number(value=50, precision=0, label="Total marks"),
+        gr.Number(value=None, precision=0, label="Seed (optional)")
+    ],
+    outputs=gr.Markdown(label="Exam Paper"),
+    description="Assemble an exam paper from the question bank within a marks budget.",
+    allow_flagging="never"
+)
+
+iface = gr.TabbedInterface([generate_tab, batch_tab, bank_tab, exam_tab],
+                           ["Generate", "Batch", "Question Bank", "Exam Paper"],
+                           title="📝 AI Question Generator", theme="soft")
+
+def configure_queue(app):
+    """Queues requests so only CONCURRENCY run at once and at most QUEUE_SIZE wait."""
+    try:
+        return app.queue(default_concurrency_limit=CONCURRENCY, max_size=QUEUE_SIZE)
+    except TypeError:
+        # Gradio 3 names the limit concurrency_count
+        return app.queue(concurrency_count=CONCURRENCY, max_size=QUEUE_SIZE)
+
+# Streaming output needs the queue
+configure_queue(iface)
+
 if __name__ == "__main__":
-    iface.launch(server_port=7861)
+    # The worker thread pool is bounded to the same concurrency
+    iface.launch(server_port=7861, max_threads=CONCURRENCY)
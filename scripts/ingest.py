@@ -0,0 +1,202 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from result_cache import LRUCache, normalize_text
+
+# Results of recent first occurrences kept for later copies; older copies are generated again
+DEDUP_RESULTS = 4096
+
+# A splitter turns the decoded contents of one file into paragraphs
+Splitter = Callable[[str], List[str]]
+
+def split_text(text: str) -> List[str]:
+    """Blank-line separated paragraphs, exactly like ``iter_paragraphs``"""
+    paragraphs = (paragraph.strip() for paragraph in text.replace('\r\n', '\n').split('\n\n'))
+    return [paragraph for paragraph in paragraphs if paragraph]
+
+_MD_FENCE = re.compile(r'^(```|~~~).*?^\1[^\n]*$', re.MULTILINE | re.DOTALL)
+_MD_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+_MD_IMAGE = re.compile(r'!\[[^\]]*\]\([^)]*\)')
+_MD_LINK = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+_MD_EMPHASIS = re.compile(r'(\*\*|__|\*|_|`)(?=\S)(.+?)(?<=\S)\1')
+_MD_LINE_PREFIX = re.compile(r'^\s*(?:>\s?)*(?:[-*+]\s+|\d+[.)]\s+)?')
+
+def split_markdown(text: str) -> List[str]:
+    """Prose paragraphs of a Markdown file
+
+    Code blocks, headings, tables, comments and images are dropped; links
+    keep their text and emphasis markers are removed.
+    """
+    text = _MD_COMMENT.sub('', _MD_FENCE.sub('', text))
+    paragraphs = []
+    for block in split_text(text):
+        lines = []
+        for line in block.splitlines():
+            stripped = line.strip()
+            if stripped.startswith('#') or stripped.startswith('|') or set(stripped) <= set('-=*_ '):
+                continue
+            line = _MD_LINE_PREFIX.sub('', line)
+            line = _MD_EMPHASIS.sub(r'\2', _MD_LINK.sub(r'\1', _MD_IMAGE.sub('', line)))
+            lines.append(line.strip())
+        paragraph = ' '.join(line for line in lines if line)
+        if paragraph:
+            paragraphs.append(paragraph)
+    return paragraphs
+
+# Fields holding the prose of a JSON Lines record, tried in order
+JSONL_TEXT_FIELDS = ('text', 'content', 'body', 'paragraph')
+
+def split_jsonl(text: str) -> List[str]:
+    """Paragraphs of the text field of every JSON Lines record; bad lines are skipped"""
+    paragraphs = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, str):
+            paragraphs.extend(split_text(record))
+        elif isinstance(record, dict):
+            for field in JSONL_TEXT_FIELDS:
+                if isinstance(record.get(field), str):
+                    paragraphs.extend(split_text(record[field]))
+                    break
+    return paragraphs
+
+SPLITTERS: Dict[str, Splitter] = {
+    '.txt': split_text,
+    '.text': split_text,
+    '.md': split_markdown,
+    '.markdown': split_markdown,
+    '.jsonl': split_jsonl,
+    '.ndjson': split_jsonl
+}
+
+def register_splitter(extension: str, splitter: Splitter):
+    """Use ``splitter`` for files ending in ``extension`` (e.g. ``'.rst'``)"""
+    SPLITTERS[extension.lower()] = splitter
+
+def splitter_for(path: str) -> Optional[Splitter]:
+    return SPLITTERS.get(os.path.splitext(path)[1].lower())
+
+def read_text(path: str) -> str:
+    """Decode a UTF-8 file"""
+    with open(path, 'rb') as file:
+        return file.read().decode('utf-8')
+
+def read_paragraphs(path: str) -> List[str]:
+    """Split one file with the splitter registered for its extension, blank lines otherwise"""
+    return (splitter_for(path) or split_text)(read_text(path))
+
+def find_files(pattern: str) -> List[str]:
+    """Files matched by a glob (``**`` recurses) or under a directory, that have a splitter
+
+    Sorted, so paragraph IDs are stable from run to run.
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '**', '*')
+    return sorted(path for path in glob.glob(pattern, recursive=True)
+                  if os.path.isfile(path) and splitter_for(path) is not None)
+
+def iter_file_paragraphs(paths: Iterable[str], read_workers: int = 8) -> Iterator[Tuple[str, List[str]]]:
+    """Yield ``(path, paragraphs)`` per file, in order, reading files on a thread pool
+
+    File reads and decoding overlap on the pool; at most ``2 * read_workers``
+    files are held in memory at once. A file that cannot be read or is not
+    UTF-8 is reported on stderr and skipped, so one bad file does not stop
+    the run.
+    """
+    def result(path, future):
+        try:
+            return future.result()
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Skipped {path}: {e}", file=sys.stderr)
+            return None
+    
+    paths = iter(paths)
+    with ThreadPoolExecutor(max_workers=max(read_workers, 1)) as executor:
+        pending = deque()
+        for path in paths:
+            pending.append((path, executor.submit(read_paragraphs, path)))
+            if len(pending) >= read_workers * 2:
+                path, future = pending.popleft()
+                paragraphs = result(path, future)
+                if paragraphs is not None:
+                    yield path, paragraphs
+        while pending:
+            path, future = pending.popleft()
+            paragraphs = result(path, future)
+            if paragraphs is not None:
+                yield path, paragraphs
+
+class ParagraphDeduplicator:
+    """Recognizes paragraphs whose normalized text was already seen in any earlier file
+
+    ``first_or_copy`` tells a first occurrence from a copy that can reuse
+    its result; ``resolve`` records each first occurrence's result and
+    ``take`` hands it to a copy. A result is held while copies of it are
+    queued, and the ``keep`` most recent ones stay for copies further on;
+    a copy of an older paragraph counts as a first occurrence again.
+    """
+
+    def __init__(self, keep: int = DEDUP_RESULTS):
+        self.seen = set()
+        self.recent = LRUCache(maxsize=keep)
+        # Keys of first occurrences whose result is not known yet
+        self.pending = set()
+        # Results promised to queued copies, and how many copies wait for each
+        self.pinned: Dict[bytes, Any] = {}
+        self.waiting: Dict[bytes, int] = {}
+
+    @staticmethod
+    def key(paragraph: str) -> bytes:
+        return hashlib.sha256(normalize_text(paragraph).encode('utf-8')).digest()
+
+    def is_new(self, paragraph: str) -> bool:
+        digest = self.key(paragraph)
+        if digest in self.seen:
+            return False
+        self.seen.add(digest)
+        return True
+
+    def first_or_copy(self, paragraph: str) -> Tuple[bytes, bool]:
+        """The paragraph's key, and whether it is a copy whose result will come from ``take``"""
+        digest = self.key(paragraph)
+        if digest not in self.seen:
+            self.seen.add(digest)
+            self.pending.add(digest)
+            return digest, False
+        if digest not in self.pending and digest not in self.pinned:
+            result = self.recent.get(digest)
+            if result is None:
+                # Seen too long ago to still be kept
+                self.pending.add(digest)
+                return digest, False
+            self.pinned[digest] = result
+        self.waiting[digest] = self.waiting.get(digest, 0) + 1
+        return digest, True
+
+    def resolve(self, digest: bytes, result: Any):
+        """Record the result of a first occurrence"""
+        self.pending.discard(digest)
+        self.recent.put(digest, result)
+        if self.waiting.get(digest):
+            self.pinned[digest] = result
+
+    def take(self, digest: bytes) -> Any:
+        """The result for one queued copy"""
+        result = self.pinned[digest]
+        self.waiting[digest] -= 1
+        if not self.waiting[digest]:
+            del self.waiting[digest]
+            del self.pinned[digest]
+        return result
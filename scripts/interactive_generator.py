@@ -1,15 +1,32 @@
+import time
+# Taken before the other imports so the startup budget covers them too
+_STARTED = time.perf_counter()
+
 import sys
-from question_generator import QuestionGenerator
+import threading
+from typing import List, Optional
+from question_generator import QuestionGenerator, check_startup_budget
+from question_daemon import DaemonClient, default_socket_path, pipe
+
+def interactive_mode(client: Optional[DaemonClient] = None, seed: Optional[int] = None):
+    """Interactive mode for the question generator
 
-def interactive_mode():
-    """Interactive mode for the question generator"""
+    With a ``client`` a running question daemon generates the questions, so
+    no models are loaded here.
+    """
     print("🎯 Interactive AI Question Generator")
     print("=" * 40)
     print("Enter 'quit' to exit the program")
     print("Enter 'help' for usage instructions")
     print("-" * 40)
     
-    generator = QuestionGenerator()
+    if client is not None:
+        generator = client
+    else:
+        generator = QuestionGenerator()
+        # Models load lazily; warm them in the background while the user types
+        threading.Thread(target=generator.backend.warm_up, daemon=True).start()
+    check_startup_budget(_STARTED, "Interactive generator")
     
     while True:
         print("\n📝 Enter your paragraph:")
@@ -30,7 +47,7 @@ def interactive_mode():
             continue
         
         print("\n🔄 Generating questions...")
-        questions = generator.generate_questions(user_input)
+        questions = generator.generate_questions(user_input, seed=seed)
         
         # Display results
         for category, question_list in questions.items():
@@ -60,5 +77,31 @@ def interactive_mode():
 
         print("\n" + "-" * 40)
 
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Generate questions interactively, or for each line of stdin")
+    parser.add_argument('--daemon', nargs='?', const=default_socket_path(), default=None, metavar='SOCKET',
+                        help="Use a running question_daemon instead of loading models")
+    parser.add_argument('--pipe', action='store_true',
+                        help="Answer each stdin line (text or a JSON record) with one JSON line on stdout")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible questions")
+    args = parser.parse_args(argv)
+    
+    client = None
+    if args.daemon:
+        try:
+            client = DaemonClient(args.daemon)
+        except OSError as e:
+            print(f"❌ No question daemon at {args.daemon}: {e}", file=sys.stderr)
+            sys.exit(1)
+    
+    if not args.pipe:
+        interactive_mode(client, args.seed)
+        return
+    generator = client if client is not None else QuestionGenerator()
+    check_startup_budget(_STARTED, "Interactive generator")
+    pipe(sys.stdin, sys.stdout, generator, args.seed)
+
 if __name__ == "__main__":
-    interactive_mode()
+    main()
@@ -0,0 +1,180 @@
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from question_generator import AnalyzedDocument, QuestionGenerator, warm_up
+from question_records import QuestionSet
+from phrase_index import PhraseIndex
+
+# Sentences per window, and how many of them the next window repeats for context
+WINDOW_SENTENCES = 12
+WINDOW_OVERLAP = 2
+
+# New key phrases a window may claim; every phrase-based question category is capped by it
+PHRASES_PER_WINDOW = 3
+
+# Generator owned by each worker process, created once by _init_window_worker
+_window_generator = None
+
+def _init_window_worker(backend: Optional[str] = None):
+    """Load the NLP models once per worker process"""
+    global _window_generator
+    _window_generator = QuestionGenerator(analysis_cache_size=0, backend=backend)
+    # A no-op when the models were already loaded in the parent before forking
+    warm_up(backend)
+
+def _analyze_window_chunk(windows: List[Tuple[str, ...]]) -> List[Tuple[AnalyzedDocument, List[str]]]:
+    """Analyze a chunk of windows inside a worker process"""
+    return _analyze_windows(_window_generator, windows)
+
+def _analyze_windows(generator: QuestionGenerator,
+                     windows: List[Tuple[str, ...]]) -> List[Tuple[AnalyzedDocument, List[str]]]:
+    docs = generator.analyze_many([' '.join(window) for window in windows], windows)
+    return list(zip(docs, generator.extract_key_phrases_many(docs)))
+
+def sentence_windows(num_sentences: int, size: int = WINDOW_SENTENCES,
+                     overlap: int = WINDOW_OVERLAP) -> List[Tuple[int, int]]:
+    """``(start, end)`` sentence ranges of sliding windows covering every sentence"""
+    if size < 1 or not 0 <= overlap < size:
+        raise ValueError(f"Need size >= 1 and 0 <= overlap < size, got size={size}, overlap={overlap}")
+    step = size - overlap
+    windows = []
+    if num_sentences <= 0:
+        return windows
+    start = 0
+    while True:
+        end = min(start + size, num_sentences)
+        windows.append((start, end))
+        if end >= num_sentences:
+            return windows
+        start += step
+
+class PhraseAllocator:
+    """Hands each key phrase to the first window that ranks it, ignoring case
+
+    Later windows that rank the same phrase skip it, so overlapping windows
+    and recurring topics never produce the same question twice.
+    """
+
+    def __init__(self):
+        self.phrases: List[str] = []
+        self._seen = set()
+
+    def claim(self, key_phrases: Sequence[str], limit: int) -> List[str]:
+        """Up to ``limit`` phrases from ``key_phrases`` that no earlier window claimed, in rank order"""
+        claimed = []
+        for phrase in key_phrases:
+            if len(claimed) == limit:
+                break
+            folded = phrase.lower()
+            if folded not in self._seen:
+                self._seen.add(folded)
+                claimed.append(phrase)
+        self.phrases.extend(claimed)
+        return claimed
+
+class LongDocumentGenerator:
+    """Questions for a whole chapter or book, one bounded sentence window at a time
+
+    The text is split into sentences once, then covered by overlapping
+    windows of ``window_sentences`` sentences. Windows are analyzed in bulk,
+    on a process pool with ``workers > 1``, and stream back in order. Each
+    window claims at most ``phrases_per_window`` key phrases no earlier window
+    claimed and asks questions about those only, so tagging, entity chunking
+    and distractor selection never see more than one window and time and
+    memory grow linearly with the document. Analytical and comprehension
+    questions are about the document as a whole and are asked once.
+
+    The result is one ``QuestionSet`` in the ``generate_questions`` format;
+    ``"Key Phrases Identified"`` lists every claimed phrase in document order.
+    A seeded run is identical whatever the number of workers.
+    """
+
+    def __init__(self, generator: Optional[QuestionGenerator] = None, window_sentences: int = WINDOW_SENTENCES,
+                 overlap: int = WINDOW_OVERLAP, phrases_per_window: int = PHRASES_PER_WINDOW):
+        self.generator = generator if generator is not None else QuestionGenerator()
+        self.window_sentences = window_sentences
+        self.overlap = overlap
+        self.phrases_per_window = phrases_per_window
+
+    def windows(self, text: str) -> List[Tuple[str, ...]]:
+        """The sentence windows of a document"""
+        sentences = tuple(self.generator.backend.sent_tokenize(text))
+        return [sentences[start:end] for start, end in
+                sentence_windows(len(sentences), self.window_sentences, self.overlap)]
+
+    def iter_analyzed(self, windows: Sequence[Tuple[str, ...]], workers: int = 1,
+                      chunksize: int = 4) -> Iterator[Tuple[AnalyzedDocument, List[str]]]:
+        """Yield ``(doc, key_phrases)`` per window, in order
+
+        With ``workers > 1`` chunks of windows go to a process pool; at most
+        two chunks per worker are in flight.
+        """
+        windows = iter(windows)
+        if workers <= 1:
+            while True:
+                chunk = list(islice(windows, chunksize))
+                if not chunk:
+                    return
+                yield from _analyze_windows(self.generator, chunk)
+
+        # Load the models once here so forked workers share them copy-on-write
+        warm_up(self.generator.backend)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_window_worker,
+                                 initargs=(self.generator.backend.name,)) as executor:
+            pending = deque()
+            while True:
+                chunk = list(islice(windows, chunksize))
+                if chunk:
+                    pending.append(executor.submit(_analyze_window_chunk, chunk))
+                if pending and (len(pending) >= workers * 2 or not chunk):
+                    yield from pending.popleft().result()
+                elif not chunk:
+                    return
+
+    def generate_set(self, text: str, seed: Optional[int] = None, workers: int = 1,
+                     rng: Optional[random.Random] = None) -> QuestionSet:
+        """Generate compact question records for a long document"""
+        if not text or len(text.strip()) < 50:
+            return QuestionSet(error="Paragraph is too short. Please provide at least 50 characters.")
+        if seed is not None:
+            rng = random.Random(seed)
+        elif rng is None:
+            rng = random.Random()
+
+        generator = self.generator
+        categories = {name: [] for name in ("Factual Questions", "Multiple Choice Questions",
+                                            "Fill in the Blank Questions", "Deep Facility Questions")}
+        allocator = PhraseAllocator()
+        first_doc = None
+        # Sampling stays in this process and in window order, so the draws do not depend on workers
+        for doc, key_phrases in self.iter_analyzed(self.windows(text), workers):
+            if first_doc is None:
+                first_doc = doc
+            phrases = allocator.claim(key_phrases, self.phrases_per_window)
+            if not phrases:
+                continue
+            index = PhraseIndex(phrases, doc.lowered)
+            categories["Factual Questions"].extend(
+                generator.generate_factual_questions(doc.text, phrases, rng))
+            categories["Multiple Choice Questions"].extend(
+                generator.generate_multiple_choice_questions(doc.text, phrases, doc, index, rng,
+                                                             borrow=seed is None))
+            categories["Fill in the Blank Questions"].extend(
+                generator.generate_fill_in_blank_questions(doc.text, phrases, doc, index))
+            categories["Deep Facility Questions"].extend(
+                generator.generate_deep_facility_questions(doc.text, phrases, rng))
+
+        return QuestionSet([
+            ("Factual Questions", categories["Factual Questions"]),
+            ("Analytical Questions", generator.generate_analytical_questions(text, rng)),
+            ("Comprehension Questions", generator.generate_comprehension_questions(text, first_doc)),
+            ("Multiple Choice Questions", categories["Multiple Choice Questions"]),
+            ("Fill in the Blank Questions", categories["Fill in the Blank Questions"]),
+            ("Deep Facility Questions", categories["Deep Facility Questions"])
+        ], allocator.phrases)
+
+    def generate(self, text: str, seed: Optional[int] = None, workers: int = 1) -> Dict[str, List]:
+        """Like ``generate_questions`` for a whole document"""
+        return self.generate_set(text, seed, workers).to_dict()
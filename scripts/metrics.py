@@ -0,0 +1,132 @@
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+# Upper bounds, in seconds, of the stage timing histogram buckets
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class StageHooks:
+    """No-op instrumentation hooks; subclass and override what you need
+
+    ``QuestionGenerator`` calls ``on_stage`` with the duration of each
+    pipeline stage, ``on_count`` for counters and ``on_trace`` once per
+    paragraph with token, sentence and key phrase counts. When no hooks are
+    configured the generator skips timing entirely.
+    """
+
+    def on_stage(self, stage: str, seconds: float):
+        pass
+
+    def on_count(self, name: str, value: float = 1):
+        pass
+
+    def on_trace(self, trace: Dict):
+        pass
+
+class MetricsRegistry:
+    """Thread-safe counters and stage timing histograms
+
+    Renders as Prometheus text or JSON. Snapshots can be merged, so worker
+    processes can ship their metrics to the process that serves them.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix: str = "qg"):
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self.counters: Dict[str, float] = {}
+        self.timings: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _timing(self, stage: str) -> Dict:
+        timing = self.timings.get(stage)
+        if timing is None:
+            timing = {"count": 0, "sum": 0.0, "buckets": [0] * len(self.buckets)}
+            self.timings[stage] = timing
+        return timing
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            timing = self._timing(stage)
+            timing["count"] += 1
+            timing["sum"] += seconds
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    timing["buckets"][i] += 1
+                    break
+
+    def snapshot(self, reset: bool = False) -> Dict:
+        """Plain-dict copy of every metric, optionally clearing them"""
+        with self._lock:
+            snapshot = {
+                "counters": dict(self.counters),
+                "timings": {stage: {"count": t["count"], "sum": t["sum"], "buckets": list(t["buckets"])}
+                            for stage, t in self.timings.items()}
+            }
+            if reset:
+                self.counters.clear()
+                self.timings.clear()
+        return snapshot
+
+    def merge(self, snapshot: Dict):
+        """Add a snapshot taken from another registry with the same buckets"""
+        with self._lock:
+            for name, value in snapshot["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for stage, other in snapshot["timings"].items():
+                timing = self._timing(stage)
+                timing["count"] += other["count"]
+                timing["sum"] += other["sum"]
+                timing["buckets"] = [a + b for a, b in zip(timing["buckets"], other["buckets"])]
+
+    def to_json(self) -> Dict:
+        snapshot = self.snapshot()
+        for timing in snapshot["timings"].values():
+            timing["mean_ms"] = timing["sum"] / timing["count"] * 1000 if timing["count"] else 0.0
+            timing["buckets"] = dict(zip((str(b) for b in self.buckets), timing["buckets"]))
+        return snapshot
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = f"{self.prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+
+        metric = f"{self.prefix}_stage_seconds"
+        if snapshot["timings"]:
+            lines.append(f"# TYPE {metric} histogram")
+        for stage, timing in sorted(snapshot["timings"].items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, timing["buckets"]):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {timing["count"]}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {timing["sum"]}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {timing["count"]}')
+        return "\n".join(lines) + "\n"
+
+class MetricsHooks(StageHooks):
+    """Hooks that record into a MetricsRegistry and optionally keep recent traces"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None, trace_limit: int = 0):
+        self.registry = registry if registry is not None else MetricsRegistry()
+        self.traces = deque(maxlen=trace_limit) if trace_limit > 0 else None
+
+    def on_stage(self, stage: str, seconds: float):
+        self.registry.observe(stage, seconds)
+
+    def on_count(self, name: str, value: float = 1):
+        self.registry.inc(name, value)
+
+    def on_trace(self, trace: Dict):
+        if self.traces is not None:
+            self.traces.append(trace)
+
+    def recent_traces(self) -> List[Dict]:
+        return list(self.traces) if self.traces is not None else []
@@ -0,0 +1,465 @@
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+import numpy as np
+
+# Snapshot file: header, a JSON index of the arrays, then the arrays, each 64-byte aligned
+MODEL_STORE_MAGIC = b"QGMODEL1"
+_HEADER = struct.Struct("<8sQ")  # magic, index length
+_ALIGN = 64
+
+# Dense score rows of recently used features kept per process by the tagger and chunker
+ROW_CACHE_SIZE = 4096
+
+# Default text for ``verify``
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sample_content.txt')
+
+def key_hash(text: str) -> int:
+    """Stable 64-bit hash of a model key, case-sensitive"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'little')
+
+def key_hashes(texts: Iterable[str]) -> np.ndarray:
+    return np.fromiter((key_hash(text) for text in texts), dtype=np.uint64)
+
+def _find(table: np.ndarray, hash_value: int) -> int:
+    """Position of one hash in the sorted ``table``, -1 when it is missing"""
+    position = int(table.searchsorted(np.uint64(hash_value)))
+    return position if position < len(table) and table[position] == hash_value else -1
+
+def _sorted_keys(keys: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted hashes of ``keys`` and the order that sorts them; refuses hash collisions"""
+    hashes = key_hashes(keys)
+    order = np.argsort(hashes, kind='stable')
+    hashes = hashes[order]
+    if len(hashes) > 1 and not np.all(np.diff(hashes)):
+        raise ValueError("Two model keys share a 64-bit hash; cannot build the snapshot")
+    return hashes, order
+
+def _value_key(value) -> str:
+    """Text form of a feature value that is equal exactly when Python compares the values equal"""
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return repr(value)
+
+def _feature_key(name: str, value) -> str:
+    return f"{name}\x00{_value_key(value)}"
+
+class HashedTagDict:
+    """Read-only word -> tag mapping over the snapshot, the ``tagdict`` a PerceptronTagger expects"""
+
+    def __init__(self, hashes: np.ndarray, tag_ids: np.ndarray, classes: List[str]):
+        self.hashes = hashes
+        self.tag_ids = tag_ids
+        self.classes = classes
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def get(self, word: str, default=None):
+        position = _find(self.hashes, key_hash(word))
+        return self.classes[self.tag_ids[position]] if position >= 0 else default
+
+class HashedWordSet:
+    """Read-only set of words over the snapshot; supports ``in``"""
+
+    def __init__(self, hashes: np.ndarray):
+        self.hashes = hashes
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def __contains__(self, word) -> bool:
+        return isinstance(word, str) and _find(self.hashes, key_hash(word)) >= 0
+
+class CSRPerceptron:
+    """Averaged perceptron weights as CSR arrays: one row of (class, weight) pairs per feature
+
+    Stands in for NLTK's ``AveragedPerceptron`` in ``predict``. Scores are
+    summed feature by feature in the order NLTK uses, so ties and rounding,
+    and therefore every tag, come out identical. Confidences are NLTK's
+    softmax over every class; they agree to within float rounding, since
+    NLTK adds the exponentials in its dict order. The dense score rows of
+    the ``row_cache`` most recent features are kept per process.
+    """
+
+    def __init__(self, hashes: np.ndarray, indptr: np.ndarray, class_ids: np.ndarray,
+                 weights: np.ndarray, classes: List[str], row_cache: int = ROW_CACHE_SIZE):
+        self.hashes = hashes
+        self.indptr = indptr
+        self.class_ids = class_ids
+        self.weights = weights
+        self.classes = classes
+        self._row = lru_cache(maxsize=row_cache)(self._dense_row)
+
+    def _dense_row(self, feature: str) -> Optional[np.ndarray]:
+        """Score contribution of one feature to every class, None for unknown features"""
+        position = _find(self.hashes, key_hash(feature))
+        if position < 0:
+            return None
+        start, end = self.indptr[position], self.indptr[position + 1]
+        row = np.zeros(len(self.classes))
+        row[self.class_ids[start:end]] = self.weights[start:end]
+        return row
+
+    def predict(self, features: Dict[str, int], return_conf: bool = False):
+        rows = []
+        for feature, value in features.items():
+            row = self._row(feature) if value else None
+            if row is not None:
+                rows.append(row if value == 1 else row * value)
+        # A running sum over the rows adds in NLTK's order; classes no feature touched stay at 0.0
+        scores = np.cumsum(rows, axis=0)[-1] if rows else np.zeros(len(self.classes))
+        # Classes are sorted, so the last of the best scores is NLTK's (score, label) maximum
+        best = len(scores) - 1 - int(np.argmax(scores[::-1]))
+        if not return_conf:
+            return self.classes[best], None
+        # NLTK's score dict holds every class by then (picking the best reads each one), unshifted
+        exps = np.exp(scores)
+        return self.classes[best], float(np.max(exps / np.sum(exps)))
+
+class TableMaxentClassifier:
+    """Maxent classifier over the snapshot, standing in for the NE chunker's ``MaxentClassifier``
+
+    Each ``(feature, value)`` pair seen in training maps to one row of a
+    pairs x labels table of weight ids. Totals are summed in featureset
+    order and normalized by NLTK's own ``DictionaryProbDist``, so labels
+    match the original classifier exactly. Rows are cached like
+    ``CSRPerceptron``'s.
+    """
+
+    def __init__(self, pair_hashes: np.ndarray, table: np.ndarray, alwayson: np.ndarray,
+                 weights: np.ndarray, labels: List[str], row_cache: int = ROW_CACHE_SIZE):
+        self.pair_hashes = pair_hashes
+        self.table = table
+        self.weights = weights
+        self._labels = labels
+        self._alwayson = np.where(alwayson >= 0, weights[np.maximum(alwayson, 0)], 0.0)
+        self._has_alwayson = bool(np.any(alwayson >= 0))
+        # Keyed by the (name, value) pair itself, so equal values hit like NLTK's dict lookups
+        self._row = lru_cache(maxsize=row_cache)(self._dense_row)
+
+    def labels(self) -> List[str]:
+        return self._labels
+
+    def _dense_row(self, pair: Tuple) -> Optional[np.ndarray]:
+        """Weight of one (feature, value) pair for every label, 0.0 where the label never saw it"""
+        position = _find(self.pair_hashes, key_hash(_feature_key(*pair)))
+        if position < 0:
+            return None
+        ids = self.table[position]
+        return np.where(ids >= 0, self.weights[np.maximum(ids, 0)], 0.0)
+
+    def prob_classify(self, featureset: Dict):
+        from nltk.probability import DictionaryProbDist
+        rows = [row for row in map(self._row, featureset.items()) if row is not None]
+        # Adding 0.0 for labels that never saw a pair changes no total
+        totals = np.cumsum(rows, axis=0)[-1] if rows else np.zeros(len(self._labels))
+        if self._has_alwayson:
+            totals = totals + self._alwayson
+        return DictionaryProbDist(dict(zip(self._labels, totals.tolist())), log=True, normalize=True)
+
+    def classify(self, featureset: Dict) -> str:
+        return self.prob_classify(featureset).max()
+
+class ModelStore:
+    """Read-only, memory-mapped snapshot of the NLTK models behind ``NLTKBackend``
+
+    Holds the perceptron tagger (CSR weights, tag dictionary, classes), the
+    maxent NE chunker (weights and a feature table), its word list and the
+    stopwords. Strings are interned as sorted 64-bit hashes, so attaching
+    reads only a small index: every process that maps the file shares its
+    pages, and a worker is ready in milliseconds instead of parsing the
+    model files into private dicts. Build one with ``python model_store.py
+    build``.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            magic, index_length = _HEADER.unpack(file.read(_HEADER.size))
+            if magic != MODEL_STORE_MAGIC:
+                raise ValueError(f"{path} is not a model store snapshot")
+            self.index = json.loads(file.read(index_length))
+        self.path = path
+        self.arrays = {}
+        for name, (dtype, shape, offset) in self.index["arrays"].items():
+            if int(np.prod(shape)):
+                self.arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=tuple(shape))
+            else:
+                self.arrays[name] = np.zeros(shape, dtype=dtype)
+
+    def fingerprint(self) -> str:
+        return f"{os.path.basename(self.path)}:{self.index['built']}"
+
+    def tagger(self):
+        """An NLTK ``PerceptronTagger`` whose weights and tag dictionary live in the snapshot"""
+        from nltk.tag import PerceptronTagger
+        tagger = PerceptronTagger(load=False)
+        classes = self.index["classes"]
+        tagger.classes = set(classes)
+        tagger.tagdict = HashedTagDict(self.arrays["tagdict_hashes"], self.arrays["tagdict_tags"], classes)
+        tagger.model = CSRPerceptron(self.arrays["feature_hashes"], self.arrays["feature_indptr"],
+                                     self.arrays["feature_classes"], self.arrays["feature_weights"], classes)
+        return tagger
+
+    def ne_chunker(self):
+        """An NLTK NE chunker whose classifier and word list live in the snapshot"""
+        from nltk.chunk.named_entity import NEChunkParser, NEChunkParserTagger
+        classifier = TableMaxentClassifier(self.arrays["ne_pair_hashes"], self.arrays["ne_table"],
+                                           self.arrays["ne_alwayson"], self.arrays["ne_weights"],
+                                           self.index["ne_labels"])
+        chunker = NEChunkParser.__new__(NEChunkParser)
+        chunker._tagger = NEChunkParserTagger(classifier=classifier)
+        chunker._tagger._en_wordlist = HashedWordSet(self.arrays["word_hashes"])
+        return chunker
+
+    def stop_words(self) -> FrozenSet[str]:
+        return frozenset(self.index["stop_words"])
+
+def _tagger_arrays(tagger) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    classes = sorted(tagger.classes)
+    if len(classes) > 255:
+        raise ValueError("The tagger has more than 255 classes")
+    class_ids = {label: i for i, label in enumerate(classes)}
+
+    features = list(tagger.model.weights)
+    hashes, order = _sorted_keys(features)
+    indptr = [0]
+    entry_classes, entry_weights = [], []
+    for i in order:
+        for label, weight in tagger.model.weights[features[i]].items():
+            entry_classes.append(class_ids[label])
+            entry_weights.append(weight)
+        indptr.append(len(entry_classes))
+
+    words = list(tagger.tagdict)
+    word_hashes, word_order = _sorted_keys(words)
+    return {
+        "feature_hashes": hashes,
+        "feature_indptr": np.asarray(indptr, dtype=np.int64),
+        "feature_classes": np.asarray(entry_classes, dtype=np.uint8),
+        "feature_weights": np.asarray(entry_weights, dtype=np.float64),
+        "tagdict_hashes": word_hashes,
+        "tagdict_tags": np.asarray([class_ids[tagger.tagdict[words[i]]] for i in word_order], dtype=np.uint8)
+    }, classes
+
+def _chunker_arrays(chunker) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    classifier = chunker._tagger._classifier
+    encoding = classifier._encoding
+    if encoding._unseen or not classifier._logarithmic:
+        raise ValueError("Only logarithmic maxent chunkers without unseen-value features can be stored")
+    labels = list(encoding.labels())
+    label_ids = {label: i for i, label in enumerate(labels)}
+
+    pairs = {}
+    for name, value, label in encoding._mapping:
+        pairs.setdefault(_feature_key(name, value), [])
+    keys = list(pairs)
+    pair_hashes, order = _sorted_keys(keys)
+    rows = {keys[i]: row for row, i in enumerate(order)}
+    table = np.full((len(keys), len(labels)), -1, dtype=np.int32)
+    for (name, value, label), feature_id in encoding._mapping.items():
+        table[rows[_feature_key(name, value)], label_ids[label]] = feature_id
+    alwayson = np.asarray([(encoding._alwayson or {}).get(label, -1) for label in labels], dtype=np.int32)
+
+    words = sorted(chunker._tagger._english_wordlist())
+    return {
+        "ne_pair_hashes": pair_hashes,
+        "ne_table": table,
+        "ne_alwayson": alwayson,
+        "ne_weights": np.asarray(classifier._weights, dtype=np.float64),
+        "word_hashes": np.sort(key_hashes(words))
+    }, labels
+
+def write_model_store(path: str, tagger, chunker, stop_words: Iterable[str]):
+    """Write a snapshot of a loaded tagger, NE chunker and stopword list"""
+    arrays, classes = _tagger_arrays(tagger)
+    chunker_arrays, labels = _chunker_arrays(chunker)
+    arrays.update(chunker_arrays)
+
+    index = {"built": time.strftime("%Y-%m-%dT%H:%M:%S"), "classes": classes, "ne_labels": labels,
+             "stop_words": sorted(stop_words), "arrays": {}}
+    # Offsets depend on the index length, which depends on the offsets: lay out until stable
+    index_length = 0
+    while True:
+        offset = -(-(_HEADER.size + index_length) // _ALIGN) * _ALIGN
+        for name, array in arrays.items():
+            index["arrays"][name] = [array.dtype.newbyteorder('<').str, list(array.shape), offset]
+            offset = -(-(offset + array.nbytes) // _ALIGN) * _ALIGN
+        encoded = json.dumps(index).encode('utf-8')
+        if len(encoded) <= index_length:
+            break
+        index_length = len(encoded) + 256
+
+    with open(path + '.tmp', 'wb') as file:
+        file.write(_HEADER.pack(MODEL_STORE_MAGIC, index_length))
+        file.write(encoded.ljust(index_length))
+        for name, array in arrays.items():
+            file.seek(index["arrays"][name][2])
+            file.write(np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<')).tobytes())
+    # Workers may be mapping the old file; replace it atomically instead of rewriting it
+    os.replace(path + '.tmp', path)
+
+def build_model_store(path: str):
+    """Snapshot the NLTK models installed in this environment"""
+    from nlp_backends import load_ne_chunker, load_stop_words, load_tagger
+    write_model_store(path, load_tagger(), load_ne_chunker(), load_stop_words())
+
+@lru_cache(maxsize=None)
+def get_model_store() -> Optional[ModelStore]:
+    """The snapshot named by QG_MODEL_STORE, attached once per process; ``None`` when unset"""
+    path = os.environ.get("QG_MODEL_STORE")
+    return ModelStore(path) if path else None
+
+# Relative difference allowed between tag confidences; NLTK sums its softmax in dict order
+CONFIDENCE_TOLERANCE = 1e-9
+
+def verify_model_store(store: ModelStore, tagger, chunker, stop_words: Iterable[str],
+                       sentences: Iterable[List[str]]) -> List[str]:
+    """Compare a snapshot with the models it was built from; returns the differences found
+
+    Every tokenized sentence is tagged with and without the tag dictionary
+    (so the perceptron itself decides every token) and with confidences,
+    then chunked; the stopwords must match too. An empty list means the
+    snapshot reproduces the originals.
+    """
+    store_tagger, store_chunker = store.tagger(), store.ne_chunker()
+    problems = []
+    if store.stop_words() != frozenset(stop_words):
+        problems.append("stop words differ")
+    for number, tokens in enumerate(sentences, 1):
+        for use_tagdict in (True, False):
+            expected = tagger.tag(tokens, return_conf=True, use_tagdict=use_tagdict)
+            found = store_tagger.tag(tokens, return_conf=True, use_tagdict=use_tagdict)
+            if [tag for _, tag, _ in expected] != [tag for _, tag, _ in found]:
+                problems.append(f"sentence {number}: tags differ (tag dictionary {'on' if use_tagdict else 'off'})")
+            elif not np.allclose([conf for _, _, conf in found], [conf for _, _, conf in expected],
+                                 rtol=CONFIDENCE_TOLERANCE, atol=0):
+                problems.append(f"sentence {number}: tag confidences differ")
+        tagged = tagger.tag(tokens)
+        if chunker.parse(tagged) != store_chunker.parse(tagged):
+            problems.append(f"sentence {number}: named entity chunks differ")
+    return problems
+
+def memory_usage() -> Dict[str, int]:
+    """RSS, PSS and USS of this process in KiB (Linux); PSS splits shared pages between their users"""
+    usage = {"rss_kb": 0, "pss_kb": 0, "uss_kb": 0}
+    try:
+        with open('/proc/self/smaps_rollup') as file:
+            fields = {line.split(':')[0]: int(line.split()[1]) for line in file if line.endswith('kB\n')}
+        usage.update(rss_kb=fields["Rss"], pss_kb=fields["Pss"],
+                     uss_kb=fields["Private_Clean"] + fields["Private_Dirty"])
+    except (OSError, KeyError):
+        import resource
+        usage["rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage
+
+# Pre-tagged warm-up input, so measuring needs no sentence tokenizer data
+_WARM_UP_TOKENS = "Marie Curie studied radioactivity at the University of Paris in France .".split()
+
+def _measure_worker(store_path: Optional[str], barrier, results):
+    """Load the models the way a worker would and report its memory before and after"""
+    if store_path:
+        os.environ["QG_MODEL_STORE"] = store_path
+    else:
+        os.environ.pop("QG_MODEL_STORE", None)
+    # Import NLTK's code first, so the numbers cover the model data alone
+    import nltk.tag, nltk.chunk.named_entity, nltk.probability
+    from nlp_backends import NLTKBackend
+    report = {"pid": os.getpid(), "before": memory_usage()}
+    started = time.perf_counter()
+    try:
+        backend = NLTKBackend()
+        backend.entities_sents(backend.tag_sents([_WARM_UP_TOKENS]))
+        backend.stop_words()
+        report["load_ms"] = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        # NLTK's LookupError is a banner; its first text line names the missing resource
+        lines = [line.strip() for line in str(e).splitlines() if line.strip().strip('*')]
+        report["error"] = f"{type(e).__name__}: {lines[0] if lines else e}"
+    # Measure once every worker is loaded, so shared pages are split between all of them
+    barrier.wait()
+    report["after"] = memory_usage()
+    results.put(report)
+    barrier.wait()
+
+def measure_workers(workers: int, store_path: Optional[str] = None) -> List[Dict]:
+    """Start ``workers`` fresh processes that load the models, from the snapshot if given"""
+    import multiprocessing
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=_measure_worker, args=(store_path, barrier, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return sorted(reports, key=lambda report: report["pid"])
+
+def print_memory_report(label: str, reports: List[Dict]):
+    print(f"\n🧠 {label}: {len(reports)} workers")
+    loaded = [report for report in reports if "error" not in report]
+    for report in reports:
+        if "error" in report:
+            print(f"  ❌ {report['pid']}: {report['error']}")
+    if not loaded:
+        return
+    print(f"  {'pid':>8} {'load ms':>9} {'RSS before':>11} {'RSS after':>10} {'PSS after':>10} {'USS after':>10}")
+    for report in loaded:
+        before, after = report["before"], report["after"]
+        print(f"  {report['pid']:>8} {report['load_ms']:>9.1f} {before['rss_kb'] / 1024:>9.1f}MB "
+              f"{after['rss_kb'] / 1024:>8.1f}MB {after['pss_kb'] / 1024:>8.1f}MB {after['uss_kb'] / 1024:>8.1f}MB")
+    total_pss = sum(report["after"]["pss_kb"] for report in loaded) / 1024
+    mean_load = sum(report["load_ms"] for report in loaded) / len(loaded)
+    print(f"  total PSS {total_pss:.1f}MB, mean load {mean_load:.1f} ms")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Shared, memory-mapped snapshot of the NLTK models")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="Snapshot the installed NLTK models")
+    build_parser.add_argument("-o", "--output", default="models.qgm", help="Snapshot file")
+    report_parser = sub.add_parser("report", help="Per-worker memory and load time, NLTK files vs snapshot")
+    report_parser.add_argument("store", help="Snapshot file")
+    report_parser.add_argument("--workers", type=int, default=4, help="Worker processes to start")
+    report_parser.add_argument("--snapshot-only", action="store_true", help="Skip loading the NLTK files")
+    verify_parser = sub.add_parser("verify", help="Check that a snapshot reproduces the installed NLTK models")
+    verify_parser.add_argument("store", help="Snapshot file")
+    verify_parser.add_argument("--input", default=SAMPLE_FILE, help="Text to tag and chunk with both")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        started = time.perf_counter()
+        build_model_store(args.output)
+        size = os.path.getsize(args.output) / 1024 / 1024
+        print(f"✅ Wrote {args.output} ({size:.1f}MB) in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        print(f"   Attach with QG_MODEL_STORE={os.path.abspath(args.output)}", file=sys.stderr)
+        return
+    if args.command == "verify":
+        from nltk.tokenize import sent_tokenize, word_tokenize
+        from nlp_backends import load_ne_chunker, load_stop_words, load_tagger
+        with open(args.input, 'r', encoding='utf-8') as file:
+            sentences = [word_tokenize(sentence) for sentence in sent_tokenize(file.read())]
+        problems = verify_model_store(ModelStore(args.store), load_tagger(), load_ne_chunker(), load_stop_words(),
+                                      sentences)
+        for problem in problems:
+            print(f"  ❌ {problem}")
+        if problems:
+            print(f"❌ {args.store} differs from the NLTK models in {len(problems)} places")
+            sys.exit(1)
+        print(f"✅ {args.store} reproduces the NLTK models on {len(sentences)} sentences")
+        return
+    if not args.snapshot_only:
+        print_memory_report("NLTK model files", measure_workers(args.workers))
+    print_memory_report(f"Snapshot {args.store}", measure_workers(args.workers, args.store))
+
+if __name__ == "__main__":
+    main()
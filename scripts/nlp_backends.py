@@ -0,0 +1,387 @@
+import os
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Sequence, Tuple, Union
+from model_store import get_model_store
+
+# Entities are stored as (entity, label) pairs, one tuple per sentence
+Entities = Tuple[Tuple[str, str], ...]
+
+# NLTK and its models are imported on first use, never at module import time,
+# so entry points start instantly and only pay for the models they touch.
+
+@lru_cache(maxsize=None)
+def get_tokenizers():
+    """Return NLTK's ``(sent_tokenize, word_tokenize)``, importing them on first use"""
+    from nltk.tokenize import sent_tokenize, word_tokenize
+    return sent_tokenize, word_tokenize
+
+def load_tagger():
+    """Load the averaged perceptron POS tagger from NLTK's data files"""
+    from nltk.tag import PerceptronTagger
+    return PerceptronTagger()
+
+def load_ne_chunker():
+    """Load the maxent named-entity chunker from NLTK's data files"""
+    try:
+        from nltk.chunk import ne_chunker  # NLTK >= 3.9
+        return ne_chunker()
+    except ImportError:
+        import nltk
+        from nltk.chunk import _MULTICLASS_NE_CHUNKER
+        return nltk.data.load(_MULTICLASS_NE_CHUNKER)
+
+def load_stop_words() -> FrozenSet[str]:
+    """Load the English stopword list from NLTK's data files"""
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
+
+# With QG_MODEL_STORE set, the models below come from a shared memory-mapped
+# snapshot (see model_store) instead of each process parsing its own copy.
+
+@lru_cache(maxsize=None)
+def get_tagger():
+    """The POS tagger, loaded once per process"""
+    store = get_model_store()
+    return store.tagger() if store is not None else load_tagger()
+
+@lru_cache(maxsize=None)
+def get_ne_chunker():
+    """The named-entity chunker, loaded once per process"""
+    store = get_model_store()
+    return store.ne_chunker() if store is not None else load_ne_chunker()
+
+@lru_cache(maxsize=None)
+def get_stop_words() -> FrozenSet[str]:
+    """The English stopword list, loaded once per process"""
+    store = get_model_store()
+    return store.stop_words() if store is not None else load_stop_words()
+
+class NLPBackend:
+    """Sentence splitting, tokenization, POS tagging and entity detection
+
+    ``QuestionGenerator`` only talks to its backend through these methods.
+    Tags use the Penn Treebank tagset, which is all the key phrase extractor
+    relies on. The ``*_sents`` methods work on many sentences at once so a
+    backend can batch them.
+    """
+
+    name = "base"
+
+    def sent_tokenize(self, text: str) -> List[str]:
+        raise NotImplementedError
+
+    def word_tokenize(self, sentence: str) -> List[str]:
+        raise NotImplementedError
+
+    def tag_sents(self, sentences: Sequence[Sequence[str]]) -> List[List[Tuple[str, str]]]:
+        raise NotImplementedError
+
+    def entities_sents(self, tagged_sentences: Sequence[Sequence[Tuple[str, str]]]) -> List[Entities]:
+        raise NotImplementedError
+
+    def stop_words(self) -> FrozenSet[str]:
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Load whatever the backend needs, e.g. before forking workers"""
+
+class NLTKBackend(NLPBackend):
+    """Punkt, the averaged perceptron tagger and the maxent NE chunker"""
+
+    name = "nltk"
+
+    def sent_tokenize(self, text: str) -> List[str]:
+        return get_tokenizers()[0](text)
+
+    def word_tokenize(self, sentence: str) -> List[str]:
+        return get_tokenizers()[1](sentence)
+
+    def tag_sents(self, sentences: Sequence[Sequence[str]]) -> List[List[Tuple[str, str]]]:
+        tagger = get_tagger()
+        return [tagger.tag(list(tokens)) for tokens in sentences]
+
+    def entities_sents(self, tagged_sentences: Sequence[Sequence[Tuple[str, str]]]) -> List[Entities]:
+        entities_per_sentence = []
+        for tree in get_ne_chunker().parse_sents([list(tags) for tags in tagged_sentences]):
+            entities = []
+            for chunk in tree:
+                if hasattr(chunk, 'label'):
+                    entity = ' '.join([token for token, pos in chunk.leaves()])
+                    entities.append((entity, chunk.label()))
+            entities_per_sentence.append(tuple(entities))
+        return entities_per_sentence
+
+    def stop_words(self) -> FrozenSet[str]:
+        return get_stop_words()
+
+    def warm_up(self):
+        tokens = self.word_tokenize(self.sent_tokenize("Warm up the tagger and chunker models.")[0])
+        self.entities_sents(self.tag_sents([tokens]))
+        get_stop_words()
+
+# NLTK's English stopword list, built in so the fast backend needs no corpora
+ENGLISH_STOP_WORDS = frozenset("""
+i me my myself we our ours ourselves you you're you've you'll you'd your yours yourself yourselves
+he him his himself she she's her hers herself it it's its itself they them their theirs themselves
+what which who whom this that that'll these those am is are was were be been being have has had
+having do does did doing a an the and but if or because as until while of at by for with about
+against between into through during before after above below to from up down in out on off over
+under again further then once here there when where why how all any both each few more most other
+some such no nor not only own same so than too very s t can will just don don't should should've
+now d ll m o re ve y ain aren aren't couldn couldn't didn didn't doesn doesn't hadn hadn't hasn
+hasn't haven haven't isn isn't ma mightn mightn't mustn mustn't needn needn't shan shan't shouldn
+shouldn't wasn wasn't weren weren't won won't wouldn wouldn't
+""".split())
+
+def _lexicon(tag: str, words: str) -> Dict[str, str]:
+    return {word: tag for word in words.split()}
+
+# Closed-class words and auxiliaries, which suffix rules cannot guess
+_CLOSED_CLASS = {
+    **_lexicon('DT', "a an the this that these those another each every either neither no some any all both half"),
+    **_lexicon('IN', "of in on at by for with about against between into through during before after above below "
+                     "from up down out off over under since until upon within without among across along around "
+                     "behind beyond despite toward towards via per than whether because although though while if "
+                     "unless whereas like near onto throughout"),
+    **_lexicon('CC', "and or but nor yet plus"),
+    **_lexicon('PRP', "i me we us you he him she her it they them myself ourselves yourself yourselves himself "
+                      "herself itself themselves"),
+    **_lexicon('PRP$', "my our your his its their"),
+    **_lexicon('MD', "can could may might must shall should will would"),
+    **_lexicon('WDT', "which whatever whichever"),
+    **_lexicon('WP', "who whom what whoever"),
+    **_lexicon('WP$', "whose"),
+    **_lexicon('WRB', "when where why how whenever wherever"),
+    **_lexicon('RB', "not n't also very often always never sometimes usually however therefore thus then now "
+                     "here there still already even just only too quite rather almost again soon ever once "
+                     "instead perhaps together later further else so hence indeed"),
+    **_lexicon('RBR', "more less"),
+    **_lexicon('RBS', "most least"),
+    **_lexicon('JJ', "many much few several other such same own new old good great high large small big long "
+                     "first last next early late important different major main possible real whole certain"),
+    **_lexicon('CD', "one two three four five six seven eight nine ten eleven twelve twenty thirty hundred "
+                     "thousand million billion"),
+    **_lexicon('VBZ', "is has does 's"),
+    **_lexicon('VBP', "are am have do 're 've 'm"),
+    **_lexicon('VBD', "was were had did"),
+    **_lexicon('VB', "be"),
+    **_lexicon('VBN', "been"),
+    **_lexicon('VBG', "being having"),
+    **_lexicon('FW', "e.g. i.e. etc."),
+    'to': 'TO',
+    'there': 'EX',
+    "'d": 'MD',
+    "'ll": 'MD',
+    "'s": 'POS',
+}
+
+# Common verbs in base form; their -s forms are VBZ after a subject
+_VERBS = frozenset("""
+accept achieve act add affect agree allow appear apply argue arrive ask assume attack avoid base become
+begin believe belong break bring build call carry cause change choose claim come compare consider consist
+contain continue contribute control convert cover create cut deal decide define depend describe design
+destroy determine develop die differ discover do drive eat emerge enable encourage end ensure enter
+establish examine exist expand explain express face fail fall feel fight find follow form gain get give go
+grow happen help hold identify illustrate improve include increase indicate influence involve keep know
+lack lead learn leave let lie live look lose make mean measure meet move need occur offer open operate
+pay perform place play point possess prefer prepare present prevent produce protect provide publish put
+raise reach read receive reduce reflect refer relate release remain remove replace represent require
+result return reveal rise run say see seek seem send serve set shape show spread stand start stay stop
+study suggest support surround take tell tend think transform travel treat try turn understand use vary
+want win work write
+""".split())
+
+_NUMBER = re.compile(r'^[+-]?\d[\d,.:/]*%?$')
+_ADJECTIVE_SUFFIXES = ('ous', 'ful', 'ive', 'able', 'ible', 'less', 'ical', 'ial', 'ic', 'al', 'ary', 'ish')
+_NOUN_SUFFIXES = ('tion', 'sion', 'ment', 'ness', 'ity', 'ism', 'ist', 'ance', 'ence', 'ship', 'ture')
+_PUNCTUATION_TAGS = {'.': '.', '!': '.', '?': '.', ',': ',', ';': ':', ':': ':', '--': ':', '...': ':',
+                     '(': '(', ')': ')', '[': '(', ']': ')', '{': '(', '}': ')', '``': '``', "''": "''", '"': "''",
+                     "'": "''", '$': '$', '#': '#', '-': ':', '—': ':', '–': ':', '…': ':',
+                     '“': '``', '‘': '``', '”': "''", '’': "''", '«': '``', '»': "''"}
+
+# Sentence ends that are not sentence ends
+_ABBREVIATIONS = frozenset("""
+mr mrs ms dr prof sr jr st mt vs etc e.g i.e u.s u.k no fig approx dept est inc ltd co corp jan feb mar
+apr jun jul aug sep sept oct nov dec
+""".split())
+
+_SENTENCE_END = re.compile(r'[.!?]+["\')\]]*(?=\s+["\'(\[]?[A-Z0-9])')
+_TOKEN = re.compile(r"(?:[A-Za-z]\.){2,}|\d+(?:[.,:]\d+)*%?|\w+(?:[-'’]\w+)*|\.\.\.|--|[^\w\s]")
+_CLITICS = ("'s", "'re", "'ve", "'ll", "'d", "'m")
+
+# Small built-in gazetteer: place names, demonyms and well-known organisations
+_GAZETTEER = {
+    **_lexicon('GPE', """
+        Africa America Asia Europe Oceania Antarctica Australia Austria Belgium Brazil Canada China Denmark
+        Egypt England Finland France Germany Greece India Indonesia Iran Iraq Ireland Israel Italy Japan
+        Kenya Korea Mexico Netherlands Nigeria Norway Pakistan Poland Portugal Russia Scotland Spain Sweden
+        Switzerland Turkey Ukraine Wales Britain London Paris Berlin Rome Madrid Moscow Beijing Tokyo Delhi
+        Mumbai Cairo Athens Vienna Geneva Washington Chicago Boston California Texas Florida York U.S. U.K.
+        American European African Asian British English French German Italian Spanish Chinese Japanese
+        Indian Russian Greek Roman Egyptian Canadian Australian Mexican Brazilian Arab Arabic Persian
+        """),
+    **_lexicon('LOCATION', "Atlantic Pacific Mediterranean Arctic Amazon Nile Sahara Himalayas Alps Everest Earth Mars"),
+    **_lexicon('ORGANIZATION', "NASA UN UNESCO NATO WHO EU IBM Google Microsoft Apple Congress Parliament"),
+}
+_ORGANIZATION_WORDS = frozenset("""
+University Institute College School Academy Company Corporation Corp Inc Ltd Agency Association Society
+Council Committee Bank Party Ministry Department Organization Organisation Foundation Museum Church Army
+Navy Court Senate Union Laboratory Center Centre Commission Group
+""".split())
+_PERSON_TITLES = frozenset("Mr Mrs Ms Dr Prof Professor President King Queen Sir Lady Lord Saint Pope General".split())
+
+class FastBackend(NLPBackend):
+    """Regex tokenizers and a heuristic tagger and entity detector, fully offline
+
+    Tags come from a closed-class lexicon, a list of common verbs and suffix
+    rules; entities are runs of capitalized proper nouns labelled from a small
+    gazetteer and cue words. Much faster than NLTK with no model files, at
+    some cost in accuracy (``benchmark.py --compare-backend fast`` measures
+    the agreement).
+    """
+
+    name = "fast"
+
+    def sent_tokenize(self, text: str) -> List[str]:
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(text):
+            before = text[start:match.start()].split()
+            last_word = before[-1].lower().rstrip('.') if before else ''
+            # Abbreviations and initials such as "J. Smith" do not end a sentence
+            if match.group().startswith('.') and (last_word in _ABBREVIATIONS or len(last_word) == 1):
+                continue
+            sentence = text[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        sentence = text[start:].strip()
+        if sentence:
+            sentences.append(sentence)
+        return sentences
+
+    def word_tokenize(self, sentence: str) -> List[str]:
+        tokens = []
+        for token in _TOKEN.findall(sentence):
+            lowered = token.lower()
+            # Keep the period of abbreviations: "Dr." stays one token
+            if token == '.' and tokens and tokens[-1].lower() in _ABBREVIATIONS:
+                tokens[-1] += '.'
+                continue
+            # Split clitics the way the Treebank tokenizer does: "don't" -> "do", "n't"
+            if lowered.endswith("n't") and len(token) > 3:
+                tokens.extend((token[:-3], token[-3:]))
+            elif "'" in token and lowered.endswith(_CLITICS):
+                split = token.rindex("'")
+                tokens.extend((token[:split], token[split:]))
+            else:
+                tokens.append(token)
+        return tokens
+
+    def _tag(self, word: str, previous: str, first: bool, next_word: str) -> str:
+        if word in _PUNCTUATION_TAGS:
+            return _PUNCTUATION_TAGS[word]
+        # Other symbols (bullets, arrows, stray quotes) must not end up inside noun phrases
+        if not any(c.isalnum() for c in word):
+            return 'SYM'
+        lowered = word.lower()
+        if _NUMBER.match(word):
+            return 'CD'
+        if word[0].isupper() and not first and lowered not in _CLOSED_CLASS:
+            return 'NNP'
+        if word.isupper() and len(word) > 1 or first and word in _GAZETTEER:
+            return 'NNP'
+        if lowered in _CLOSED_CLASS:
+            return _CLOSED_CLASS[lowered]
+        # A capitalized pair opening a sentence is a name: "Albert Einstein developed"
+        if first and word[0].isupper() and next_word[:1].isupper() and next_word.lower() not in _CLOSED_CLASS:
+            return 'NNP'
+        if previous in ('MD', 'TO') and lowered in _VERBS:
+            return 'VB'
+        # After a determiner or adjective a verb form is a noun: "the use of"
+        nominal = previous in ('DT', 'PRP$', 'JJ', 'POS', 'CD', 'IN')
+        if lowered in _VERBS:
+            return 'NN' if nominal else 'VBP'
+        if lowered.endswith('s') and not lowered.endswith(('ss', 'us', 'is')):
+            stem = lowered[:-2] if lowered.endswith('es') and lowered[:-2] in _VERBS else lowered[:-1]
+            if stem in _VERBS and not nominal:
+                return 'VBZ'
+            if lowered.endswith(_NOUN_SUFFIXES + ('ts', 'ns', 'ms')) or not stem.endswith(_ADJECTIVE_SUFFIXES):
+                return 'NNS'
+        if lowered.endswith('ly') and len(lowered) > 4:
+            return 'RB'
+        if lowered.endswith('ing') and len(lowered) > 5:
+            return 'NN' if previous == 'DT' else 'VBG'
+        if lowered.endswith('ed') and len(lowered) > 4:
+            if nominal:
+                return 'JJ'
+            return 'VBN' if previous.startswith('VB') else 'VBD'
+        if lowered.endswith(_NOUN_SUFFIXES):
+            return 'NN'
+        if lowered.endswith(_ADJECTIVE_SUFFIXES) and len(lowered) > 4:
+            return 'JJ'
+        return 'NN'
+
+    def tag_sents(self, sentences: Sequence[Sequence[str]]) -> List[List[Tuple[str, str]]]:
+        tagged_sentences = []
+        for tokens in sentences:
+            tagged = []
+            previous = ''
+            first = True
+            for i, word in enumerate(tokens):
+                next_word = tokens[i + 1] if i + 1 < len(tokens) else ''
+                previous = self._tag(word, previous, first, next_word)
+                tagged.append((word, previous))
+                # Opening quotes and brackets do not stop the next word being sentence-initial
+                first = first and word in _PUNCTUATION_TAGS
+            tagged_sentences.append(tagged)
+        return tagged_sentences
+
+    def _label(self, words: List[str], title: bool) -> str:
+        entity = ' '.join(words)
+        if entity in _GAZETTEER:
+            return _GAZETTEER[entity]
+        if any(word in _ORGANIZATION_WORDS for word in words) or entity.isupper():
+            return 'ORGANIZATION'
+        if title:
+            return 'PERSON'
+        for word in words:
+            if word in _GAZETTEER:
+                return _GAZETTEER[word]
+        # Like the maxent chunker, unknown multi-word names lean towards people
+        return 'PERSON' if len(words) > 1 else 'GPE'
+
+    def entities_sents(self, tagged_sentences: Sequence[Sequence[Tuple[str, str]]]) -> List[Entities]:
+        entities_per_sentence = []
+        for tagged in tagged_sentences:
+            entities = []
+            run = []
+            title = False
+            for word, tag in list(tagged) + [('', '')]:
+                if tag.startswith('NNP') and word[0].isupper() and word.rstrip('.') not in _PERSON_TITLES:
+                    run.append(word)
+                    continue
+                if run:
+                    entities.append((' '.join(run), self._label(run, title)))
+                    run = []
+                title = word.rstrip('.') in _PERSON_TITLES
+            entities_per_sentence.append(tuple(entities))
+        return entities_per_sentence
+
+    def stop_words(self) -> FrozenSet[str]:
+        return ENGLISH_STOP_WORDS
+
+BACKENDS = {
+    NLTKBackend.name: NLTKBackend,
+    FastBackend.name: FastBackend
+}
+
+def get_backend(backend: Union[str, NLPBackend, None] = None) -> NLPBackend:
+    """Resolve a backend instance, name, or ``None`` for QG_BACKEND (default ``nltk``)"""
+    if isinstance(backend, NLPBackend):
+        return backend
+    name = backend or os.environ.get("QG_BACKEND", NLTKBackend.name)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown NLP backend '{name}', choose from: {', '.join(sorted(BACKENDS))}")
+    return BACKENDS[name]()
@@ -0,0 +1,89 @@
+from collections import deque
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+class PhraseIndex:
+    """Inverted index from key phrases to their occurrences in a document's sentences
+
+    All phrases are matched case-insensitively in a single pass over the
+    lowercased sentences with an Aho-Corasick automaton, so building the index
+    costs one scan of the text however many phrases there are. Occurrences are
+    stored as ``(sentence_index, start, end)`` character offsets.
+    """
+
+    def __init__(self, phrases: Iterable[str], lowered_sentences: Sequence[str]):
+        patterns = []
+        for phrase in phrases:
+            pattern = phrase.lower()
+            if pattern and pattern not in patterns:
+                patterns.append(pattern)
+        self.occurrences: Dict[str, List[Tuple[int, int, int]]] = {p: [] for p in patterns}
+        if patterns:
+            self._scan(patterns, lowered_sentences)
+
+    def _scan(self, patterns: List[str], lowered_sentences: Sequence[str]):
+        """Build the automaton and record every match in every sentence"""
+        goto = [{}]
+        outputs = [[]]
+        for pattern in patterns:
+            state = 0
+            for char in pattern:
+                if char not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            outputs[state].append(pattern)
+
+        # Breadth-first failure links; outputs inherit the matches of their fallback state
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in goto[state].items():
+                queue.append(child)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(char, 0)
+                # Depth-one states would otherwise point at themselves
+                fail[child] = target if target != child else 0
+                outputs[child] = outputs[child] + outputs[fail[child]]
+
+        for sentence_index, sentence in enumerate(lowered_sentences):
+            state = 0
+            for position, char in enumerate(sentence):
+                while state and char not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(char, 0)
+                for pattern in outputs[state]:
+                    end = position + 1
+                    self.occurrences[pattern].append((sentence_index, end - len(pattern), end))
+
+        for matches in self.occurrences.values():
+            matches.sort()
+
+    def sentence_ids(self, phrase: str) -> List[int]:
+        """Indices of the sentences containing ``phrase``, in document order"""
+        ids = []
+        for sentence_index, _, _ in self.occurrences.get(phrase.lower(), ()):
+            if not ids or ids[-1] != sentence_index:
+                ids.append(sentence_index)
+        return ids
+
+    def spans(self, phrase: str, sentence_index: int) -> List[Tuple[int, int]]:
+        """Character spans of ``phrase`` in one sentence, in order (may overlap)"""
+        return [(start, end) for i, start, end in self.occurrences.get(phrase.lower(), ())
+                if i == sentence_index]
+
+def replace_spans(text: str, spans: List[Tuple[int, int]], replacement: str) -> str:
+    """Replace non-overlapping spans left to right, like ``str.replace`` does"""
+    pieces = []
+    last = 0
+    for start, end in spans:
+        if start < last:
+            continue
+        pieces.append(text[last:start])
+        pieces.append(replacement)
+        last = end
+    pieces.append(text[last:])
+    return ''.join(pieces)
@@ -0,0 +1,181 @@
+import argparse
+import hashlib
+import os
+import struct
+import sys
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+import numpy as np
+
+# Vocabulary file: header, then sorted uint64 phrase hashes, then uint32 document frequencies
+VOCABULARY_MAGIC = b"QGVOCAB1"
+_HEADER = struct.Struct("<8sQQ")  # magic, documents, terms
+
+def phrase_hash(phrase: str) -> int:
+    """Stable 64-bit hash of a phrase, case-insensitive"""
+    return int.from_bytes(hashlib.blake2b(phrase.lower().encode('utf-8'), digest_size=8).digest(), 'little')
+
+def phrase_hashes(phrases: Iterable[str]) -> np.ndarray:
+    return np.fromiter((phrase_hash(phrase) for phrase in phrases), dtype=np.uint64)
+
+class Vocabulary:
+    """Document frequencies over a reference corpus, memory-mapped read-only
+
+    Lookups are a binary search over the sorted hash array, so a vocabulary
+    of millions of phrases costs 12 bytes per phrase of page cache, shared by
+    every process that maps the file, and nothing to load.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            magic, documents, terms = _HEADER.unpack(file.read(_HEADER.size))
+        if magic != VOCABULARY_MAGIC:
+            raise ValueError(f"{path} is not a phrase vocabulary file")
+        self.path = path
+        self.documents = documents
+        if terms:
+            self.hashes = np.memmap(path, dtype='<u8', mode='r', offset=_HEADER.size, shape=(terms,))
+            self.dfs = np.memmap(path, dtype='<u4', mode='r', offset=_HEADER.size + 8 * terms, shape=(terms,))
+        else:
+            self.hashes = np.zeros(0, dtype='<u8')
+            self.dfs = np.zeros(0, dtype='<u4')
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def fingerprint(self) -> str:
+        return f"{os.path.basename(self.path)}:{self.documents}:{len(self)}"
+
+    def document_frequencies(self, hashes: np.ndarray) -> np.ndarray:
+        """Document frequency of each hash; 0 for phrases outside the vocabulary"""
+        if not len(self.hashes):
+            return np.zeros(len(hashes), dtype=np.uint32)
+        positions = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+        return np.where(self.hashes[positions] == hashes, self.dfs[positions], 0)
+
+    def idf(self, hashes: np.ndarray) -> np.ndarray:
+        """Smoothed inverse document frequency, ``ln((1 + N) / (1 + df)) + 1``"""
+        return np.log((1.0 + self.documents) / (1.0 + self.document_frequencies(hashes))) + 1.0
+
+class VocabularyBuilder:
+    """Counts in how many documents each phrase occurs, then writes a vocabulary file"""
+
+    def __init__(self):
+        self.documents = 0
+        self.counts: Dict[int, int] = {}
+
+    def add_document(self, phrases: Iterable[str]):
+        self.documents += 1
+        counts = self.counts
+        for key in {phrase_hash(phrase) for phrase in phrases}:
+            counts[key] = counts.get(key, 0) + 1
+
+    def write(self, path: str):
+        hashes = np.fromiter(self.counts.keys(), dtype='<u8', count=len(self.counts))
+        dfs = np.fromiter(self.counts.values(), dtype='<u4', count=len(self.counts))
+        order = np.argsort(hashes)
+        with open(path, 'wb') as file:
+            file.write(_HEADER.pack(VOCABULARY_MAGIC, self.documents, len(hashes)))
+            file.write(hashes[order].tobytes())
+            file.write(dfs[order].tobytes())
+
+def load_vocabulary(vocabulary: Union[str, Vocabulary, None]) -> Optional[Vocabulary]:
+    """A Vocabulary, a path to one, or ``None`` for QG_VOCABULARY (unset means none)"""
+    if isinstance(vocabulary, Vocabulary):
+        return vocabulary
+    path = vocabulary or os.environ.get("QG_VOCABULARY")
+    return Vocabulary(path) if path else None
+
+class PhraseRanker:
+    """Ranks candidate phrases by TF-IDF
+
+    The term frequency is the number of times a phrase occurs among a
+    paragraph's candidates. The IDF comes from the vocabulary; without one
+    every IDF is 1 and phrases rank by frequency alone. Ties keep the order
+    of first occurrence, so the top phrases are fully deterministic.
+    """
+
+    def __init__(self, vocabulary: Optional[Vocabulary] = None):
+        self.vocabulary = vocabulary
+
+    def fingerprint(self) -> str:
+        return self.vocabulary.fingerprint() if self.vocabulary is not None else "tf"
+
+    def rank(self, candidates: Sequence[str], top_k: int = 10) -> List[str]:
+        return self.rank_many([candidates], top_k)[0]
+
+    def rank_many(self, candidate_lists: Sequence[Sequence[str]], top_k: int = 10) -> List[List[str]]:
+        """Top phrases for several paragraphs, scored in one vectorized pass"""
+        phrases = []
+        counts = []
+        doc_ids = []
+        for doc_id, candidates in enumerate(candidate_lists):
+            # Dicts keep insertion order, i.e. the order of first occurrence
+            frequencies = {}
+            for phrase in candidates:
+                frequencies[phrase] = frequencies.get(phrase, 0) + 1
+            phrases.extend(frequencies)
+            counts.extend(frequencies.values())
+            doc_ids.extend([doc_id] * len(frequencies))
+        if not phrases:
+            return [[] for _ in candidate_lists]
+
+        scores = np.asarray(counts, dtype=np.float64)
+        if self.vocabulary is not None:
+            scores *= self.vocabulary.idf(phrase_hashes(phrases))
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        # lexsort is stable: by paragraph, then score descending, then first occurrence
+        order = np.lexsort((-scores, doc_ids))
+        bounds = np.searchsorted(doc_ids[order], np.arange(len(candidate_lists) + 1))
+        return [[phrases[i] for i in order[start:min(end, start + top_k)]]
+                for start, end in zip(bounds[:-1], bounds[1:])]
+
+def build_vocabulary(inputs: List[str], output: str, backend: Optional[str] = None,
+                     read_workers: int = 8, chunksize: int = 64) -> VocabularyBuilder:
+    """Count candidate phrase document frequencies over a reference corpus
+
+    ``inputs`` are files, directories or globs; every paragraph of at least
+    50 characters is one document and repeated paragraphs count once.
+    """
+    from question_generator import QuestionGenerator
+    from ingest import ParagraphDeduplicator, find_files, iter_file_paragraphs
+
+    generator = QuestionGenerator(analysis_cache_size=0, backend=backend)
+    deduplicator = ParagraphDeduplicator()
+    paths = []
+    for pattern in inputs:
+        paths.extend(find_files(pattern) if os.path.isdir(pattern) or any(c in pattern for c in '*?[') else [pattern])
+
+    def documents():
+        for _, paragraphs in iter_file_paragraphs(paths, read_workers):
+            for paragraph in paragraphs:
+                if len(paragraph) >= 50 and deduplicator.is_new(paragraph):
+                    yield paragraph
+
+    builder = VocabularyBuilder()
+    stream = documents()
+    while True:
+        chunk = list(islice(stream, chunksize))
+        if not chunk:
+            break
+        for doc in generator.analyze_many(chunk):
+            builder.add_document(generator.candidate_phrases(doc))
+    builder.write(output)
+    return builder
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the TF-IDF phrase vocabulary used to rank key phrases")
+    parser.add_argument('inputs', nargs='+', help="Reference corpus: files, directories or globs")
+    parser.add_argument('-o', '--output', default='vocabulary.qgv', help="Vocabulary file to write")
+    parser.add_argument('--backend', default=None, help="NLP backend used to find candidate phrases")
+    parser.add_argument('--read-workers', type=int, default=8, help="Threads reading input files")
+    args = parser.parse_args(argv)
+
+    builder = build_vocabulary(args.inputs, args.output, args.backend, args.read_workers)
+    size_mb = os.path.getsize(args.output) / (1024 * 1024)
+    print(f"✅ {len(builder.counts)} phrases from {builder.documents} paragraphs written to "
+          f"{args.output} ({size_mb:.1f} MB)", file=sys.stderr)
+    print("💡 Use it with QG_VOCABULARY or QuestionGenerator(vocabulary=...)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
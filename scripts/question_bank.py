@@ -0,0 +1,417 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from exporters import QuestionRow
+from result_cache import normalize_text
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS paragraphs (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    seed INTEGER,
+    source TEXT,
+    text TEXT NOT NULL,
+    categories TEXT NOT NULL,
+    stored_at REAL NOT NULL
+);
+-- Unseeded versions key on '', which no integer seed equals (ifnull(seed, -1) let seed -1 collide)
+DROP INDEX IF EXISTS paragraphs_version;
+CREATE UNIQUE INDEX IF NOT EXISTS paragraphs_seed_version ON paragraphs (hash, settings, ifnull(seed, ''));
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    paragraph INTEGER NOT NULL REFERENCES paragraphs (id),
+    position INTEGER NOT NULL,
+    question_type TEXT NOT NULL,
+    question TEXT NOT NULL,
+    options TEXT,
+    answer TEXT,
+    correct_answer_index INTEGER,
+    marks INTEGER NOT NULL,
+    phrase TEXT
+);
+CREATE INDEX IF NOT EXISTS questions_paragraph ON questions (paragraph, position);
+CREATE INDEX IF NOT EXISTS questions_type ON questions (question_type, marks);
+CREATE INDEX IF NOT EXISTS questions_marks ON questions (marks);
+CREATE INDEX IF NOT EXISTS questions_phrase ON questions (phrase);
+-- Exam assembly groups by question text; this covers it without a sort
+CREATE INDEX IF NOT EXISTS questions_text ON questions (question, marks);
+CREATE TABLE IF NOT EXISTS key_phrases (
+    paragraph INTEGER NOT NULL REFERENCES paragraphs (id),
+    rank INTEGER NOT NULL,
+    phrase TEXT NOT NULL,
+    folded TEXT NOT NULL,
+    PRIMARY KEY (paragraph, rank)
+);
+CREATE INDEX IF NOT EXISTS key_phrases_folded ON key_phrases (folded);
+"""
+
+# Full-text index over the questions, kept in sync by triggers
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5 (
+    question, answer, options, content='questions', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions BEGIN
+    INSERT INTO questions_fts (rowid, question, answer, options)
+    VALUES (new.id, new.question, new.answer, new.options);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN
+    INSERT INTO questions_fts (questions_fts, rowid, question, answer, options)
+    VALUES ('delete', old.id, old.question, old.answer, old.options);
+END;
+"""
+
+# A quoted phrase, or a bare word with an optional prefix star
+_FTS_TOKEN = re.compile(r'"[^"]*"\*?|[^\s"]+|"')
+_FTS_OPERATORS = {"AND", "OR", "NOT"}
+
+_ROW_COLUMNS = "p.hash, q.question_type, q.question, q.options, q.answer, q.correct_answer_index, q.marks"
+
+def paragraph_hash(paragraph: str) -> str:
+    """Content hash of a paragraph; whitespace differences do not change it"""
+    return hashlib.sha256(normalize_text(paragraph).encode('utf-8')).hexdigest()
+
+def settings_hash(settings: str) -> str:
+    """Short digest of ``QuestionGenerator.settings_fingerprint()``"""
+    return hashlib.sha256(settings.encode('utf-8')).hexdigest()[:16]
+
+def question_phrase(question: Dict, folded_phrases: Sequence[str]) -> Optional[str]:
+    """The (lowercased) key phrase a question asks about: the longest one it mentions as whole words"""
+    text = (question['question'] + '\n' + (question.get('answer') or '')).lower()
+    # "art" must not match inside "start" or "particle"
+    mentioned = [phrase for phrase in folded_phrases
+                 if phrase and re.search(r'(?<!\w)' + re.escape(phrase) + r'(?!\w)', text)]
+    return max(mentioned, key=len) if mentioned else None
+
+def fts_query(query: str) -> str:
+    """Make user text a valid FTS5 query, keeping phrases, ``AND``/``OR``/``NOT`` and ``prefix*``
+
+    Every other word is quoted, so punctuation inside it is matched as text
+    instead of being parsed as FTS5 syntax:
+
+    >>> print(fts_query("long-term sun's"))
+    "long-term" "sun's"
+    >>> print(fts_query('"solar power" OR renew* "unclosed'))
+    "solar power" OR "renew"* "unclosed"
+    """
+    terms = []
+    for token in _FTS_TOKEN.findall(query):
+        if token == '"':
+            continue
+        if token in _FTS_OPERATORS or (token.startswith('"') and len(token) > 1):
+            terms.append(token)
+            continue
+        star = '*' if token.endswith('*') and len(token) > 1 else ''
+        word = token[:-1] if star else token
+        terms.append('"' + word.replace('"', '""') + '"' + star)
+    return " ".join(terms)
+
+def _row(record: Tuple) -> QuestionRow:
+    para_hash, question_type, question, options, answer, index, marks = record
+    return QuestionRow(para_hash, question_type, question, tuple(json.loads(options)) if options else (),
+                       answer or '', -1 if index is None else index, marks)
+
+class QuestionBank:
+    """Persistent, indexed store of generated questions in a SQLite file
+
+    Every stored question set is keyed by the paragraph's content hash, the
+    generator settings and the seed, so a paragraph that was processed
+    before can be served in milliseconds instead of being tagged again.
+    Questions are indexed by type, marks and the key phrase they ask about,
+    and searchable with FTS5 full-text queries (``LIKE`` matching when the
+    SQLite build lacks FTS5). Safe to share between threads; WAL lets
+    several processes read while one writes.
+
+    Lookup results are ``QuestionRow`` records whose ``paragraph_id`` is the
+    paragraph hash.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+            self.full_text = True
+        except sqlite3.OperationalError:
+            self.full_text = False
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self) -> int:
+        """Number of stored question sets"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM paragraphs").fetchone()[0]
+
+    def add(self, paragraph: str, questions: Dict[str, List], source: Optional[str] = None,
+            seed: Optional[int] = None, settings: str = '') -> Optional[int]:
+        """Store the ``generate_questions`` output for a paragraph, replacing the same version
+
+        Error results are not stored. Returns the stored set's ID.
+        """
+        return self.add_many([(paragraph, questions, source)], seed, settings)[0]
+
+    def add_many(self, items: Iterable[Tuple[str, Dict[str, List], Optional[str]]], seed: Optional[int] = None,
+                 settings: str = '') -> List[Optional[int]]:
+        """Store several ``(paragraph, questions, source)`` results in one transaction"""
+        settings = settings_hash(settings) if settings else ''
+        ids = []
+        with self._lock, self._conn:
+            for paragraph, questions, source in items:
+                if "error" in questions:
+                    ids.append(None)
+                    continue
+                para_hash = paragraph_hash(paragraph)
+                existing = self._conn.execute(
+                    "SELECT id FROM paragraphs WHERE hash = ? AND settings = ? AND seed IS ?",
+                    (para_hash, settings, seed)).fetchone()
+                if existing is not None:
+                    for table in ("questions", "key_phrases"):
+                        self._conn.execute(f"DELETE FROM {table} WHERE paragraph = ?", existing)
+                    self._conn.execute("DELETE FROM paragraphs WHERE id = ?", existing)
+
+                categories = [category for category in questions if category != "Key Phrases Identified"]
+                para_id = self._conn.execute(
+                    "INSERT INTO paragraphs (hash, settings, seed, source, text, categories, stored_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (para_hash, settings, seed, source, paragraph, json.dumps(categories), time.time())).lastrowid
+                key_phrases = questions.get("Key Phrases Identified", [])
+                folded = [phrase.lower() for phrase in key_phrases]
+                self._conn.executemany(
+                    "INSERT INTO key_phrases (paragraph, rank, phrase, folded) VALUES (?, ?, ?, ?)",
+                    [(para_id, rank, phrase, fold) for rank, (phrase, fold) in enumerate(zip(key_phrases, folded))])
+
+                rows = []
+                for category in categories:
+                    for q in questions[category]:
+                        if isinstance(q, str):
+                            # Results saved before questions carried marks
+                            q = {"question": q, "marks": 0}
+                        options = q.get('options')
+                        rows.append((para_id, len(rows), category, q['question'],
+                                     json.dumps(options, ensure_ascii=False) if options is not None else None,
+                                     options[q['correct_answer_index']] if options is not None else q.get('answer'),
+                                     q.get('correct_answer_index'), q.get('marks', 0), question_phrase(q, folded)))
+                self._conn.executemany(
+                    "INSERT INTO questions (paragraph, position, question_type, question, options, answer, "
+                    "correct_answer_index, marks, phrase) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                ids.append(para_id)
+        return ids
+
+    def _find(self, paragraph: str, seed: Optional[int], settings: str, any_seed: bool) -> Optional[Tuple]:
+        query = "SELECT id, categories FROM paragraphs WHERE hash = ?"
+        params = [paragraph_hash(paragraph)]
+        if settings:
+            query += " AND settings = ?"
+            params.append(settings_hash(settings))
+        if not any_seed:
+            # IS, not =: a seed of None only matches unseeded versions
+            query += " AND seed IS ?"
+            params.append(seed)
+        return self._conn.execute(query + " ORDER BY stored_at DESC LIMIT 1", params).fetchone()
+
+    def contains(self, paragraph: str, seed: Optional[int] = None, settings: str = '',
+                 any_seed: bool = False) -> bool:
+        """Whether questions for ``paragraph`` are stored; see ``get`` for how versions match"""
+        with self._lock:
+            return self._find(paragraph, seed, settings, any_seed) is not None
+
+    def get(self, paragraph: str, seed: Optional[int] = None, settings: str = '',
+            any_seed: bool = False) -> Optional[Dict[str, List]]:
+        """The stored ``generate_questions`` output for a paragraph, or ``None``
+
+        Only the version stored with ``seed`` matches, so ``None`` finds
+        unseeded results and never seeded ones; ``any_seed`` lifts that
+        filter. ``''`` settings match any settings. When several versions
+        match, the most recently stored one is returned.
+        """
+        with self._lock:
+            found = self._find(paragraph, seed, settings, any_seed)
+            if found is None:
+                return None
+            para_id, categories = found
+            records = self._conn.execute(
+                "SELECT question_type, question, options, answer, correct_answer_index, marks "
+                "FROM questions WHERE paragraph = ? ORDER BY position", (para_id,)).fetchall()
+            key_phrases = [phrase for phrase, in self._conn.execute(
+                "SELECT phrase FROM key_phrases WHERE paragraph = ? ORDER BY rank", (para_id,))]
+
+        result = {category: [] for category in json.loads(categories)}
+        for question_type, question, options, answer, index, marks in records:
+            if options is not None:
+                q = {"question": question, "options": json.loads(options), "correct_answer_index": index, "marks": marks}
+            elif answer is not None:
+                q = {"question": question, "answer": answer, "marks": marks}
+            else:
+                q = {"question": question, "marks": marks}
+            result[question_type].append(q)
+        result["Key Phrases Identified"] = key_phrases
+        return result
+
+    def questions_for_phrase(self, phrase: str, question_type: Optional[str] = None,
+                             limit: int = 100) -> List[QuestionRow]:
+        """Stored questions about a key phrase (case-insensitive), newest first"""
+        query = f"SELECT {_ROW_COLUMNS} FROM questions q JOIN paragraphs p ON p.id = q.paragraph WHERE q.phrase = ?"
+        params = [phrase.lower()]
+        if question_type is not None:
+            query += " AND q.question_type = ?"
+            params.append(question_type)
+        with self._lock:
+            records = self._conn.execute(query + " ORDER BY q.id DESC LIMIT ?", params + [limit]).fetchall()
+        return [_row(record) for record in records]
+
+    def paragraphs_for_phrase(self, phrase: str, limit: int = 100) -> List[Tuple[str, Optional[str]]]:
+        """``(hash, source)`` of stored paragraphs with ``phrase`` among their key phrases"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT DISTINCT p.hash, p.source FROM key_phrases k JOIN paragraphs p ON p.id = k.paragraph "
+                "WHERE k.folded = ? ORDER BY p.id DESC LIMIT ?", (phrase.lower(), limit)).fetchall()
+
+    def search(self, query: str, limit: int = 50) -> List[QuestionRow]:
+        """Full-text search over question, answer and option text, best matches first
+
+        ``query`` may use quoted phrases, ``OR``/``AND``/``NOT`` and ``renew*``
+        prefixes; any other punctuation is matched literally (see
+        ``fts_query``). Without FTS5, or when the operators do not form a
+        valid query, it is matched as a plain substring.
+        """
+        with self._lock:
+            records = None
+            if self.full_text:
+                try:
+                    records = self._conn.execute(
+                        f"SELECT {_ROW_COLUMNS} FROM questions_fts f JOIN questions q ON q.id = f.rowid "
+                        "JOIN paragraphs p ON p.id = q.paragraph WHERE questions_fts MATCH ? ORDER BY f.rank LIMIT ?",
+                        (fts_query(query), limit)).fetchall()
+                except sqlite3.OperationalError:
+                    # e.g. a dangling "OR"
+                    pass
+            if records is None:
+                pattern = f"%{query}%"
+                records = self._conn.execute(
+                    f"SELECT {_ROW_COLUMNS} FROM questions q JOIN paragraphs p ON p.id = q.paragraph "
+                    "WHERE q.question LIKE ? OR q.answer LIKE ? OR q.options LIKE ? ORDER BY q.id DESC LIMIT ?",
+                    (pattern, pattern, pattern, limit)).fetchall()
+        return [_row(record) for record in records]
+
+    def assemble_exam(self, total_marks: int, question_types: Optional[Sequence[str]] = None,
+                      phrase: Optional[str] = None, seed: Optional[int] = None) -> List[QuestionRow]:
+        """Draw distinct stored questions adding up to at most ``total_marks``
+
+        Mark values are taken in turn, highest first, while they still fit,
+        so the paper mixes short and long questions; the budget is met
+        exactly whenever enough 1-mark questions exist. Candidates come from
+        the type, marks and phrase indexes and are sampled with ``seed``.
+        Questions are returned by marks, then in the order they were stored.
+        """
+        where = []
+        params = []
+        if question_types:
+            where.append(f"question_type IN ({', '.join('?' * len(question_types))})")
+            params.extend(question_types)
+        if phrase is not None:
+            where.append("phrase = ?")
+            params.append(phrase.lower())
+        condition = f"WHERE {' AND '.join(where)}" if where else ""
+        with self._lock:
+            # One candidate per distinct question text, so generic questions are not asked twice
+            candidates = self._conn.execute(
+                f"SELECT marks, MIN(id) FROM questions {condition} GROUP BY question ORDER BY 2", params).fetchall()
+
+        by_marks: Dict[int, List[int]] = {}
+        for marks, question_id in candidates:
+            if marks > 0:
+                by_marks.setdefault(marks, []).append(question_id)
+        rng = random.Random(seed)
+        for ids in by_marks.values():
+            rng.shuffle(ids)
+
+        chosen = []
+        remaining = total_marks
+        added = True
+        while added:
+            added = False
+            for marks in sorted(by_marks, reverse=True):
+                if marks <= remaining and by_marks[marks]:
+                    chosen.append(by_marks[marks].pop())
+                    remaining -= marks
+                    added = True
+        if not chosen:
+            return []
+
+        with self._lock:
+            records = self._conn.execute(
+                f"SELECT {_ROW_COLUMNS} FROM questions q JOIN paragraphs p ON p.id = q.paragraph "
+                f"WHERE q.id IN ({', '.join('?' * len(chosen))}) ORDER BY q.marks, q.id", chosen).fetchall()
+        return [_row(record) for record in records]
+
+    def import_results(self, results: Dict, seed: Optional[int] = None, settings: str = '') -> int:
+        """Store a ``process_text_file`` / ``questions_output.json`` results dict; returns how many sets"""
+        stored = self.add_many(((data["text"], data["questions"], para_id)
+                                for para_id, data in results.items() if "questions" in data), seed, settings)
+        return sum(para_id is not None for para_id in stored)
+
+def format_rows(rows: Sequence[QuestionRow]) -> str:
+    """Numbered plain-text listing of question rows"""
+    lines = []
+    for i, row in enumerate(rows, 1):
+        lines.append(f"{i}. [{row.question_type}, {row.marks} marks] {row.question}")
+        for j, option in enumerate(row.options):
+            lines.append(f"     {chr(97 + j)}) {option}")
+        if row.answer:
+            lines.append(f"     Answer: {row.answer}")
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Query and fill the question bank")
+    parser.add_argument('bank', help="Question bank SQLite file")
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help="Store a results JSON file (e.g. questions_output.json)")
+    importer.add_argument('results')
+    importer.add_argument('--seed', type=int, default=None, help="Seed the results were generated with")
+    search = commands.add_parser('search', help="Full-text search over stored questions")
+    search.add_argument('query')
+    search.add_argument('--limit', type=int, default=20)
+    phrase = commands.add_parser('phrase', help="Stored questions about a key phrase")
+    phrase.add_argument('phrase')
+    phrase.add_argument('--type', default=None, help="Only this question type")
+    phrase.add_argument('--limit', type=int, default=20)
+    exam = commands.add_parser('exam', help="Assemble an exam paper worth up to MARKS")
+    exam.add_argument('marks', type=int)
+    exam.add_argument('--type', action='append', default=None, help="Allowed question type (repeatable)")
+    exam.add_argument('--phrase', default=None, help="Only questions about this key phrase")
+    exam.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    bank = QuestionBank(args.bank)
+    try:
+        if args.command == 'import':
+            with open(args.results, 'r', encoding='utf-8') as file:
+                count = bank.import_results(json.load(file), args.seed)
+            print(f"✅ Stored {count} question sets in {args.bank}", file=sys.stderr)
+            return
+        if args.command == 'search':
+            rows = bank.search(args.query, args.limit)
+        elif args.command == 'phrase':
+            rows = bank.questions_for_phrase(args.phrase, args.type, args.limit)
+        else:
+            rows = bank.assemble_exam(args.marks, args.type, args.phrase, args.seed)
+            print(f"📝 Exam paper: {len(rows)} questions, {sum(row.marks for row in rows)} marks")
+        print(format_rows(rows) if rows else "No matching questions.")
+    finally:
+        bank.close()
+
+if __name__ == "__main__":
+    main()
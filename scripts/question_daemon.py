@@ -0,0 +1,392 @@
+import argparse
+import asyncio
+import json
+import os
+import queue
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+from question_service import MAX_BODY_BYTES, LatencyTracker, MicroBatcher, QueueFullError
+from nlp_backends import BACKENDS
+from ingest import JSONL_TEXT_FIELDS
+
+# Requests a client may have outstanding on one connection before it waits for replies
+PIPELINE_WINDOW = 64
+
+def default_socket_path() -> str:
+    """QG_SOCKET, or a per-user socket in the temporary directory"""
+    return os.environ.get("QG_SOCKET") or os.path.join(tempfile.gettempdir(),
+                                                       f"question_generator-{os.getuid()}.sock")
+
+def parse_request(line: str, seed: Optional[int] = None) -> Optional[Dict]:
+    """Turn one input line into a request, or None for a blank line
+
+    A JSON object may give ``paragraph`` (or any ``ingest.JSONL_TEXT_FIELDS``
+    field) and ``seed``; a JSON string or any other line is the paragraph
+    itself. ``seed`` applies when the line does not name one.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    paragraph = line
+    if line[0] in '{"':
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if isinstance(record, str):
+            paragraph = record
+        elif isinstance(record, dict):
+            for field in ("paragraph",) + JSONL_TEXT_FIELDS:
+                if isinstance(record.get(field), str):
+                    paragraph = record[field]
+                    break
+            if isinstance(record.get("seed"), int):
+                seed = record["seed"]
+    return {"paragraph": paragraph, "seed": seed}
+
+def _encode(payload: Dict) -> bytes:
+    return (json.dumps(payload, ensure_ascii=False) + "\n").encode('utf-8')
+
+class QuestionDaemon:
+    """Long-lived local server that keeps warm generators behind a Unix domain socket
+
+    The protocol is JSON Lines, one request per line and one reply per line
+    in request order, so clients can pipeline many requests on one
+    connection. Requests:
+
+      {"paragraph": "...", "seed": 42}  -> the generate_questions result
+      {"command": "ping"}               -> {"status": "ok", "settings": ...}
+      {"command": "stats"}              -> latency, queue and batch counters
+      {"command": "shutdown"}           -> {"status": "stopping"}, then the daemon exits
+
+    Paragraphs from every connection share the micro-batcher of
+    ``question_service``, so concurrent callers are tagged together on the
+    warm worker pool. A full queue slows readers down instead of failing.
+    """
+
+    def __init__(self, batcher: MicroBatcher, settings: str = '', pipeline: int = PIPELINE_WINDOW):
+        self.batcher = batcher
+        self.settings = settings
+        self.pipeline = pipeline
+        self.latency = LatencyTracker()
+        self.started = time.time()
+        self.connections = 0
+        self.stopping = asyncio.Event()
+        # Reading task of each open connection, by connection handler
+        self._open = {}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        loop = asyncio.get_running_loop()
+        # Replies are written in request order while later requests are still running
+        replies = asyncio.Queue(maxsize=self.pipeline)
+
+        async def read_requests():
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    too_long = loop.create_future()
+                    too_long.set_result({"error": ["Request line too long"]})
+                    await replies.put(too_long)
+                    return
+                if not line:
+                    return
+                if line.strip():
+                    await replies.put(loop.create_task(self.handle_line(line)))
+
+        async def respond():
+            connected = True
+            while True:
+                reply = await replies.get()
+                if reply is None:
+                    return
+                reply = await reply
+                if not connected:
+                    continue
+                try:
+                    writer.write(_encode(reply))
+                    await writer.drain()
+                except ConnectionError:
+                    # Keep draining the queue so the reader never blocks on it
+                    connected = False
+
+        responder = loop.create_task(respond())
+        reading = loop.create_task(read_requests())
+        handler = asyncio.current_task()
+        self._open[handler] = reading
+        try:
+            # Finishes at end of input, or when close_connections cancels the reading
+            await asyncio.wait({reading})
+            if not reading.cancelled() and reading.exception() is not None:
+                if not isinstance(reading.exception(), ConnectionError):
+                    raise reading.exception()
+        finally:
+            del self._open[handler]
+            await replies.put(None)
+            await responder
+            writer.close()
+
+    async def close_connections(self, timeout: float = 10.0):
+        """Stop reading requests; every connection still sends the replies it owes, then closes"""
+        handlers = list(self._open)
+        for reading in self._open.values():
+            reading.cancel()
+        if handlers:
+            await asyncio.wait(handlers, timeout=timeout)
+
+    async def handle_line(self, line: bytes) -> Dict:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise TypeError()
+        except (ValueError, TypeError):
+            return {"error": ["Expected a JSON object per line"]}
+
+        command = request.get("command")
+        if command == "ping":
+            return {"status": "ok", "settings": self.settings}
+        if command == "stats":
+            return self.stats()
+        if command == "shutdown":
+            self.stopping.set()
+            return {"status": "stopping"}
+        if command is not None:
+            return {"error": [f"Unknown command {command!r}"]}
+
+        paragraph = request.get("paragraph")
+        seed = request.get("seed")
+        if not isinstance(paragraph, str) or (seed is not None and not isinstance(seed, int)):
+            return {"error": ["Expected {\"paragraph\": str, \"seed\": int?}"]}
+
+        start = time.perf_counter()
+        while True:
+            try:
+                questions = await self.batcher.submit(paragraph, seed)
+                break
+            except QueueFullError:
+                # Back-pressure: wait for the batcher instead of failing the caller
+                await asyncio.sleep(0.005)
+            except Exception as e:
+                return {"error": [f"Generation failed: {e}"]}
+        elapsed = time.perf_counter() - start
+        self.latency.record(elapsed)
+        self.batcher.registry.observe("request", elapsed)
+        self.batcher.registry.inc("requests")
+        return questions
+
+    def stats(self) -> Dict:
+        return {
+            "uptime_s": time.time() - self.started,
+            "connections": self.connections,
+            "requests": self.latency.count,
+            "latency": self.latency.percentiles(),
+            **self.batcher.stats()
+        }
+
+def _claim_socket(path: str):
+    """Remove a stale socket file, refusing to start if a daemon already answers there"""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"A daemon is already listening on {path}")
+
+async def serve(path: str, workers: int, max_batch: int, window_ms: float, queue_limit: int,
+                backend: Optional[str] = None):
+    from question_generator import QuestionGenerator
+    _claim_socket(path)
+    batcher = MicroBatcher(workers=workers, max_batch=max_batch, window=window_ms / 1000,
+                           queue_limit=queue_limit, backend=backend)
+    # Workers start before the socket exists so they never inherit client connections
+    await batcher.start()
+    daemon = QuestionDaemon(batcher, QuestionGenerator(backend=backend).settings_fingerprint())
+    server = await asyncio.start_unix_server(daemon.handle_connection, path, limit=MAX_BODY_BYTES)
+    os.chmod(path, 0o600)
+    print(f"🚀 Question daemon listening on {path} ({workers} workers)", file=sys.stderr)
+    try:
+        await daemon.stopping.wait()
+    finally:
+        server.close()
+        await daemon.close_connections()
+        await batcher.close()
+        if os.path.exists(path):
+            os.unlink(path)
+    print("👋 Question daemon stopped", file=sys.stderr)
+
+class DaemonClient:
+    """Blocking client for a running ``QuestionDaemon``
+
+    ``generate_questions`` mirrors ``QuestionGenerator.generate_questions``, so
+    a client can stand in for a local generator; ``stream`` pipelines many
+    requests over the one connection.
+    """
+
+    def __init__(self, path: Optional[str] = None, timeout: Optional[float] = None):
+        self.path = path or default_socket_path()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(self.path)
+        except OSError:
+            self.sock.close()
+            raise
+        self._file = self.sock.makefile('rwb')
+        self._settings = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+        self.sock.close()
+
+    def _send(self, payload: Dict):
+        self._file.write(_encode(payload))
+        self._file.flush()
+
+    def _receive(self) -> Dict:
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError(f"Question daemon at {self.path} closed the connection")
+        return json.loads(line)
+
+    def request(self, payload: Dict) -> Dict:
+        """One round trip"""
+        self._send(payload)
+        return self._receive()
+
+    def generate_questions(self, paragraph: str, num_questions: int = 10, seed: Optional[int] = None) -> Dict:
+        """Questions for one paragraph, generated by the daemon"""
+        return self.request({"paragraph": paragraph, "seed": seed})
+
+    def stream(self, requests: Iterable[Dict], window: int = PIPELINE_WINDOW) -> Iterator[Dict]:
+        """Yield the reply to each request, in order, keeping up to ``window`` in flight
+
+        Requests are sent from a background thread as soon as ``requests``
+        produces them, so a slow producer such as an interactive pipe gets
+        each reply as soon as it is ready.
+        """
+        slots = threading.Semaphore(window)
+        sent = queue.Queue()
+        errors = []
+
+        def send():
+            try:
+                for payload in requests:
+                    slots.acquire()
+                    self._send(payload)
+                    sent.put(True)
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                sent.put(None)
+
+        sender = threading.Thread(target=send, daemon=True)
+        sender.start()
+        while sent.get() is not None:
+            reply = self._receive()
+            slots.release()
+            yield reply
+        sender.join()
+        if errors:
+            raise errors[0]
+
+    def generate_questions_many(self, paragraphs: Iterable[str], seed: Optional[int] = None) -> List[Dict]:
+        """Questions for many paragraphs over one pipelined connection"""
+        return list(self.stream({"paragraph": paragraph, "seed": seed} for paragraph in paragraphs))
+
+    def settings_fingerprint(self) -> str:
+        """The daemon generator's settings, for keying stored results"""
+        if self._settings is None:
+            self._settings = self.request({"command": "ping"})["settings"]
+        return self._settings
+
+    def stats(self) -> Dict:
+        return self.request({"command": "stats"})
+
+    def shutdown(self) -> Dict:
+        return self.request({"command": "shutdown"})
+
+def pipe(source: TextIO, output: TextIO, generator, seed: Optional[int] = None) -> int:
+    """Answer every input line with one JSON line of questions, in order
+
+    ``generator`` is a ``DaemonClient`` (replies are pipelined) or a local
+    ``QuestionGenerator``. Blank lines are skipped. Returns the number of replies.
+    """
+    requests = (request for request in (parse_request(line, seed) for line in source) if request is not None)
+    if isinstance(generator, DaemonClient):
+        replies = generator.stream(requests)
+    else:
+        replies = (generator.generate_questions(request["paragraph"], seed=request["seed"]) for request in requests)
+    count = 0
+    for reply in replies:
+        output.write(json.dumps(reply, ensure_ascii=False) + "\n")
+        # Flush every reply so the process at the other end of the pipe sees it at once
+        output.flush()
+        count += 1
+    return count
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Warm question generation daemon on a Unix domain socket")
+    parser.add_argument("--socket", default=None, help="Socket path (default: QG_SOCKET or a per-user temp file)")
+    sub = parser.add_subparsers(dest="command")
+
+    serve_parser = sub.add_parser("serve", help="Run the daemon in the foreground (default)")
+    serve_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    serve_parser.add_argument("--max-batch", type=int, default=16, help="Largest micro-batch")
+    serve_parser.add_argument("--window-ms", type=float, default=2.0, help="Batching window in milliseconds")
+    serve_parser.add_argument("--queue-limit", type=int, default=1024, help="Queued paragraphs before readers wait")
+    serve_parser.add_argument("--backend", choices=sorted(BACKENDS), default=None,
+                              help="NLP backend (default: QG_BACKEND or nltk)")
+
+    pipe_parser = sub.add_parser("pipe", help="Answer each stdin line (text or JSON) with a JSON line")
+    pipe_parser.add_argument("--seed", type=int, default=None, help="Seed for lines that do not give one")
+    sub.add_parser("ping", help="Check that the daemon is up")
+    sub.add_parser("stats", help="Print the daemon's counters")
+    sub.add_parser("stop", help="Ask the daemon to exit")
+
+    args = parser.parse_args(argv)
+    path = args.socket or default_socket_path()
+    if args.command in (None, "serve"):
+        if args.command is None:
+            args = serve_parser.parse_args([], namespace=args)
+        try:
+            asyncio.run(serve(path, args.workers, args.max_batch, args.window_ms, args.queue_limit, args.backend))
+        except RuntimeError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    try:
+        client = DaemonClient(path)
+    except OSError as e:
+        print(f"❌ No question daemon at {path}: {e}", file=sys.stderr)
+        sys.exit(1)
+    with client:
+        if args.command == "pipe":
+            pipe(sys.stdin, sys.stdout, client, args.seed)
+        elif args.command == "stats":
+            print(json.dumps(client.stats(), indent=2))
+        elif args.command == "stop":
+            client.shutdown()
+            print(f"✅ Stopping the daemon at {path}", file=sys.stderr)
+        else:
+            client.request({"command": "ping"})
+            print(f"✅ Question daemon is up at {path}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
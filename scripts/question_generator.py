@@ -1,22 +1,58 @@
+import os
 import re
+import sys
+import json
+import time
 import random
-from typing import List, Dict, Tuple
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.tag import pos_tag
-from nltk.chunk import ne_chunk
-from nltk.corpus import stopwords
-from collections import Counter
+import hashlib
+from dataclasses import dataclass
+from functools import cached_property
+from typing import List, Dict, Iterator, Tuple, Optional, Sequence, Union, FrozenSet
+from result_cache import cache_key, normalize_text, LRUCache
+from phrase_index import PhraseIndex
+from nlp_backends import NLPBackend, get_backend
+from phrase_ranking import PhraseRanker, Vocabulary, load_vocabulary
+from question_records import OpenQuestion, MultipleChoiceQuestion, FillInBlankQuestion, QuestionSet
+from distractors import DistractorIndex, embed_sentences, select_distractors
 
-def download_nltk_data():
-    """Downloads all necessary NLTK data models."""
+# Question categories in the order generate_questions returns them
+QUESTION_CATEGORIES = (
+    "Factual Questions",
+    "Analytical Questions",
+    "Comprehension Questions",
+    "Multiple Choice Questions",
+    "Fill in the Blank Questions",
+    "Deep Facility Questions"
+)
+
+def models_offline() -> bool:
+    """True when QG_NLTK_OFFLINE=1 declares the models present, skipping all download checks"""
+    return os.environ.get("QG_NLTK_OFFLINE", "") not in ("", "0")
+
+def download_nltk_data(offline: Optional[bool] = None):
+    """Downloads all necessary NLTK data models.
+
+    With ``offline`` (or QG_NLTK_OFFLINE=1) the models are assumed present and
+    no ``nltk.data.find`` probes run at all. With QG_MODEL_STORE set only the
+    sentence tokenizer is checked.
+    """
+    if offline if offline is not None else models_offline():
+        return
+    import nltk
+    # NLTK 3.9+ loads the *_tab and *_eng variants; older releases the originals
     packages = [
         ('tokenizers/punkt', 'punkt'),
+        ('tokenizers/punkt_tab', 'punkt_tab'),
         ('taggers/averaged_perceptron_tagger', 'averaged_perceptron_tagger'),
+        ('taggers/averaged_perceptron_tagger_eng', 'averaged_perceptron_tagger_eng'),
         ('chunkers/maxent_ne_chunker', 'maxent_ne_chunker'),
+        ('chunkers/maxent_ne_chunker_tab', 'maxent_ne_chunker_tab'),
         ('corpora/words', 'words'),
         ('corpora/stopwords', 'stopwords')
     ]
+    if os.environ.get("QG_MODEL_STORE"):
+        # The model store snapshot replaces everything but the sentence tokenizer
+        packages = packages[:2]
     for path, package_id in packages:
         try:
             nltk.data.find(path)
@@ -25,9 +61,72 @@ def download_nltk_data():
             nltk.download(package_id)
             print(f"'{package_id}' downloaded successfully.")
 
+def warm_up(backend: Union[str, NLPBackend, None] = None):
+    """Load every model now, e.g. in a parent process before forking workers
+
+    Forked children then share the loaded models instead of each loading
+    its own copy. ``backend`` defaults to QG_BACKEND, like ``QuestionGenerator``.
+    """
+    get_backend(backend).warm_up()
+
+def check_startup_budget(started: float, label: str, budget_ms: Optional[float] = None) -> float:
+    """Report the time since ``started`` (a ``time.perf_counter()`` value)
+
+    Warns on stderr when it exceeds ``budget_ms`` (default: QG_STARTUP_BUDGET_MS
+    or 1000 ms) and returns the elapsed milliseconds.
+    """
+    if budget_ms is None:
+        budget_ms = float(os.environ.get("QG_STARTUP_BUDGET_MS", 1000))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms > budget_ms:
+        print(f"⚠️  {label} startup took {elapsed_ms:.0f} ms (budget {budget_ms:.0f} ms)", file=sys.stderr)
+    return elapsed_ms
+
+def sentence_key(sentence: str) -> bytes:
+    """Sentence cache key: whitespace differences do not change the tokens or tags"""
+    return hashlib.sha256(normalize_text(sentence).encode('utf-8')).digest()
+
+@dataclass(frozen=True)
+class AnalyzedDocument:
+    """Immutable single-pass analysis of a paragraph shared by all generators.
+
+    Every per-sentence field is aligned with ``sentences``: ``tokens[i]``,
+    ``pos_tags[i]``, ``ne_chunks[i]`` and ``lowered[i]`` all describe
+    ``sentences[i]``. Named entities are stored as ``(entity, label)`` pairs.
+    """
+    text: str
+    sentences: Tuple[str, ...]
+    tokens: Tuple[Tuple[str, ...], ...]
+    pos_tags: Tuple[Tuple[Tuple[str, str], ...], ...]
+    ne_chunks: Tuple[Tuple[Tuple[str, str], ...], ...]
+    lowered: Tuple[str, ...]
+    
+    @cached_property
+    def sentence_vectors(self):
+        """Hashed n-gram sentence vectors for distractor selection, computed on first use"""
+        return embed_sentences(self.sentences)
+
 class QuestionGenerator:
-    def __init__(self):
-        self.stop_words = set(stopwords.words('english'))
+    def __init__(self, cache=None, analysis_cache_size: int = 256, hooks=None,
+                 backend: Union[str, NLPBackend, None] = None,
+                 vocabulary: Union[str, Vocabulary, None] = None,
+                 distractor_index: Optional[DistractorIndex] = None,
+                 sentence_cache_size: int = 4096):
+        # Tokenizer, tagger and entity detector; a name, an instance, or QG_BACKEND
+        self.backend = get_backend(backend)
+        # TF-IDF key phrase ranking; document frequencies come from QG_VOCABULARY when set
+        self.ranker = PhraseRanker(load_vocabulary(vocabulary))
+        # Optional cross-document sentence pool so short paragraphs still get real MCQ options
+        self.distractor_index = distractor_index
+        # Optional result cache (LRUResultCache or SQLiteResultCache) for seeded calls
+        self.cache = cache
+        # Optional metrics.StageHooks; when None no stage is timed at all
+        self.hooks = hooks
+        # Per-paragraph analysis and key phrases, reused when questions are resampled
+        self.analysis_cache = LRUCache(maxsize=analysis_cache_size) if analysis_cache_size > 0 else None
+        # Tokens, tags and entities per sentence, so an edited paragraph only re-tags the sentences that changed
+        self.sentence_cache = LRUCache(maxsize=sentence_cache_size) if sentence_cache_size > 0 else None
+        self._stop_words = None
         # Add marks for each question type including the new deep facility questions
         self.question_marks = {
             "Factual Questions": 1,
@@ -72,16 +171,176 @@ class QuestionGenerator:
             ]
         }
     
-    def extract_key_phrases(self, text: str) -> List[str]:
-        """Extract key phrases and named entities from text"""
-        sentences = sent_tokenize(text)
+    @property
+    def stop_words(self) -> FrozenSet[str]:
+        """English stopwords, loaded on first use"""
+        if self._stop_words is None:
+            self._stop_words = self.backend.stop_words()
+        return self._stop_words
+    
+    @stop_words.setter
+    def stop_words(self, words):
+        self._stop_words = words
+    
+    def settings_fingerprint(self, num_questions: int = 10) -> str:
+        """Serialize the settings that affect generated questions, for cache keys"""
+        # The cross-document distractor pool is left out: seeded questions never borrow from it
+        return json.dumps([self.backend.name, self.ranker.fingerprint(), num_questions,
+                           self.question_marks, self.question_templates], sort_keys=True)
+    
+    def _stage(self, stage: str, started: float) -> float:
+        """Report a finished stage to the hooks and return the current time"""
+        now = time.perf_counter()
+        self.hooks.on_stage(stage, now - started)
+        return now
+    
+    def _run_stage(self, stage: str, fn, *args):
+        """Call ``fn``, timing it only when hooks are configured"""
+        if self.hooks is None:
+            return fn(*args)
+        started = time.perf_counter()
+        result = fn(*args)
+        self._stage(stage, started)
+        return result
+    
+    def analyze(self, text: str) -> AnalyzedDocument:
+        """Tokenize, POS-tag and find the entities of a paragraph once for every generator"""
+        return self.analyze_many([text])[0]
+    
+    def analyze_many(self, texts: Sequence[str],
+                     sentences_per_text: Optional[Sequence[Sequence[str]]] = None) -> List[AnalyzedDocument]:
+        """Analyze several paragraphs with one bulk tagging and chunking pass
+
+        Sentences from every paragraph go through the backend's tagger and
+        entity detector together, then are split back per paragraph. Tagging
+        is per sentence either way, so the result is identical to analyzing
+        each paragraph on its own.
+
+        Sentences found in ``self.sentence_cache``, or repeated within the
+        batch, are not tokenized or tagged again. Pass ``sentences_per_text``
+        when the texts are already split into sentences.
+        """
+        hooks = self.hooks
+        started = time.perf_counter() if hooks is not None else 0.0
+        
+        backend = self.backend
+        if sentences_per_text is None:
+            sentences_per_text = [tuple(backend.sent_tokenize(text)) for text in texts]
+        else:
+            sentences_per_text = [tuple(sentences) for sentences in sentences_per_text]
+        if hooks is not None:
+            started = self._stage("sent_tokenize", started)
+        
+        cache = self.sentence_cache
+        keys = []
+        analyses = {}  # sentence key -> (tokens, pos_tags, ne_chunks)
+        missing = {}
+        for sentences in sentences_per_text:
+            for sentence in sentences:
+                key = sentence_key(sentence)
+                keys.append(key)
+                if key in analyses or key in missing:
+                    continue
+                cached = cache.get(key) if cache is not None else None
+                if cached is not None:
+                    analyses[key] = cached
+                else:
+                    missing[key] = sentence
+        
+        tokens = [tuple(backend.word_tokenize(sentence)) for sentence in missing.values()]
+        if hooks is not None:
+            started = self._stage("word_tokenize", started)
+        pos_tags = [tuple(tags) for tags in backend.tag_sents(tokens)]
+        if hooks is not None:
+            started = self._stage("pos_tag", started)
+        
+        # Entities come from the tagged sentences, so tagging is never repeated on the full text
+        ne_chunks = [tuple(entities) for entities in backend.entities_sents(pos_tags)]
+        if hooks is not None:
+            self._stage("ne_chunk", started)
+            hooks.on_count("paragraphs_analyzed", len(texts))
+            hooks.on_count("sentences_analyzed", len(tokens))
+            hooks.on_count("sentence_cache_hits", len(keys) - len(tokens))
+            hooks.on_count("tokens_analyzed", sum(len(t) for t in tokens))
+        
+        for key, analysis in zip(missing, zip(tokens, pos_tags, ne_chunks)):
+            analyses[key] = analysis
+            if cache is not None:
+                cache.put(key, analysis)
+        
+        docs = []
+        start = 0
+        for text, sentences in zip(texts, sentences_per_text):
+            end = start + len(sentences)
+            parts = [analyses[key] for key in keys[start:end]]
+            docs.append(AnalyzedDocument(
+                text=text,
+                sentences=sentences,
+                tokens=tuple(part[0] for part in parts),
+                pos_tags=tuple(part[1] for part in parts),
+                ne_chunks=tuple(part[2] for part in parts),
+                lowered=tuple(sentence.lower() for sentence in sentences)
+            ))
+            start = end
+        return docs
+    
+    def analyze_cached(self, paragraph: str) -> Tuple[AnalyzedDocument, Tuple[str, ...], PhraseIndex]:
+        """Return the analysis, key phrases and phrase index of a paragraph, computing them at most once"""
+        return self.analyze_cached_many([paragraph])[0]
+    
+    def analyze_cached_many(self, paragraphs: Sequence[str]) -> List[Tuple[AnalyzedDocument, Tuple[str, ...], PhraseIndex]]:
+        """Cached analysis for several paragraphs; all misses are analyzed in one bulk pass"""
+        keys = [hashlib.sha256(paragraph.encode('utf-8')).hexdigest() for paragraph in paragraphs]
+        analyses = {}
+        missing = {}
+        for key, paragraph in zip(keys, paragraphs):
+            if key in analyses or key in missing:
+                continue
+            cached = self.analysis_cache.get(key) if self.analysis_cache is not None else None
+            if cached is not None:
+                analyses[key] = cached
+            else:
+                missing[key] = paragraph
+        
+        docs = self.analyze_many(list(missing.values()))
+        key_phrases_per_doc = self._run_stage("extract_key_phrases", self.extract_key_phrases_many, docs)
+        for key, doc, key_phrases in zip(missing, docs, key_phrases_per_doc):
+            key_phrases = tuple(key_phrases)
+            index = self._run_stage("phrase_index", PhraseIndex, key_phrases, doc.lowered)
+            analyses[key] = (doc, key_phrases, index)
+            if self.distractor_index is not None:
+                self.distractor_index.add(doc.sentences, doc.sentence_vectors)
+            if self.analysis_cache is not None:
+                self.analysis_cache.put(key, analyses[key])
+        
+        if self.hooks is not None:
+            self.hooks.on_count("analysis_cache_misses", len(missing))
+            self.hooks.on_count("analysis_cache_hits", len(paragraphs) - len(missing))
+        
+        return [analyses[key] for key in keys]
+    
+    def _sentences(self, text: str, doc: Optional[AnalyzedDocument]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """Return sentences and their lowercased form, reusing the analysis when given"""
+        if doc is not None:
+            return doc.sentences, doc.lowered
+        sentences = tuple(self.backend.sent_tokenize(text))
+        return sentences, tuple(s.lower() for s in sentences)
+    
+    def extract_key_phrases(self, text: str, doc: Optional[AnalyzedDocument] = None) -> List[str]:
+        """Extract the top 10 key phrases and named entities from text, ranked by TF-IDF"""
+        if doc is None:
+            doc = self.analyze(text)
+        return self.ranker.rank(self.candidate_phrases(doc), 10)
+    
+    def extract_key_phrases_many(self, docs: Sequence[AnalyzedDocument]) -> List[List[str]]:
+        """Key phrases of several analyzed paragraphs, scored in one batch"""
+        return self.ranker.rank_many([self.candidate_phrases(doc) for doc in docs], 10)
+    
+    def candidate_phrases(self, doc: AnalyzedDocument) -> List[str]:
+        """Every noun phrase and named entity occurrence, in order and with repeats"""
         key_phrases = []
         
-        for sentence in sentences:
-            # Tokenize and tag parts of speech
-            tokens = word_tokenize(sentence)
-            pos_tags = pos_tag(tokens)
-            
+        for pos_tags in doc.pos_tags:
             # Extract noun phrases
             noun_phrases = []
             current_phrase = []
@@ -104,137 +363,152 @@ class QuestionGenerator:
             
             key_phrases.extend(noun_phrases)
         
-        # Extract named entities
-        tokens = word_tokenize(text)
-        pos_tags = pos_tag(tokens)
-        chunks = ne_chunk(pos_tags)
-        
-        named_entities = []
-        for chunk in chunks:
-            if hasattr(chunk, 'label'):
-                entity = ' '.join([token for token, pos in chunk.leaves()])
-                named_entities.append(entity)
+        # Named entities were chunked during analysis
+        named_entities = [entity for entities in doc.ne_chunks for entity, label in entities]
         
         # Combine and filter
         all_phrases = key_phrases + named_entities
         
-        # Remove duplicates and filter by frequency
-        phrase_counts = Counter(all_phrases)
-        filtered_phrases = [phrase for phrase, count in phrase_counts.items() 
-                          if len(phrase.split()) <= 4 and len(phrase) > 2]
-        
-        return list(set(filtered_phrases))[:10]  # Return top 10 unique phrases
+        # Repeats are kept: they are the term frequencies the ranker scores
+        return [phrase for phrase in all_phrases if len(phrase.split()) <= 4 and len(phrase) > 2]
     
-    def generate_multiple_choice_questions(self, text: str, key_phrases: List[str]) -> List[Dict]:
-        """Generate multiple choice questions with options"""
-        sentences = sent_tokenize(text)
+    def generate_multiple_choice_questions(self, text: str, key_phrases: List[str],
+                                           doc: Optional[AnalyzedDocument] = None,
+                                           index: Optional[PhraseIndex] = None,
+                                           rng: Optional[random.Random] = None,
+                                           borrow: bool = True) -> List[MultipleChoiceQuestion]:
+        """Generate multiple choice questions with options
+
+        With ``borrow`` short paragraphs may take options from the
+        cross-document ``distractor_index``; seeded calls turn it off, since
+        the pool depends on which paragraphs were seen before.
+        """
+        rng = rng if rng is not None else random.Random()
+        sentences, lowered = self._sentences(text, doc)
+        if index is None:
+            index = PhraseIndex(key_phrases[:3], lowered)
+        # Embedded once per document and cached with its analysis
+        vectors = doc.sentence_vectors if doc is not None else embed_sentences(sentences)
         questions = []
         
+        # Candidate distractors are the same for every phrase, so collect them once
+        distractor_pool = []
+        seen = set()
+        for i, s in enumerate(sentences):
+            if len(s) > 20 and s not in seen:
+                seen.add(s)
+                distractor_pool.append(i)
+        
         # Use key phrases to create questions
         for phrase in key_phrases[:3]:  # Limit to top 3 phrases
             # Find sentences containing the key phrase
-            relevant_sentences = [s for s in sentences if phrase.lower() in s.lower()]
+            relevant_ids = index.sentence_ids(phrase)
             
-            if not relevant_sentences:
+            if not relevant_ids:
                 continue
                 
             # Create question from the first relevant sentence
-            sentence = relevant_sentences[0]
-            
-            # Create question text
-            question_text = f"Which of the following best describes {phrase}?"
+            sentence_id = relevant_ids[0]
+            sentence = sentences[sentence_id]
             
             # Correct answer is the sentence containing the phrase
-            correct_answer = sentence
+            correct_answer = (sentence_id, 0, len(sentence))
             
-            # Generate distractors (incorrect options)
-            distractors = []
-            for s in sentences:
-                if s != sentence and len(s) > 20 and s not in distractors:
-                    distractors.append(s)
+            # Plausible distractors: the most similar sentences that do not mention the phrase
+            mentions = set(relevant_ids)
+            candidates = [i for i in distractor_pool if i not in mentions and sentences[i] != sentence]
+            distractors = [(i, 0, min(len(sentences[i]), 100))
+                           for i in select_distractors(vectors, sentence_id, candidates)]
             
-            # If we don't have enough distractors, create some
-            while len(distractors) < 3 and len(distractors) < len(sentences) - 1:
-                distractor = f"This is not related to {phrase}."
-                if distractor not in distractors:
-                    distractors.append(distractor)
+            # Short paragraphs borrow similar sentences from other documents
+            if len(distractors) < 3 and borrow and self.distractor_index is not None:
+                own = set(sentences)
+                phrase_lower = phrase.lower()
+                borrowed = self.distractor_index.nearest(
+                    vectors[sentence_id], 3 - len(distractors),
+                    lambda s: s in own or phrase_lower in s.lower())
+                distractors.extend(s[:100] + '...' if len(s) > 100 else s for s in borrowed)
             
-            # Limit distractor length
-            distractors = [d[:100] + '...' if len(d) > 100 else d for d in distractors[:3]]
+            # If we still don't have enough distractors, create one (only one unique filler exists);
+            # a single-sentence paragraph gets none, as before
+            if len(distractors) < min(3, len(sentences) - 1):
+                distractors.append(f"This is not related to {phrase}.")
             
             # Create options (shuffle correct answer with distractors)
             options = [correct_answer] + distractors
-            random.shuffle(options)
-            
-            # Find index of correct answer
-            correct_index = options.index(correct_answer)
+            rng.shuffle(options)
             
-            # Add question to list with marks
-            questions.append({
-                'question': question_text,
-                'options': options,
-                'correct_answer_index': correct_index,
-                'marks': self.question_marks["Multiple Choice Questions"]
-            })
+            # Options reference the document's sentences instead of copying them
+            questions.append(MultipleChoiceQuestion(
+                sentences, phrase, options, options.index(correct_answer),
+                self.question_marks["Multiple Choice Questions"]
+            ))
         
         return questions
     
-    def generate_fill_in_blank_questions(self, text: str, key_phrases: List[str]) -> List[Dict]:
+    def generate_fill_in_blank_questions(self, text: str, key_phrases: List[str],
+                                         doc: Optional[AnalyzedDocument] = None,
+                                         index: Optional[PhraseIndex] = None) -> List[FillInBlankQuestion]:
         """Generate fill-in-the-blank questions"""
-        sentences = sent_tokenize(text)
+        sentences, lowered = self._sentences(text, doc)
+        if index is None:
+            index = PhraseIndex(key_phrases[:3], lowered)
         questions = []
         
         # Use sentences containing key phrases
         for phrase in key_phrases[:3]:  # Limit to top 3 phrases
             # Find sentences containing the key phrase
-            relevant_sentences = [s for s in sentences if phrase.lower() in s.lower()]
+            relevant_ids = index.sentence_ids(phrase)
             
-            if not relevant_sentences:
+            if not relevant_ids:
                 continue
                 
             # Use the first relevant sentence
-            sentence = relevant_sentences[0]
+            sentence_id = relevant_ids[0]
+            sentence = sentences[sentence_id]
             
-            # Replace the phrase with a blank
-            blank_sentence = sentence.replace(phrase, "___________")
+            if len(lowered[sentence_id]) == len(sentence):
+                # Blank out exact-case matches, or every case-insensitive match if there are none
+                spans = index.spans(phrase, sentence_id)
+                exact_spans = [(start, end) for start, end in spans if sentence[start:end] == phrase]
+                spans = exact_spans or spans
+            else:
+                # Lowercasing changed the sentence length, so offsets do not line up
+                spans = [m.span() for m in re.finditer(re.escape(phrase), sentence)]
+                if not spans:
+                    spans = [m.span() for m in re.finditer(re.escape(phrase), sentence, re.IGNORECASE)]
             
-            # If phrase wasn't found with exact case, try case-insensitive replacement
-            if blank_sentence == sentence:
-                pattern = re.compile(re.escape(phrase), re.IGNORECASE)
-                blank_sentence = pattern.sub("___________", sentence)
-            
-            # Add question to list with marks
-            questions.append({
-                'question': blank_sentence,
-                'answer': phrase,
-                'marks': self.question_marks["Fill in the Blank Questions"]
-            })
+            # The blanked sentence is rendered from the spans on demand
+            questions.append(FillInBlankQuestion(
+                sentences, sentence_id, spans, phrase,
+                self.question_marks["Fill in the Blank Questions"]
+            ))
         
         return questions
     
-    def generate_factual_questions(self, text: str, key_phrases: List[str]) -> List[Dict]:
+    def generate_factual_questions(self, text: str, key_phrases: List[str],
+                                   rng: Optional[random.Random] = None) -> List[OpenQuestion]:
         """Generate factual questions based on key phrases"""
+        rng = rng if rng is not None else random.Random()
         questions = []
         
         for phrase in key_phrases[:5]:  # Limit to top 5 phrases
             # Choose random question type and template
             question_types = ['what', 'who', 'when', 'where']
-            question_type = random.choice(question_types)
-            template = random.choice(self.question_templates[question_type])
+            question_type = rng.choice(question_types)
+            template = rng.choice(self.question_templates[question_type])
             
             try:
                 question_text = template.format(phrase)
-                questions.append({
-                    'question': question_text,
-                    'marks': self.question_marks["Factual Questions"]
-                })
+                questions.append(OpenQuestion(question_text, self.question_marks["Factual Questions"]))
             except:
                 continue
         
         return questions
     
-    def generate_analytical_questions(self, text: str) -> List[Dict]:
+    def generate_analytical_questions(self, text: str, rng: Optional[random.Random] = None) -> List[OpenQuestion]:
         """Generate analytical and critical thinking questions"""
+        rng = rng if rng is not None else random.Random()
         analytical_questions = [
             "What are the main arguments presented in this text?",
             "How does this information relate to current events?",
@@ -247,28 +521,30 @@ class QuestionGenerator:
         ]
         
         # Return 3-4 random analytical questions with marks
-        selected_questions = random.sample(analytical_questions, min(4, len(analytical_questions)))
-        return [{'question': q, 'marks': self.question_marks["Analytical Questions"]} for q in selected_questions]
+        selected_questions = rng.sample(analytical_questions, min(4, len(analytical_questions)))
+        return [OpenQuestion(q, self.question_marks["Analytical Questions"]) for q in selected_questions]
     
-    def generate_comprehension_questions(self, text: str) -> List[Dict]:
+    def generate_comprehension_questions(self, text: str, doc: Optional[AnalyzedDocument] = None) -> List[OpenQuestion]:
         """Generate reading comprehension questions"""
-        sentences = sent_tokenize(text)
+        sentences, _ = self._sentences(text, doc)
         questions = []
         
         if len(sentences) >= 2:
             for q in ["What is the main idea of this passage?",
                      "Summarize the key points discussed in the text.",
                      "What conclusion can be drawn from this information?"]:
-                questions.append({'question': q, 'marks': self.question_marks["Comprehension Questions"]})
+                questions.append(OpenQuestion(q, self.question_marks["Comprehension Questions"]))
         
         if len(sentences) >= 3:
-            questions.append({'question': "How do the different parts of this text connect to each other?", 
-                             'marks': self.question_marks["Comprehension Questions"]})
+            questions.append(OpenQuestion("How do the different parts of this text connect to each other?",
+                                          self.question_marks["Comprehension Questions"]))
         
         return questions
     
-    def generate_deep_facility_questions(self, text: str, key_phrases: List[str]) -> List[Dict]:
+    def generate_deep_facility_questions(self, text: str, key_phrases: List[str],
+                                         rng: Optional[random.Random] = None) -> List[OpenQuestion]:
         """Generate deep facility questions worth 10 marks that test deeper understanding"""
+        rng = rng if rng is not None else random.Random()
         questions = []
         
         # Deep analytical questions that require comprehensive understanding
@@ -285,45 +561,243 @@ class QuestionGenerator:
         
         for phrase in significant_phrases:
             # Select a random deep question template
-            template = random.choice(deep_questions)
+            template = rng.choice(deep_questions)
             question_text = template.format(phrase)
             
             # Add question to list with 10 marks
-            questions.append({
-                'question': question_text,
-                'marks': self.question_marks["Deep Facility Questions"]
-            })
+            questions.append(OpenQuestion(question_text, self.question_marks["Deep Facility Questions"]))
         
         return questions
     
-    def generate_questions(self, paragraph: str, num_questions: int = 10) -> Dict[str, List[str]]:
-        """Generate various types of questions from a paragraph"""
+    def resample(self, paragraph: str, seed: int) -> Dict[str, List[str]]:
+        """Draw a fresh question set from the cached analysis of a paragraph
+
+        Only the template and option sampling runs, so repeated calls for
+        the same paragraph are nearly free. The explicit ``seed`` makes every
+        draw reproducible.
+        """
+        return self.generate_question_set(paragraph, seed).to_dict()
+    
+    def _iter_categories(self, paragraph: str, analysis, rng: random.Random,
+                         seeded: bool = False) -> Iterator[Tuple[str, List]]:
+        """Run every question generator over a paragraph, yielding ``(category, questions)`` as each finishes
+
+        ``analysis`` is an ``analyze_cached`` result, or a callable returning
+        one that is only called after the comprehension questions, which need
+        no tagging, are yielded. Draws from ``rng`` happen in the same order
+        either way, so a seed always gives the same questions; ``seeded``
+        calls do not borrow cross-document MCQ options.
+        """
+        run = self._run_stage
+        doc = None if callable(analysis) else analysis[0]
+        yield "Comprehension Questions", run("generate_comprehension_questions",
+                                             self.generate_comprehension_questions, paragraph, doc)
+        if callable(analysis):
+            analysis = analysis()
+        doc, key_phrases, index = analysis
+        key_phrases = list(key_phrases)
+        
+        # Generate different types of questions
+        yield "Factual Questions", run("generate_factual_questions", self.generate_factual_questions,
+                                       paragraph, key_phrases, rng)
+        yield "Analytical Questions", run("generate_analytical_questions", self.generate_analytical_questions,
+                                          paragraph, rng)
+        yield "Multiple Choice Questions", run("generate_multiple_choice_questions",
+                                               self.generate_multiple_choice_questions, paragraph, key_phrases,
+                                               doc, index, rng, not seeded)
+        yield "Fill in the Blank Questions", run("generate_fill_in_blank_questions",
+                                                 self.generate_fill_in_blank_questions, paragraph, key_phrases,
+                                                 doc, index)
+        yield "Deep Facility Questions", run("generate_deep_facility_questions",
+                                             self.generate_deep_facility_questions, paragraph, key_phrases,
+                                             rng)  # New question type
+    
+    def _sample_questions(self, paragraph: str, doc: AnalyzedDocument, key_phrases: Tuple[str, ...],
+                          index: PhraseIndex, rng: random.Random, seeded: bool = False) -> QuestionSet:
+        """Run every question generator over an analyzed paragraph, drawing from ``rng``"""
+        done = dict(self._iter_categories(paragraph, (doc, key_phrases, index), rng, seeded))
+        # Combine all questions
+        return QuestionSet([(name, done[name]) for name in QUESTION_CATEGORIES], list(key_phrases))
+    
+    def _trace(self, doc: AnalyzedDocument, key_phrases: Sequence[str], seed: Optional[int]):
+        """Report one generated paragraph to the hooks"""
+        self.hooks.on_trace({
+            "sentences": len(doc.sentences),
+            "tokens": sum(len(t) for t in doc.tokens),
+            "key_phrases": len(key_phrases),
+            "seed": seed
+        })
+    
+    def generate_question_set(self, paragraph: str, seed: Optional[int] = None,
+                              rng: Optional[random.Random] = None) -> QuestionSet:
+        """Like ``generate_questions`` but returns compact question records"""
+        return self.generate_question_sets_many([paragraph], seed, rng)[0]
+    
+    def iter_question_sets(self, paragraph: str, seed: Optional[int] = None,
+                           rng: Optional[random.Random] = None) -> Iterator[QuestionSet]:
+        """Yield ever more complete question sets for one paragraph, cheapest categories first
+
+        Comprehension questions only need the sentence split and come before
+        any tagging; the other categories follow one at a time once the
+        paragraph is analyzed. Each set lists the finished categories in the
+        usual order and the last one is complete. The generators run in the
+        same order as in ``generate_question_set``, so with a seed the final
+        set equals its result.
+        """
         if not paragraph or len(paragraph.strip()) < 50:
-            return {"error": ["Paragraph is too short. Please provide at least 50 characters."]}
+            yield QuestionSet(error="Paragraph is too short. Please provide at least 50 characters.")
+            return
+        if seed is not None:
+            rng = random.Random(seed)
+        elif rng is None:
+            rng = random.Random()
         
-        # Extract key phrases
-        key_phrases = self.extract_key_phrases(paragraph)
+        analyzed = []
         
-        # Generate different types of questions
-        factual_questions = self.generate_factual_questions(paragraph, key_phrases)
-        analytical_questions = self.generate_analytical_questions(paragraph)
-        comprehension_questions = self.generate_comprehension_questions(paragraph)
-        multiple_choice_questions = self.generate_multiple_choice_questions(paragraph, key_phrases)
-        fill_in_blank_questions = self.generate_fill_in_blank_questions(paragraph, key_phrases)
-        deep_facility_questions = self.generate_deep_facility_questions(paragraph, key_phrases)  # New question type
+        def analysis():
+            analyzed.extend(self.analyze_cached(paragraph))
+            return analyzed
         
-        # Combine all questions
-        all_questions = {
-            "Factual Questions": factual_questions,
-            "Analytical Questions": analytical_questions,
-            "Comprehension Questions": comprehension_questions,
-            "Multiple Choice Questions": multiple_choice_questions,
-            "Fill in the Blank Questions": fill_in_blank_questions,
-            "Deep Facility Questions": deep_facility_questions,  # Add new question type
-            "Key Phrases Identified": key_phrases
-        }
+        done = {}
+        for category, questions in self._iter_categories(paragraph, analysis, rng, seed is not None):
+            done[category] = questions
+            key_phrases = list(analyzed[1]) if analyzed else []
+            yield QuestionSet([(name, done[name]) for name in QUESTION_CATEGORIES if name in done], key_phrases)
+        if self.hooks is not None:
+            self._trace(analyzed[0], analyzed[1], seed)
+    
+    def generate_question_sets_many(self, paragraphs: Sequence[str],
+                                    seed: Union[None, int, Sequence[Optional[int]]] = None,
+                                    rng: Optional[random.Random] = None) -> List[QuestionSet]:
+        """Generate compact question records for many paragraphs with one bulk tagging pass
+
+        Records reference the cached analysis instead of copying sentences,
+        so large batches stay small in memory; ``QuestionSet.to_dict()``
+        gives the ``generate_questions`` output. The result cache, which
+        stores dicts, is not consulted.
+
+        Each seeded paragraph draws from its own ``random.Random(seed)``;
+        unseeded ones draw from ``rng``, or a fresh generator if none is given.
+        The module-level ``random`` state is never touched, so one instance can
+        serve many threads at once.
+        """
+        if seed is None or isinstance(seed, int):
+            seeds = [seed] * len(paragraphs)
+        else:
+            seeds = list(seed)
+        
+        results = [None] * len(paragraphs)
+        pending = []
+        for i, paragraph in enumerate(paragraphs):
+            if not paragraph or len(paragraph.strip()) < 50:
+                results[i] = QuestionSet(error="Paragraph is too short. Please provide at least 50 characters.")
+            else:
+                pending.append(i)
+        
+        # Analysis is cached per paragraph; only the random sampling runs again
+        analyses = self.analyze_cached_many([paragraphs[i] for i in pending])
+        for i, (doc, key_phrases, index) in zip(pending, analyses):
+            if seeds[i] is not None:
+                paragraph_rng = random.Random(seeds[i])
+            else:
+                paragraph_rng = rng if rng is not None else random.Random()
+            results[i] = self._sample_questions(paragraphs[i], doc, key_phrases, index, paragraph_rng,
+                                                seeds[i] is not None)
+            if self.hooks is not None:
+                self._trace(doc, key_phrases, seeds[i])
+        return results
+    
+    def generate_questions(self, paragraph: str, num_questions: int = 10,
+                           seed: Optional[int] = None, rng: Optional[random.Random] = None) -> Dict[str, List[str]]:
+        """Generate various types of questions from a paragraph
+
+        Passing a ``seed`` makes the random template and option choices
+        reproducible, so the same paragraph always yields the same questions.
+        Seeded results are served from ``self.cache`` when one is configured;
+        unseeded calls are meant to be random and always run the pipeline.
+        Without a seed the choices come from ``rng`` if one is passed.
+        """
+        return self.generate_questions_many([paragraph], num_questions, seed, rng)[0]
+    
+    def iter_questions(self, paragraph: str, num_questions: int = 10, seed: Optional[int] = None,
+                       rng: Optional[random.Random] = None) -> Iterator[Dict[str, List]]:
+        """Stream ``generate_questions`` output for one paragraph as categories finish
+
+        Built on ``iter_question_sets``; the last dict equals the result of
+        ``generate_questions``. A seeded result found in ``self.cache`` is
+        yielded at once, and a finished seeded result is stored there.
+        """
+        hooks = self.hooks
+        started = time.perf_counter() if hooks is not None else 0.0
+        key = None
+        cached = None
+        if self.cache is not None and seed is not None and paragraph and len(paragraph.strip()) >= 50:
+            key = cache_key(paragraph, self.settings_fingerprint(num_questions), seed)
+            cached = self.cache.get(key)
+        
+        if cached is not None:
+            yield cached
+        else:
+            result = None
+            for question_set in self.iter_question_sets(paragraph, seed, rng):
+                result = question_set.to_dict()
+                yield result
+            if key is not None:
+                self.cache.put(key, result)
+        
+        if hooks is not None:
+            self._stage("generate_questions", started)
+            hooks.on_count("paragraphs", 1)
+            hooks.on_count("result_cache_hits", int(cached is not None))
+    
+    def generate_questions_many(self, paragraphs: Sequence[str], num_questions: int = 10,
+                                seed: Union[None, int, Sequence[Optional[int]]] = None,
+                                rng: Optional[random.Random] = None) -> List[Dict[str, List[str]]]:
+        """Generate questions for many paragraphs with one bulk tagging pass
+
+        ``seed`` is either one seed used for every paragraph or a sequence
+        with one seed per paragraph. The output is identical to calling
+        ``generate_questions`` on each paragraph in turn. Unseeded
+        paragraphs draw from ``rng`` if one is passed.
+        """
+        if seed is None or isinstance(seed, int):
+            seeds = [seed] * len(paragraphs)
+        else:
+            seeds = list(seed)
+        
+        hooks = self.hooks
+        started = time.perf_counter() if hooks is not None else 0.0
+        results = [None] * len(paragraphs)
+        keys = [None] * len(paragraphs)
+        pending = []
+        cache_hits = 0
+        for i, (paragraph, paragraph_seed) in enumerate(zip(paragraphs, seeds)):
+            if not paragraph or len(paragraph.strip()) < 50:
+                results[i] = {"error": ["Paragraph is too short. Please provide at least 50 characters."]}
+                continue
+            
+            if self.cache is not None and paragraph_seed is not None:
+                keys[i] = cache_key(paragraph, self.settings_fingerprint(num_questions), paragraph_seed)
+                cached = self.cache.get(keys[i])
+                if cached is not None:
+                    results[i] = cached
+                    cache_hits += 1
+                    continue
+            pending.append(i)
+        
+        question_sets = self.generate_question_sets_many([paragraphs[i] for i in pending],
+                                                         [seeds[i] for i in pending], rng)
+        for i, question_set in zip(pending, question_sets):
+            results[i] = question_set.to_dict()
+            if keys[i] is not None:
+                self.cache.put(keys[i], results[i])
+        
+        if hooks is not None:
+            self._stage("generate_questions", started)
+            hooks.on_count("paragraphs", len(paragraphs))
+            hooks.on_count("result_cache_hits", cache_hits)
         
-        return all_questions
+        return results
 
 def main():
     print("🤖 AI Question Generator from Paragraphs")
@@ -0,0 +1,152 @@
+import json
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from phrase_index import replace_spans
+
+# (sentence_index, start, end) into a document's sentences, like PhraseIndex occurrences
+SentenceRef = Tuple[int, int, int]
+
+BLANK = "___________"
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, check_circular=False)
+
+class QuestionRecord:
+    """Compact, slots-based question; the question dict is only built on request
+
+    Records keep references into the analyzed document's sentences instead
+    of copied strings. For older callers they also behave like the read-only
+    dicts the generators used to return: ``record['question']``,
+    ``record.get('marks')`` and ``record == {...}`` all work.
+    """
+
+    __slots__ = ('marks',)
+    # Keys of the dict view, in output order
+    fields: Tuple[str, ...] = ()
+
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.fields}
+
+    def to_json(self) -> str:
+        return _ENCODER.encode(self.to_dict())
+
+    def __getitem__(self, key: str):
+        if key not in self.fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.fields else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.fields
+
+    def __eq__(self, other):
+        if isinstance(other, QuestionRecord):
+            return type(self) is type(other) and self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class OpenQuestion(QuestionRecord):
+    """A free-text question: factual, analytical, comprehension or deep facility"""
+
+    __slots__ = ('question',)
+    fields = ('question', 'marks')
+
+    def __init__(self, question: str, marks: int):
+        self.question = question
+        self.marks = marks
+
+class MultipleChoiceQuestion(QuestionRecord):
+    """Options are sentence references, or literal strings for filler distractors
+
+    A reference whose span stops short of the end of its sentence renders
+    with a trailing ``'...'``.
+    """
+
+    __slots__ = ('sentences', 'phrase', 'option_refs', 'correct_answer_index')
+    fields = ('question', 'options', 'correct_answer_index', 'marks')
+
+    def __init__(self, sentences: Sequence[str], phrase: str, option_refs: Sequence[Union[SentenceRef, str]],
+                 correct_answer_index: int, marks: int):
+        self.sentences = sentences
+        self.phrase = phrase
+        self.option_refs = tuple(option_refs)
+        self.correct_answer_index = correct_answer_index
+        self.marks = marks
+
+    @property
+    def question(self) -> str:
+        return f"Which of the following best describes {self.phrase}?"
+
+    @property
+    def options(self) -> List[str]:
+        options = []
+        for ref in self.option_refs:
+            if isinstance(ref, str):
+                options.append(ref)
+                continue
+            sentence_index, start, end = ref
+            sentence = self.sentences[sentence_index]
+            options.append(sentence[start:end] + '...' if end < len(sentence) else sentence[start:end])
+        return options
+
+class FillInBlankQuestion(QuestionRecord):
+    """The blanked sentence is rendered from the sentence and the answer's spans"""
+
+    __slots__ = ('sentences', 'sentence_index', 'spans', 'answer')
+    fields = ('question', 'answer', 'marks')
+
+    def __init__(self, sentences: Sequence[str], sentence_index: int, spans: Sequence[Tuple[int, int]],
+                 answer: str, marks: int):
+        self.sentences = sentences
+        self.sentence_index = sentence_index
+        self.spans = tuple(spans)
+        self.answer = answer
+        self.marks = marks
+
+    @property
+    def question(self) -> str:
+        return replace_spans(self.sentences[self.sentence_index], list(self.spans), BLANK)
+
+class QuestionSet:
+    """Every generated question for one paragraph, grouped by category
+
+    ``to_dict`` gives the ``generate_questions`` output: one list of question
+    dicts per category plus ``"Key Phrases Identified"``, or ``{"error":
+    [...]}`` when the paragraph was rejected.
+    """
+
+    __slots__ = ('categories', 'key_phrases', 'error')
+
+    def __init__(self, categories: Sequence[Tuple[str, List[QuestionRecord]]] = (),
+                 key_phrases: Sequence[str] = (), error: Optional[str] = None):
+        self.categories = tuple(categories)
+        self.key_phrases = tuple(key_phrases)
+        self.error = error
+
+    def __iter__(self) -> Iterator[Tuple[str, List[QuestionRecord]]]:
+        return iter(self.categories)
+
+    def __getitem__(self, category: str) -> List[QuestionRecord]:
+        for name, questions in self.categories:
+            if name == category:
+                return questions
+        raise KeyError(category)
+
+    def count(self) -> int:
+        return sum(len(questions) for _, questions in self.categories)
+
+    def to_dict(self) -> Dict[str, List]:
+        if self.error is not None:
+            return {"error": [self.error]}
+        result = {name: [q.to_dict() for q in questions] for name, questions in self.categories}
+        result["Key Phrases Identified"] = list(self.key_phrases)
+        return result
+
+    def to_json(self) -> str:
+        return _ENCODER.encode(self.to_dict())
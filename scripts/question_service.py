@@ -0,0 +1,382 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from question_generator import QuestionGenerator, warm_up
+from metrics import MetricsHooks, MetricsRegistry
+from nlp_backends import BACKENDS
+
+STATUS_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable"
+}
+
+MAX_BODY_BYTES = 1024 * 1024
+
+# Generator owned by each worker process, created once by _init_service_worker
+_service_generator = None
+
+def _init_service_worker(backend: Optional[str] = None):
+    """Load the NLP models once per worker process"""
+    global _service_generator
+    _service_generator = QuestionGenerator(hooks=MetricsHooks(), backend=backend)
+    warm_up(backend)
+
+def _generate_batch(requests: List[Tuple[str, Optional[int]]]) -> Tuple[List[Dict], Dict]:
+    """Generate questions for one micro-batch of (paragraph, seed) requests
+
+    Returns the results and the worker's stage metrics since the last batch,
+    which the serving process merges into its own registry.
+    """
+    paragraphs = [paragraph for paragraph, _ in requests]
+    results = _service_generator.generate_questions_many(paragraphs, seed=[seed for _, seed in requests])
+    return results, _service_generator.hooks.registry.snapshot(reset=True)
+
+class LatencyTracker:
+    """Keeps the most recent request latencies and reports percentiles"""
+
+    def __init__(self, window: int = 10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentiles(self) -> Dict[str, float]:
+        """p50/p90/p99/max latency in milliseconds over the recent window"""
+        if not self.samples:
+            return {"p50_ms": 0.0, "p90_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return {
+            "p50_ms": ordered[int(last * 0.50)] * 1000,
+            "p90_ms": ordered[int(last * 0.90)] * 1000,
+            "p99_ms": ordered[int(last * 0.99)] * 1000,
+            "max_ms": ordered[last] * 1000
+        }
+
+class QueueFullError(Exception):
+    """Raised when the request queue is at its limit"""
+
+class MicroBatcher:
+    """Groups requests arriving within a short window and runs them on a process pool
+
+    At most ``workers`` batches are in flight at once. Requests wait in a
+    bounded queue; when it is full new requests are rejected immediately so
+    callers can back off instead of piling up.
+    """
+
+    def __init__(self, workers: int = 1, max_batch: int = 16, window: float = 0.01,
+                 queue_limit: int = 256, registry: Optional[MetricsRegistry] = None,
+                 backend: Optional[str] = None):
+        self.workers = workers
+        self.registry = registry if registry is not None else MetricsRegistry()
+        self.max_batch = max_batch
+        self.window = window
+        self.queue = asyncio.Queue(maxsize=queue_limit)
+        # Load the models in the parent so forked workers share them copy-on-write
+        warm_up(backend)
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_service_worker,
+                                            initargs=(backend,))
+        self.slots = asyncio.Semaphore(workers)
+        self.batches = 0
+        self.batched_requests = 0
+        self.rejected = 0
+        self._task = None
+
+    async def start(self):
+        """Start the worker processes and the batching loop
+
+        Call this before the server accepts connections: forked workers would
+        otherwise inherit open client sockets and keep them from closing.
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _generate_batch, [])
+                               for _ in range(self.workers)))
+        self._task = loop.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, paragraph: str, seed: Optional[int] = None) -> Dict:
+        """Queue one paragraph and wait for its questions"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((paragraph, seed, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.slots.acquire()
+            batch = [await self.queue.get()]
+            # Collect whatever else arrives within the batching window
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        self.batches += 1
+        self.batched_requests += len(batch)
+        try:
+            requests = [(paragraph, seed) for paragraph, seed, _ in batch]
+            results, worker_metrics = await loop.run_in_executor(self.executor, _generate_batch, requests)
+            self.registry.merge(worker_metrics)
+            self.registry.inc("batches")
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.slots.release()
+
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_limit": self.queue.maxsize,
+            "batches": self.batches,
+            "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+            "rejected": self.rejected
+        }
+
+def _response(status: int, payload, keep_alive: bool = True, extra_headers: Tuple = (),
+              content_type: str = "application/json; charset=utf-8") -> bytes:
+    if isinstance(payload, str):
+        body = payload.encode('utf-8')
+    else:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    headers = [
+        f"HTTP/1.1 {status} {STATUS_REASONS[status]}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}"
+    ]
+    headers.extend(extra_headers)
+    return ("\r\n".join(headers) + "\r\n\r\n").encode('latin-1') + body
+
+class QuestionService:
+    """Minimal asyncio HTTP/JSON front end around the micro-batcher
+
+    Routes:
+      POST /generate  {"paragraph": "...", "seed": 42}  -> questions
+      GET  /stats     latency percentiles, queue and batch counters
+      GET  /metrics   per-stage timings and counters in Prometheus text format
+      GET  /metrics.json  the same metrics as JSON
+      GET  /health    liveness probe
+    """
+
+    def __init__(self, batcher: MicroBatcher):
+        self.batcher = batcher
+        self.latency = LatencyTracker()
+        self.started = time.time()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    writer.write(_response(400, {"error": "Malformed request line"}, keep_alive=False))
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                # Without a valid length the body cannot be framed, so the connection is closed
+                if "content-length" not in headers:
+                    if method == "POST":
+                        writer.write(_response(411, {"error": "Content-Length required"}, keep_alive=False))
+                        break
+                    length = 0
+                else:
+                    try:
+                        length = int(headers["content-length"])
+                        if length < 0:
+                            raise ValueError()
+                    except ValueError:
+                        writer.write(_response(400, {"error": "Invalid Content-Length"}, keep_alive=False))
+                        break
+                if length > MAX_BODY_BYTES:
+                    writer.write(_response(413, {"error": "Request body too large"}, keep_alive=False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                writer.write(await self.route(method, path, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method: str, path: str, body: bytes, keep_alive: bool) -> bytes:
+        if path == "/health":
+            return _response(200, {"status": "ok"}, keep_alive)
+        if path == "/stats":
+            return _response(200, self.stats(), keep_alive)
+        if path == "/metrics":
+            return _response(200, self.batcher.registry.to_prometheus(), keep_alive,
+                             content_type="text/plain; version=0.0.4; charset=utf-8")
+        if path == "/metrics.json":
+            return _response(200, self.batcher.registry.to_json(), keep_alive)
+        if path != "/generate":
+            return _response(404, {"error": f"Unknown path {path}"}, keep_alive)
+        if method != "POST":
+            return _response(405, {"error": "Use POST"}, keep_alive)
+
+        try:
+            request = json.loads(body or b"{}")
+            paragraph = request["paragraph"]
+            seed = request.get("seed")
+            if not isinstance(paragraph, str) or (seed is not None and not isinstance(seed, int)):
+                raise TypeError()
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return _response(400, {"error": "Expected JSON body {\"paragraph\": str, \"seed\": int?}"}, keep_alive)
+
+        start = time.perf_counter()
+        try:
+            questions = await self.batcher.submit(paragraph, seed)
+        except QueueFullError:
+            self.batcher.registry.inc("requests_rejected")
+            return _response(503, {"error": "Server busy, retry later"}, keep_alive, ("Retry-After: 1",))
+        except Exception as e:
+            # e.g. a broken worker pool or missing model data; the connection stays usable
+            self.batcher.registry.inc("requests_failed")
+            return _response(500, {"error": f"Generation failed: {e}"}, keep_alive)
+        elapsed = time.perf_counter() - start
+        self.latency.record(elapsed)
+        self.batcher.registry.observe("request", elapsed)
+        self.batcher.registry.inc("requests")
+        return _response(200, questions, keep_alive)
+
+    def stats(self) -> Dict:
+        return {
+            "uptime_s": time.time() - self.started,
+            "requests": self.latency.count,
+            "latency": self.latency.percentiles(),
+            **self.batcher.stats()
+        }
+
+async def serve(host: str, port: int, workers: int, max_batch: int, window_ms: float, queue_limit: int,
+                backend: Optional[str] = None):
+    batcher = MicroBatcher(workers=workers, max_batch=max_batch, window=window_ms / 1000,
+                           queue_limit=queue_limit, backend=backend)
+    await batcher.start()
+    service = QuestionService(batcher)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"🚀 Question service listening on http://{host}:{port} ({workers} workers)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.close()
+
+async def _client_request(host: str, port: int, paragraph: str, seed: Optional[int]) -> Tuple[int, float]:
+    """Send one /generate request on a fresh connection and return (status, seconds)"""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps({"paragraph": paragraph, "seed": seed}).encode('utf-8')
+    writer.write((f"POST /generate HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(status_line.split()[1]), time.perf_counter() - start
+
+async def load_test(host: str, port: int, paragraphs: List[str], requests: int, concurrency: int):
+    """Stub client that fires ``requests`` calls with bounded concurrency and reports latency"""
+    latency = LatencyTracker(window=requests)
+    statuses = {}
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with limit:
+            status, seconds = await _client_request(host, port, paragraphs[i % len(paragraphs)], i)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latency.record(seconds)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "throughput_rps": requests / elapsed if elapsed else 0.0,
+        "statuses": statuses,
+        "latency": latency.percentiles()
+    }, indent=2))
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Async HTTP question generation service")
+    sub = parser.add_subparsers(dest="command")
+
+    serve_parser = sub.add_parser("serve", help="Run the service (default)")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    serve_parser.add_argument("--max-batch", type=int, default=16, help="Largest micro-batch")
+    serve_parser.add_argument("--window-ms", type=float, default=10.0, help="Batching window in milliseconds")
+    serve_parser.add_argument("--queue-limit", type=int, default=256, help="Queued requests before rejecting")
+    serve_parser.add_argument("--backend", choices=sorted(BACKENDS), default=None,
+                              help="NLP backend (default: QG_BACKEND or nltk)")
+
+    load_parser = sub.add_parser("loadtest", help="Load-test a running service with a stub client")
+    load_parser.add_argument("--host", default="127.0.0.1")
+    load_parser.add_argument("--port", type=int, default=8080)
+    load_parser.add_argument("--requests", type=int, default=500)
+    load_parser.add_argument("--concurrency", type=int, default=32)
+    load_parser.add_argument("--input", default="sample_content.txt", help="Paragraphs to send")
+
+    args = parser.parse_args(argv)
+    if args.command == "loadtest":
+        from batch_processor import iter_paragraphs
+        paragraphs = [p for p in iter_paragraphs(args.input) if len(p) >= 50]
+        asyncio.run(load_test(args.host, args.port, paragraphs, args.requests, args.concurrency))
+    else:
+        if args.command is None:
+            args = serve_parser.parse_args([])
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_batch, args.window_ms, args.queue_limit,
+                          args.backend))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+sys.path.insert(0, SCRIPTS)
+# The fast backend needs no NLTK data, so the suite runs offline
+os.environ.setdefault("QG_BACKEND", "fast")
+
+from batch_processor import iter_paragraphs  # noqa: E402
+
+SAMPLE_FILE = os.path.join(SCRIPTS, '..', 'sample_content.txt')
+
+@pytest.fixture(scope="session")
+def paragraphs():
+    """The substantial paragraphs of the sample content"""
+    return [p for p in iter_paragraphs(SAMPLE_FILE) if len(p) >= 50]
+
+@pytest.fixture
+def generator():
+    from question_generator import QuestionGenerator
+    return QuestionGenerator(backend="fast")
@@ -0,0 +1,78 @@
+import io
+import json
+
+import pytest
+
+from batch_processor import BatchQuestionProcessor, JsonLinesWriter
+from batch_jobs import BatchJob, merge_job
+
+@pytest.fixture
+def input_file(tmp_path, paragraphs):
+    path = tmp_path / "input.txt"
+    # A short paragraph in between must still be counted in the IDs
+    path.write_text("\n\n".join(paragraphs[:2] + ["Too short."] + paragraphs[2:]), encoding="utf-8")
+    return str(path)
+
+def test_pool_and_serial_runs_match(input_file):
+    processor = BatchQuestionProcessor(backend="fast")
+    serial = processor.process_text_file(input_file, workers=1, seed=11)
+    pooled = processor.process_text_file(input_file, workers=2, seed=11)
+    assert "Paragraph_3" not in serial
+    assert list(serial) == ["Paragraph_1", "Paragraph_2", "Paragraph_4"]
+    assert pooled == serial
+
+def test_stream_writes_one_json_line_per_paragraph(input_file):
+    output = io.StringIO()
+    count = BatchQuestionProcessor(backend="fast").process_stream(input_file, JsonLinesWriter(output), seed=2)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert count == len(records) == 3
+    assert [record["id"] for record in records] == ["Paragraph_1", "Paragraph_2", "Paragraph_4"]
+
+def test_merged_shards_equal_a_single_run(tmp_path, input_file):
+    processor = BatchQuestionProcessor(backend="fast")
+    job_dir = str(tmp_path / "job")
+    counts = [BatchJob(job_dir, shard, 2).run(processor, input_file, seed=4) for shard in (0, 1)]
+    assert sum(counts) == 3
+    merged = str(tmp_path / "merged.json")
+    assert merge_job(job_dir, merged, 'json') == 3
+
+    single = str(tmp_path / "single.json")
+    processor.save_to_json(processor.process_text_file(input_file, seed=4), single)
+    with open(merged, encoding="utf-8") as a, open(single, encoding="utf-8") as b:
+        assert a.read() == b.read()
+
+def test_job_resumes_without_redoing_paragraphs(tmp_path, input_file):
+    processor = BatchQuestionProcessor(backend="fast")
+    job = BatchJob(str(tmp_path / "job"))
+    assert job.run(processor, input_file, seed=4) == 3
+    assert job.run(processor, input_file, seed=4) == 0
+    with pytest.raises(ValueError):
+        job.run(processor, input_file, seed=5)
+
+def test_bank_serves_stored_results(tmp_path, input_file):
+    bank = str(tmp_path / "bank.db")
+    first = BatchQuestionProcessor(backend="fast", bank_path=bank)
+    generated = first.process_text_file(input_file, seed=8)
+    assert first.banked == 0
+
+    second = BatchQuestionProcessor(backend="fast", bank_path=bank)
+    assert second.process_text_file(input_file, seed=8) == generated
+    assert second.banked == 3
+
+def test_repeated_paragraphs_reuse_the_first_result(tmp_path, paragraphs):
+    one = tmp_path / "one.txt"
+    two = tmp_path / "two.txt"
+    bad = tmp_path / "bad.txt"
+    one.write_text("\n\n".join(paragraphs[:2]), encoding="utf-8")
+    two.write_text("\n\n".join([paragraphs[1], paragraphs[2], paragraphs[1]]), encoding="utf-8")
+    bad.write_bytes(b"\xff\xfe not utf-8 " * 10)
+
+    for workers in (1, 2):
+        processor = BatchQuestionProcessor(backend="fast")
+        results = dict(processor.iter_file_results([str(one), str(bad), str(two)], workers=workers, seed=6))
+        # The unreadable file is skipped, every other paragraph keeps its own ID
+        assert list(results) == [f"{one}#Paragraph_1", f"{one}#Paragraph_2",
+                                 f"{two}#Paragraph_1", f"{two}#Paragraph_2", f"{two}#Paragraph_3"]
+        assert processor.duplicates == 2
+        assert results[f"{two}#Paragraph_1"] == results[f"{one}#Paragraph_2"]
+        assert results[f"{two}#Paragraph_3"] == results[f"{one}#Paragraph_2"]
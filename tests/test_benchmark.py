@@ -0,0 +1,40 @@
+import pytest
+
+from benchmark import compare_reports, relative_spread
+
+def report(throughput: float, analyze_ms: float, spread: float = 0.0):
+    return {
+        "meta": {"corpus": "synthetic:chapter", "paragraphs": 50, "seed": 0, "backend": "fast", "flags": {}},
+        "throughput_pps": throughput,
+        "latency_ms": {"p50": 1000 / throughput, "p99": 2000 / throughput},
+        "stages": {"analyze": {"p50_ms": analyze_ms, "spread": spread}},
+        "peak_rss_mb": 100.0,
+        "spread": {"throughput_pps": spread, "latency_ms.p50": spread}
+    }
+
+def test_relative_spread():
+    assert relative_spread([9.0, 10.0, 11.0]) == pytest.approx(0.2)
+    assert relative_spread([5.0]) == 0.0
+
+def test_regression_beyond_tolerance_is_flagged():
+    assert compare_reports(report(1000, 1.0), report(1000, 1.0), 0.15) == []
+    assert compare_reports(report(800, 1.3), report(1000, 1.0), 0.15) == [
+        "throughput_pps", "latency_ms.p50", "stages.analyze.p50_ms"]
+
+def test_noisy_metrics_are_gated_on_their_spread():
+    noisy = report(1000, 1.0, spread=0.3)
+    assert compare_reports(report(800, 1.25), noisy, 0.15) == []
+    assert compare_reports(report(600, 1.5), noisy, 0.15) == [
+        "throughput_pps", "latency_ms.p50", "stages.analyze.p50_ms"]
+
+def test_baselines_without_spreads_use_the_tolerance():
+    old = report(1000, 1.0)
+    del old["spread"]
+    del old["stages"]["analyze"]["spread"]
+    assert compare_reports(report(800, 1.0), old, 0.15) == ["throughput_pps", "latency_ms.p50"]
+
+def test_incomparable_reports_are_refused():
+    other = report(1000, 1.0)
+    other["meta"]["backend"] = "nltk"
+    with pytest.raises(ValueError):
+        compare_reports(report(1000, 1.0), other, 0.15)
@@ -0,0 +1,68 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from exporters import FIELDS, export_results, get_exporter, question_rows, read_npz_rows
+from question_generator import QuestionGenerator
+
+# Text that would trip a naive row split, plus quotes, newlines and non-ASCII
+TRICKY = 'He said "}, {\\"paragraph_id\\": x" — déjà vu\non two lines'
+
+@pytest.fixture(scope="module")
+def results(paragraphs):
+    generator = QuestionGenerator(backend="fast")
+    results = {f"Paragraph_{i}": {"text": p, "questions": generator.generate_questions(p, seed=i)}
+               for i, p in enumerate(paragraphs, 1)}
+    results["Tricky"] = {"text": TRICKY, "questions": {
+        "Factual Questions": [{"question": TRICKY, "answer": '"}, {"paragraph_id": ', "marks": 1}],
+        "Multiple Choice Questions": [{"question": "Which?", "options": [TRICKY, "a | b"],
+                                       "correct_answer_index": 0, "marks": 3}],
+        "Analytical Questions": ["A plain string from an old results file"]}}
+    return results
+
+@pytest.fixture(scope="module")
+def expected(results):
+    return [row for para_id, data in results.items() for row in question_rows(para_id, data)]
+
+def export(results, path, output_format):
+    exporter = get_exporter(output_format, str(path))
+    # Small batches so rows cross batch boundaries
+    exporter.batch_rows = 7
+    return export_results(results.items(), exporter)
+
+@pytest.mark.parametrize("name", ["rows.jsonl", "rows.jsonl.gz"])
+def test_jsonl(tmp_path, results, expected, name):
+    path = tmp_path / name
+    assert export(results, path, 'jsonl') == len(expected)
+    opener = gzip.open if name.endswith(".gz") else open
+    with opener(path, 'rt', encoding='utf-8') as file:
+        records = [json.loads(line) for line in file]
+    assert records == [dict(zip(FIELDS, [*row[:3], list(row.options), *row[4:]])) for row in expected]
+
+def test_csv(tmp_path, results, expected):
+    path = tmp_path / "rows.csv"
+    assert export(results, path, 'csv') == len(expected)
+    with open(path, newline='', encoding='utf-8') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == list(FIELDS)
+    assert rows[1:] == [[row.paragraph_id, row.question_type, row.question, " | ".join(row.options), row.answer,
+                         str(row.correct_answer_index), str(row.marks)] for row in expected]
+
+def test_npz_round_trip(tmp_path, results, expected):
+    path = tmp_path / "rows.npz"
+    assert export(results, path, 'npz') == len(expected)
+    assert read_npz_rows(str(path)) == expected
+
+def test_parquet_round_trip(tmp_path, results, expected):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "rows.parquet"
+    assert export(results, path, 'parquet') == len(expected)
+    table = pq.read_table(str(path)).to_pylist()
+    assert [tuple(record[field] for field in FIELDS) for record in table] == [
+        (*row[:3], list(row.options), *row[4:]) for row in expected]
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        get_exporter('xml', str(tmp_path / "rows.xml"))
@@ -0,0 +1,25 @@
+from nlp_backends import get_backend
+
+def tag(sentence: str):
+    backend = get_backend("fast")
+    return backend.tag_sents([backend.word_tokenize(sentence)])[0]
+
+def test_unicode_punctuation_is_not_tagged_as_nouns():
+    tags = dict(tag("The “greenhouse effect” — first described by Fourier — warms Earth… • fast."))
+    assert tags["“"] == "``" and tags["”"] == "''"
+    assert tags["—"] == tags["…"] == ":"
+    assert tags["•"] == "SYM"
+    assert tags["greenhouse"] == "NN" and tags["Fourier"] == "NNP"
+
+def test_key_phrases_stop_at_punctuation(generator):
+    text = ("The “greenhouse effect” — first described by Fourier — warms Earth. "
+            "Many gases, e.g. carbon dioxide and methane, trap heat in the atmosphere.")
+    phrases = generator.generate_questions(text, seed=1)["Key Phrases Identified"]
+    assert "greenhouse effect" in phrases and "carbon dioxide" in phrases
+    assert not any(mark in phrase for phrase in phrases for mark in "“”—…")
+    assert not any(phrase.startswith("e.g.") for phrase in phrases)
+
+def test_abbreviations_do_not_split_sentences():
+    backend = get_backend("fast")
+    assert backend.sent_tokenize("Dr. Smith met Mr. Jones in the U.S. today. They talked.") == [
+        "Dr. Smith met Mr. Jones in the U.S. today.", "They talked."]
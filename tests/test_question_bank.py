@@ -0,0 +1,61 @@
+import pytest
+
+from question_bank import QuestionBank
+
+PARAGRAPH = "Glaciers are slow-moving rivers of ice that carve valleys over thousands of years."
+
+def result(question: str):
+    return {
+        "Factual Questions": [{"question": question, "answer": "Glaciers", "marks": 1}],
+        "Multiple Choice Questions": [{"question": "Which of the following best describes glaciers?",
+                                       "options": ["The Earth's ice rivers.", PARAGRAPH],
+                                       "correct_answer_index": 1, "marks": 3}],
+        "Key Phrases Identified": ["glaciers"]
+    }
+
+@pytest.fixture
+def bank(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    yield bank
+    bank.close()
+
+def test_round_trip(bank, generator, paragraphs):
+    questions = generator.generate_questions(paragraphs[0], seed=1)
+    bank.add(paragraphs[0], questions, "sample#Paragraph_1", seed=1, settings="s")
+    assert bank.get(paragraphs[0], 1, "s") == questions
+    # Whitespace changes do not make it a different paragraph
+    assert bank.get("  " + paragraphs[0].replace(" ", "\n", 1), 1, "s") == questions
+    assert bank.get(paragraphs[0], 2, "s") is None
+
+def test_unseeded_lookup_ignores_seeded_versions(bank):
+    bank.add(PARAGRAPH, result("seeded"), seed=3)
+    assert bank.get(PARAGRAPH) is None
+    assert not bank.contains(PARAGRAPH)
+    assert bank.get(PARAGRAPH, any_seed=True)["Factual Questions"][0]["question"] == "seeded"
+
+    bank.add(PARAGRAPH, result("unseeded"))
+    bank.add(PARAGRAPH, result("minus one"), seed=-1)
+    assert len(bank) == 3
+    assert bank.get(PARAGRAPH)["Factual Questions"][0]["question"] == "unseeded"
+    assert bank.get(PARAGRAPH, -1)["Factual Questions"][0]["question"] == "minus one"
+
+    # Storing the same version again replaces it
+    bank.add(PARAGRAPH, result("unseeded again"))
+    assert len(bank) == 3
+    assert bank.get(PARAGRAPH)["Factual Questions"][0]["question"] == "unseeded again"
+
+def test_error_results_are_not_stored(bank):
+    assert bank.add(PARAGRAPH, {"error": "Paragraph is too short."}) is None
+    assert len(bank) == 0
+
+def test_search_matches_hyphens_and_apostrophes(bank):
+    bank.add(PARAGRAPH, result("What are fast-flowing meltwater streams?"))
+    assert [row.question for row in bank.search("fast-flowing")] == ["What are fast-flowing meltwater streams?"]
+    assert [row.answer for row in bank.search("Earth's")] == [PARAGRAPH]
+    assert bank.search("volcano") == []
+
+def test_questions_by_phrase(bank):
+    bank.add(PARAGRAPH, result("What are glaciers?"), "notes#Paragraph_1")
+    assert {row.question_type for row in bank.questions_for_phrase("Glaciers")} == {
+        "Factual Questions", "Multiple Choice Questions"}
+    assert [source for _, source in bank.paragraphs_for_phrase("glaciers")] == ["notes#Paragraph_1"]
@@ -0,0 +1,33 @@
+from distractors import DistractorIndex
+from long_document import LongDocumentGenerator
+from question_generator import QUESTION_CATEGORIES, QuestionGenerator
+
+def test_same_seed_gives_same_questions(generator, paragraphs):
+    first = generator.generate_questions(paragraphs[0], seed=7)
+    assert list(first)[:len(QUESTION_CATEGORIES)] == list(QUESTION_CATEGORIES)
+    # A fresh generator has no caches to fall back on
+    assert QuestionGenerator(backend="fast").generate_questions(paragraphs[0], seed=7) == first
+    assert generator.generate_questions(paragraphs[0], seed=7) == first
+
+def test_bulk_generation_matches_single_calls(generator, paragraphs):
+    single = [QuestionGenerator(backend="fast").generate_questions(p, seed=3) for p in paragraphs]
+    assert generator.generate_questions_many(paragraphs, seed=3) == single
+
+def test_short_paragraph_is_an_error(generator):
+    assert "error" in generator.generate_questions("Too short.", seed=1)
+
+def test_single_sentence_mcq_has_no_filler_option(generator):
+    paragraph = "Photosynthesis in green plants converts sunlight into chemical energy stored in glucose."
+    questions = generator.generate_questions(paragraph, seed=1)["Multiple Choice Questions"]
+    assert questions
+    assert all(len(q["options"]) == 1 for q in questions)
+
+def test_seeded_questions_ignore_the_distractor_pool(paragraphs):
+    text = "Photosynthesis converts light energy into chemical energy in plants. Chlorophyll absorbs red light."
+    pooled = DistractorIndex()
+    pooled.add(["Mitochondria produce energy for the cell.", "Volcanoes erupt molten rock from the mantle."])
+    with_pool = QuestionGenerator(backend="fast", distractor_index=pooled)
+    plain = QuestionGenerator(backend="fast")
+    assert with_pool.generate_questions(text, seed=5) == plain.generate_questions(text, seed=5)
+    assert (LongDocumentGenerator(with_pool).generate(text, seed=5) ==
+            LongDocumentGenerator(plain).generate(text, seed=5))
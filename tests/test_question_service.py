@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+
+from metrics import MetricsRegistry
+from question_service import MAX_BODY_BYTES, QueueFullError, QuestionService
+
+class StubBatcher:
+    """Stands in for MicroBatcher: answers at once, or raises ``error``"""
+
+    def __init__(self, error=None):
+        self.registry = MetricsRegistry()
+        self.error = error
+
+    async def submit(self, paragraph, seed=None):
+        if self.error is not None:
+            raise self.error
+        return {"paragraph": paragraph, "seed": seed}
+
+    def stats(self):
+        return {"queue_depth": 0}
+
+def exchange(batcher, *requests: bytes):
+    """Send raw requests over one connection and return the raw responses"""
+    async def run():
+        service = QuestionService(batcher)
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            responses = []
+            for request in requests:
+                writer.write(request)
+                await writer.drain()
+                responses.append(await read_response(reader))
+            writer.close()
+            return responses
+    return asyncio.run(run())
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        return None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    return int(status_line.split()[1]), headers, json.loads(body)
+
+def post(body: bytes, headers: str = None) -> bytes:
+    if headers is None:
+        headers = f"Content-Length: {len(body)}\r\n"
+    return b"POST /generate HTTP/1.1\r\n" + headers.encode("latin-1") + b"\r\n" + body
+
+def test_generate_and_keep_alive():
+    body = json.dumps({"paragraph": "Some text", "seed": 4}).encode()
+    first, second = exchange(StubBatcher(), post(body), b"GET /health HTTP/1.1\r\n\r\n")
+    assert first[0] == 200 and first[2] == {"paragraph": "Some text", "seed": 4}
+    assert first[1]["connection"] == "keep-alive"
+    assert second[0] == 200 and second[2] == {"status": "ok"}
+
+@pytest.mark.parametrize("body", [b"not json", b'{"seed": 1}', b'{"paragraph": "x", "seed": "1"}', b"[]"])
+def test_bad_body_is_400_and_connection_stays_open(body):
+    bad, health = exchange(StubBatcher(), post(body), b"GET /health HTTP/1.1\r\n\r\n")
+    assert bad[0] == 400
+    assert health[0] == 200
+
+@pytest.mark.parametrize("headers, status", [
+    ("", 411),
+    ("Content-Length: abc\r\n", 400),
+    ("Content-Length: -5\r\n", 400),
+    (f"Content-Length: {MAX_BODY_BYTES + 1}\r\n", 413),
+])
+def test_unframed_body_closes_the_connection(headers, status):
+    response, after = exchange(StubBatcher(), post(b"", headers), b"GET /health HTTP/1.1\r\n\r\n")
+    assert response[0] == status
+    assert response[1]["connection"] == "close"
+    assert after is None
+
+def test_routing_errors():
+    missing, wrong_method = exchange(StubBatcher(), b"GET /nope HTTP/1.1\r\n\r\n", b"GET /generate HTTP/1.1\r\n\r\n")
+    assert missing[0] == 404
+    assert wrong_method[0] == 405
+
+def test_full_queue_is_503_with_retry_after():
+    busy, = exchange(StubBatcher(QueueFullError()), post(b'{"paragraph": "x"}'))
+    assert busy[0] == 503
+    assert busy[1]["retry-after"] == "1"
+
+def test_generation_failure_is_500_and_connection_stays_open():
+    batcher = StubBatcher(RuntimeError("worker died"))
+    failed, health = exchange(batcher, post(b'{"paragraph": "x"}'), b"GET /health HTTP/1.1\r\n\r\n")
+    assert failed[0] == 500
+    assert "worker died" in failed[2]["error"]
+    assert health[0] == 200